@@ -0,0 +1,166 @@
+# process-wide cache of decoded audio files (sources, and .wav HRIRs).
+# selecting a file used to decode it twice (once inside the try, once more after it), and rendering it with a SOFA file decoded it a third time.
+# here each file is decoded once and handed out read-only, so the HRTF tab, SOFA renders, scenes and trajectories all share the same array.
+# other precisions (see precision.py) and the mono downmix are derived from what's already decoded instead of going back to the file;
+# a float32 copy can come from a float64 one, but never the other way around, since that would lose precision.
+# entries are keyed like the other caches (path + mtime + size, see file_keys.py), and the least recently used ones get dropped past MAX_AUDIO_BYTES.
+
+import os  # <- absolute paths for invalidation
+import threading  # <- the cache can be hit from worker threads
+from collections import OrderedDict  # <- lru ordering
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+import soundfile as sf  # <- decoding
+
+import file_keys  # <- file keys
+import precision  # <- processing dtypes
+
+MAX_AUDIO_BYTES = 512 * 1024 * 1024  # <- total size of cached audio before the least recently used files get dropped
+
+_entries = OrderedDict()  # <- (file key, dtype name, mono) -> (np.ndarray, sampling rate)
+_lock = threading.RLock()
+_hits = 0
+_misses = 0  # <- files decoded from disk
+_derived = 0  # <- entries made from another entry (other dtype, or mono) without decoding
+
+
+def downmix(x: np.ndarray):
+    """
+    Averages the channels of a signal down to mono.
+
+    Args:
+        x (np.ndarray): Signal with shape (samples,) or (samples, channels).
+
+    Returns:
+        np.ndarray: Mono signal with shape (samples,).
+    """
+    if len(x.shape) > 1:
+        if x.shape[1] > 1:
+            return np.mean(x, axis=1)
+        return x[:, 0]
+    return x
+
+
+def _freeze(x: np.ndarray):
+    x = np.asarray(x)
+    x.setflags(write=False)
+    return x
+
+
+def _store(key: tuple, data: np.ndarray, fs: int):
+    # called with _lock held
+    path = key[0][0]
+    for stale_key in [k for k in _entries if k[0][0] == path and k[0] != key[0]]:
+        del _entries[stale_key]  # <- the file changed on disk since these were decoded
+    _entries[key] = (data, fs)
+    _entries.move_to_end(key)
+    _evict()
+
+
+def _evict():
+    while len(_entries) > 1 and sum(data.nbytes for data, _ in _entries.values()) > MAX_AUDIO_BYTES:
+        _entries.popitem(last=False)
+
+
+def _derivable_from(file_key: tuple, dtype: str, mono: bool):
+    # an entry of the same file that the one asked for can be made from: same dtype or float64, and multichannel unless mono is asked for
+    candidates = [
+        (key, entry)
+        for key, entry in _entries.items()
+        if key[0] == file_key and key[1] in (dtype, "float64") and (key[2] == mono or not key[2])
+    ]
+    if not candidates:
+        return None
+    candidates.sort(key=lambda candidate: (candidate[0][1] != dtype, candidate[0][2] != mono))
+    return candidates[0]
+
+
+def read(path: str, dtype=None, mono: bool = False):
+    """
+    Returns a file's samples, decoding it only if it isn't cached (or changed on disk since it was).
+
+    Args:
+        path (str): Path to audio file.
+        dtype (str, optional): "float32" or "float64" (see precision.py). Defaults to None (float64).
+        mono (bool, optional): Average the channels down to mono. Defaults to False.
+
+    Returns:
+        np.ndarray: Samples with shape (samples,) or (samples, channels), like soundfile.read. Shared between callers, so it's read-only.
+        int: Sampling rate.
+    """
+    global _hits, _misses, _derived
+    dtype = precision.resolve(dtype).name
+    mono = bool(mono)
+    file_key = file_keys.file_key(path)
+    key = (file_key, dtype, mono)
+    with _lock:
+        if key in _entries:
+            _hits += 1
+            _entries.move_to_end(key)
+            return _entries[key]
+        source = _derivable_from(file_key, dtype, mono)
+
+    if source is None:
+        data, fs = sf.read(file_key[0], dtype=dtype)
+        data = _freeze(data)
+        with _lock:
+            _misses += 1
+            _store((file_key, dtype, False), data, fs)
+        if not mono:
+            return data, fs
+        source_mono = False
+    else:
+        (_, _, source_mono), (data, fs) = source
+
+    if mono and not source_mono:
+        data = downmix(data)
+    data = _freeze(data.astype(dtype, copy=False))
+    with _lock:
+        _derived += 1
+        _store(key, data, fs)
+    return data, fs
+
+
+def invalidate(path: str = None):
+    """
+    Drops cached audio.
+
+    Args:
+        path (str, optional): Path to audio file to drop. Drops everything if not given.
+    """
+    with _lock:
+        if path is None:
+            _entries.clear()
+            return
+        path = os.path.abspath(path)
+        for key in [k for k in _entries if k[0][0] == path]:
+            del _entries[key]
+
+
+def set_max_bytes(max_bytes: int):
+    """
+    Changes the memory budget, evicting the least recently used files if needed.
+
+    Args:
+        max_bytes (int): Total size of cached audio, in bytes.
+    """
+    global MAX_AUDIO_BYTES
+    with _lock:
+        MAX_AUDIO_BYTES = max(0, int(max_bytes))
+        _evict()
+
+
+def cache_info():
+    """
+    Returns:
+        dict: hits, misses (decodes), derived entries, cached entries, their total size in bytes, and the budget.
+    """
+    with _lock:
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "derived": _derived,
+            "entries": len(_entries),
+            "nbytes": sum(data.nbytes for data, _ in _entries.values()),
+            "max_bytes": MAX_AUDIO_BYTES,
+        }
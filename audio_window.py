@@ -0,0 +1,62 @@
+# windowed audio reads, so looking at 200ms of a 4GB recording doesn't load all 4GB first.
+# .wav files get memory mapped through scipy (the same reader the spectrogram always used, so sample values and dtypes don't change),
+# and only the pages inside the window are ever touched. anything scipy can't map (24-bit, or not a .wav) is read with a seek through soundfile.
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+
+def audio_info(audio_file_path: str):
+    """
+    Sampling rate and length of an audio file, without reading its samples.
+
+    Args:
+        audio_file_path (str): Path to audio file.
+
+    Returns:
+        int: Sampling rate.
+        int: Number of frames.
+    """
+    import soundfile as sf
+
+    info = sf.info(str(audio_file_path))
+    return int(info.samplerate), int(info.frames)
+
+
+def read_window(audio_file_path: str, start: int = 0, end: int = None, channel: int = 0):
+    """
+    Reads one channel of an audio file between two frame indices.
+
+    Args:
+        audio_file_path (str): Path to audio file.
+        start (int, optional): First frame. Defaults to 0.
+        end (int, optional): Frame to stop before. Defaults to None (end of file).
+        channel (int, optional): Channel to read. Defaults to 0.
+
+    Returns:
+        np.ndarray: Samples of the window, in the file's own sample format (like scipy.io.wavfile.read: int16 for 16-bit files, etc.)
+        int: Sampling rate.
+    """
+    from scipy.io import wavfile
+
+    try:
+        sr, samples = wavfile.read(str(audio_file_path), mmap=True)
+    except ValueError:
+        return _read_window_soundfile(audio_file_path, start, end, channel)
+    if samples.ndim > 1:
+        samples = samples[:, channel]
+    window = np.array(samples[max(0, int(start)) : end])  # <- copy just the window out, so the map can be closed
+    del samples
+    return window, int(sr)
+
+
+def _read_window_soundfile(audio_file_path, start, end, channel):
+    import soundfile as sf
+
+    with sf.SoundFile(str(audio_file_path)) as audio:
+        # int32 for integer files matches what scipy gives for 24-bit (left-justified)
+        dtype = "float64" if audio.subtype in ("FLOAT", "DOUBLE") else "int32"
+        start = min(max(0, int(start)), audio.frames)
+        end = audio.frames if end is None else min(max(start, int(end)), audio.frames)
+        audio.seek(start)
+        window = audio.read(end - start, dtype=dtype, always_2d=True)[:, channel]
+        return window, int(audio.samplerate)
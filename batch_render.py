@@ -0,0 +1,344 @@
+# command-line batch renderer for SOFA files.
+# renders every (source file x azimuth x elevation x SOFA file) combination, or the rows of a manifest, without the gui.
+# jobs are fanned out across a process pool; each task renders every position for one source/SOFA pair,
+# so the source is only read and resampled once per task.
+#
+# examples:
+#   python batch_render.py --source a.wav b.wav --sofa subj1.sofa subj2.sofa --azimuth 0:360:15 --elevation -30,0,30 --out renders
+#   python batch_render.py --manifest jobs.csv --out renders --workers 8
+#
+# manifest files are .csv with a header row of: source,sofa,azimuth,elevation
+
+import os  # <- directories, cpu count
+import sys  # <- exit codes
+import csv  # <- reading manifests
+import time  # <- throughput
+import argparse  # <- cli
+from concurrent.futures import ProcessPoolExecutor, as_completed  # <- process pool
+
+import numpy as np  # <- angle grids
+
+
+def parse_angles(spec: str):
+    """
+    Parses an angle spec from the command line. Accepts a single value ("30"), a comma separated list ("0,90,180"), or a range as start:stop:step ("0:360:15", stop excluded).
+
+    Args:
+        spec (str): Angle spec.
+
+    Returns:
+        list: Angles in degrees.
+    """
+    spec = str(spec).replace(" ", "")
+    if ":" in spec:
+        parts = [float(part) for part in spec.split(":")]
+        if len(parts) == 2:
+            parts.append(1.0)
+        start, stop, step = parts
+        angles = np.arange(start, stop, step)
+    else:
+        angles = [float(part) for part in spec.split(",") if part]
+    return [int(a) if float(a).is_integer() else float(a) for a in angles]
+
+
+def parse_receivers(spec: str):
+    """
+    Parses a receiver spec from the command line: "all", a single index ("0"), a comma separated list ("0,1,4"), or a range as start:stop:step ("0:32", stop excluded).
+
+    Args:
+        spec (str): Receiver spec.
+
+    Returns:
+        list: Receiver indices, or None for all of them.
+    """
+    if str(spec).strip().lower() == "all":
+        return None
+    return [int(receiver) for receiver in parse_angles(spec)]
+
+
+def grid_jobs(source_files: list, sofa_files: list, azimuths: list, elevations: list):
+    """
+    Builds the full grid of render jobs.
+
+    Returns:
+        list: (source file, sofa file, azimuth, elevation) tuples.
+    """
+    return [
+        (source_file, sofa_file, az, el)
+        for sofa_file in sofa_files
+        for source_file in source_files
+        for az in azimuths
+        for el in elevations
+    ]
+
+
+def manifest_jobs(manifest_path: str):
+    """
+    Reads render jobs from a .csv manifest with the columns source, sofa, azimuth, elevation.
+
+    Args:
+        manifest_path (str): Path to manifest.
+
+    Returns:
+        list: (source file, sofa file, azimuth, elevation) tuples.
+    """
+    jobs = []
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="") as manifest:
+        for row in csv.DictReader(manifest):
+            # relative paths in a manifest are relative to the manifest, not to wherever this got run from
+            source_file = os.path.join(manifest_dir, row["source"].strip())
+            sofa_file = os.path.join(manifest_dir, row["sofa"].strip())
+            az = parse_angles(row.get("azimuth") or "0")[0]
+            el = parse_angles(row.get("elevation") or "0")[0]
+            jobs.append((source_file, sofa_file, az, el))
+    return jobs
+
+
+def group_jobs(jobs: list, chunk_size: int):
+    """
+    Groups jobs by (source file, sofa file) so each worker task only has to load its inputs once, then splits big groups into chunks so the pool stays busy.
+
+    Args:
+        jobs (list): (source file, sofa file, azimuth, elevation) tuples.
+        chunk_size (int): Maximum number of positions per task.
+
+    Returns:
+        list: (source file, sofa file, [(azimuth, elevation), ...]) tuples.
+    """
+    grouped = {}
+    for source_file, sofa_file, az, el in jobs:
+        grouped.setdefault((source_file, sofa_file), []).append((az, el))
+    tasks = []
+    for (source_file, sofa_file), positions in grouped.items():
+        for i in range(0, len(positions), chunk_size):
+            tasks.append((source_file, sofa_file, positions[i : i + chunk_size]))
+    return tasks
+
+
+def render_task(
+    source_file: str,
+    sofa_file: str,
+    positions: list,
+    out_dir: str,
+    target_fs: int,
+    stream: bool = False,
+    interpolate: str = None,
+    receivers=(0, 1),
+    emitter: int = 0,
+):
+    """
+    Worker entry point. Renders one source with one SOFA file at every given position and writes each render to out_dir.
+    With stream set, each position is rendered block by block (see streaming.py) so memory stays flat for very long sources.
+    With interpolate set, each position gets an HRIR interpolated from the surrounding measurements (see hrir_interpolation.py) instead of the nearest one.
+    Every render has one channel per receiver (left and right by default), all from the same emitter.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    import soundfile as sf
+    import sofa_render
+    import spatial_index
+    import hrtf_spectra
+    import hrir_cache
+
+    if stream:
+        if interpolate:
+            raise ValueError("--interpolate isn't supported with --stream yet")
+        import streaming
+
+        written = []
+        for az, el in positions:
+            export_filename = os.path.join(
+                out_dir, sofa_render.sofa_export_name(sofa_file, source_file, az, el)
+            )
+            streaming.render_sofa_streaming(
+                source_file, sofa_file, export_filename, az, el, target_fs, receivers=receivers, emitter=emitter
+            )
+            written.append(export_filename)
+        return written
+
+    source_x, fs_x = sofa_render.load_mono_source(source_file)
+    source_x = sofa_render.resample(source_x, fs_x, target_fs)
+
+    # every position is rendered against the same source, so transform the source once
+    # and render each position in the frequency domain against the precomputed HRTF spectra
+    store = hrtf_spectra.get_spectra(sofa_file, target_fs=target_fs)
+    source_blocks = hrtf_spectra.SourceBlocks(source_x, store)
+    receivers, emitter = hrir_cache.resolve_channels(store.spectra.shape, receivers, emitter)
+
+    if interpolate:
+        from scipy import fft as sp_fft
+        import hrir_interpolation
+
+        interpolator = hrir_interpolation.get_interpolator(sofa_file, target_fs)
+        transfer_functions = [
+            sp_fft.rfft(interpolator.hrir(az, el, receivers, emitter, method=interpolate), store.fft_size, axis=0)
+            for az, el in positions
+        ]
+    else:
+        # resolve every position of the task in one vectorized lookup
+        az_array = [az for az, el in positions]
+        el_array = [el for az, el in positions]
+        M_indices = spatial_index.get_index(sofa_file).query_batch(az_array, el_array)
+        transfer_functions = [store.transfer_functions(M_idx, receivers, emitter) for M_idx in M_indices]
+
+    written = []
+    for (az, el), H in zip(positions, transfer_functions):
+        Stereo3D = sofa_render.peak_normalize(hrtf_spectra.render_spectral(source_blocks, H))
+        export_filename = os.path.join(
+            out_dir, sofa_render.sofa_export_name(sofa_file, source_file, az, el)
+        )
+        sf.write(export_filename, Stereo3D, samplerate=int(target_fs))
+        written.append(export_filename)
+    return written
+
+
+def run_batch(
+    jobs: list,
+    out_dir: str,
+    target_fs: int = 48000,
+    workers: int = None,
+    chunk_size: int = 16,
+    verbose: bool = True,
+    stream: bool = False,
+    interpolate: str = None,
+    receivers=(0, 1),
+    emitter: int = 0,
+):
+    """
+    Renders every job across a process pool and reports throughput.
+
+    Args:
+        jobs (list): (source file, sofa file, azimuth, elevation) tuples.
+        out_dir (str): Directory to write renders to. Created if it doesn't exist.
+        target_fs (int, optional): Target sampling rate. Defaults to 48000.
+        workers (int, optional): Number of worker processes. Defaults to the cpu count.
+        chunk_size (int, optional): Maximum number of positions per task. Defaults to 16.
+        verbose (bool, optional): Print progress and throughput. Defaults to True.
+        stream (bool, optional): Render in constant memory (see streaming.py). Defaults to False.
+        interpolate (str, optional): Interpolate HRIRs with this method ("time" or "magnitude_phase"). Defaults to None (nearest measurement).
+        receivers (list, optional): Receivers to render, one output channel each (None for all of them). Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render. Defaults to 0.
+
+    Returns:
+        list: Paths of the written files.
+        float: Throughput in renders per second.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = group_jobs(jobs, max(1, int(chunk_size)))
+    workers = workers or os.cpu_count() or 1
+
+    written = []
+    failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                render_task,
+                source_file,
+                sofa_file,
+                positions,
+                out_dir,
+                target_fs,
+                stream,
+                interpolate,
+                receivers,
+                emitter,
+            ): (
+                source_file,
+                sofa_file,
+                len(positions),
+            )
+            for source_file, sofa_file, positions in tasks
+        }
+        for future in as_completed(futures):
+            source_file, sofa_file, count = futures[future]
+            try:
+                written.extend(future.result())
+            except Exception as e:
+                failed += count
+                print(
+                    "failed: {0} with {1}: {2}".format(
+                        os.path.basename(source_file), os.path.basename(sofa_file), e
+                    ),
+                    file=sys.stderr,
+                )
+                continue
+            if verbose:
+                print("{0}/{1} rendered".format(len(written), len(jobs)))
+    elapsed = time.perf_counter() - start
+
+    renders_per_second = len(written) / elapsed if elapsed > 0 else 0.0
+    if verbose:
+        print(
+            "rendered {0} files ({1} failed) in {2:.2f} s with {3} workers: {4:.2f} renders/s".format(
+                len(written), failed, elapsed, workers, renders_per_second
+            )
+        )
+    return written, renders_per_second
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Batch render source files with SOFA files, without the gui."
+    )
+    parser.add_argument("--manifest", help=".csv with columns source,sofa,azimuth,elevation")
+    parser.add_argument("--source", nargs="+", default=[], help="source file(s) (.wav)")
+    parser.add_argument("--sofa", nargs="+", default=[], help="SOFA file(s) (.sofa)")
+    parser.add_argument("--azimuth", default="0", help='e.g. "30", "0,90,180" or "0:360:15"')
+    parser.add_argument("--elevation", default="0", help='e.g. "0", "-30,0,30" or "-40:91:10"')
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--target-fs", type=int, default=48000, help="target sampling rate (default: 48000)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: cpu count)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="positions per task (default: 16)")
+    parser.add_argument("--stream", action="store_true", help="render in constant memory, for very long sources")
+    parser.add_argument(
+        "--interpolate",
+        choices=["time", "magnitude_phase"],
+        default=None,
+        help="interpolate HRIRs between measured directions instead of snapping to the nearest one",
+    )
+    parser.add_argument(
+        "--receivers",
+        default="0,1",
+        help='receivers to render, one output channel each: e.g. "all", "0,1" or "0:32" (default: 0,1)',
+    )
+    parser.add_argument("--emitter", type=int, default=0, help="emitter to render (default: 0)")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.manifest:
+        jobs.extend(manifest_jobs(args.manifest))
+    if args.source or args.sofa:
+        if not (args.source and args.sofa):
+            parser.error("--source and --sofa must be given together")
+        jobs.extend(
+            grid_jobs(
+                args.source,
+                args.sofa,
+                parse_angles(args.azimuth),
+                parse_angles(args.elevation),
+            )
+        )
+    if not jobs:
+        parser.error("nothing to render: give --manifest, or --source and --sofa")
+    if args.stream and args.interpolate:
+        parser.error("--interpolate can't be combined with --stream")
+
+    written, renders_per_second = run_batch(
+        jobs,
+        args.out,
+        args.target_fs,
+        args.workers,
+        args.chunk_size,
+        stream=args.stream,
+        interpolate=args.interpolate,
+        receivers=parse_receivers(args.receivers),
+        emitter=args.emitter,
+    )
+    return 0 if len(written) == len(jobs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# benchmark for convolution.py: times every backend over a grid of signal and filter lengths,
+# and shows which backend actually won next to the one convolve(method="auto") would pick.
+#
+#   python benchmarks/bench_convolution.py
+#   python benchmarks/bench_convolution.py --channels 2 --repeat 5
+
+import os  # <- finding the repo root
+import sys  # <- importing from the repo root
+import time  # <- timing
+import argparse  # <- cli
+
+import numpy as np  # <- test signals
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import convolution  # noqa: E402
+
+SIGNAL_LENGTHS = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+FILTER_LENGTHS = [16, 256, 2048, 16384]
+DIRECT_LIMIT = 2e9  # <- skip the direct backend above this many multiply-adds, it'd take minutes
+
+
+def time_backend(name: str, x: np.ndarray, h: np.ndarray, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convolution.convolve(x, h, method=name)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the convolution backends.")
+    parser.add_argument("--channels", type=int, default=2, help="filter channels (default: 2)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, best is kept (default: 3)")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    names = list(convolution.BACKENDS)
+    print(
+        "{0:>10} {1:>7} ".format("signal", "filter")
+        + " ".join("{0:>13}".format(name) for name in names)
+        + " {0:>13} {1:>13}".format("fastest", "auto")
+    )
+    mismatches = 0
+    for n_signal in SIGNAL_LENGTHS:
+        x = rng.standard_normal(n_signal)
+        for n_filter in FILTER_LENGTHS:
+            h = rng.standard_normal((n_filter, args.channels))
+            times = {}
+            for name in names:
+                if name == "direct" and n_signal * n_filter * args.channels > DIRECT_LIMIT:
+                    continue
+                times[name] = time_backend(name, x, h, args.repeat)
+            fastest = min(times, key=times.get)
+            auto = convolution.choose_method(n_signal, n_filter, args.channels)
+            # a pick within 25% of the fastest is close enough to count as right
+            if times.get(auto, float("inf")) > 1.25 * times[fastest]:
+                mismatches += 1
+            print(
+                "{0:>10} {1:>7} ".format(n_signal, n_filter)
+                + " ".join(
+                    "{0:>13}".format("{0:.5f} s".format(times[name]) if name in times else "-")
+                    for name in names
+                )
+                + " {0:>13} {1:>13}".format(fastest, auto)
+            )
+    print("auto was more than 25% slower than the fastest backend in {0} case(s)".format(mismatches))
+
+
+if __name__ == "__main__":
+    main()
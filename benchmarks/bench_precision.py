@@ -0,0 +1,127 @@
+# float32 vs float64 processing (see precision.py): times resampling, convolution and a full render in both precisions,
+# measures the largest sample error of the float32 path against the float64 one, and fails if it's over precision.ERROR_BOUNDS.
+#
+#   python benchmarks/bench_precision.py
+#   python benchmarks/bench_precision.py --seconds 600 --taps 1024
+
+import os  # <- finding the repo root
+import sys  # <- importing from the repo root
+import time  # <- timing
+import argparse  # <- cli
+
+import numpy as np  # <- test signals
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import precision  # noqa: E402
+import resampling  # noqa: E402
+import convolution  # noqa: E402
+import sofa_render  # noqa: E402
+
+
+def best_time(fn, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def test_signal(n: int, seed: int = 0):
+    # noise with a slow envelope, so there's quiet and loud passages like real material, peaking at full scale
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n) * (0.55 + 0.45 * np.sin(np.linspace(0, 20 * np.pi, n)))
+    return x / np.max(np.abs(x))
+
+
+def test_hrir(taps: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    decay = np.exp(-np.arange(taps) / (taps / 8))[:, None]
+    return rng.standard_normal((taps, 2)) * decay
+
+
+def compare(label: str, run, repeats: int, bound: float):
+    t64, y64 = best_time(lambda: run("float64"), repeats)
+    t32, y32 = best_time(lambda: run("float32"), repeats)
+    # relative to the float64 result's peak, i.e. to full scale once normalized
+    error = np.max(np.abs(y32.astype(np.float64) - y64)) / np.max(np.abs(y64))
+    ok = error <= bound
+    print(
+        "{0:<34} {1:>9.4f} s {2:>9.4f} s {3:>6.2f}x  {4:>9.2e} ({5:>6.1f} dBFS)  {6}".format(
+            label,
+            t64,
+            t32,
+            t64 / t32 if t32 > 0 else float("inf"),
+            error,
+            20 * np.log10(max(error, 1e-300)),
+            "ok" if ok else "OVER BOUND ({0:.0e})".format(bound),
+        )
+    )
+    return ok, y64.nbytes, y32.nbytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark float32 against float64 processing.")
+    parser.add_argument("--seconds", type=float, default=60, help="test signal length in s (default: 60)")
+    parser.add_argument("--taps", type=int, default=512, help="HRIR length (default: 512)")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per case, best is kept (default: 3)")
+    parser.add_argument("--sofa", default=None, help="also render a real SOFA file with --source")
+    parser.add_argument("--source", default=None, help="source file for the --sofa render")
+    args = parser.parse_args(argv)
+
+    print("{0:<34} {1:>11} {2:>11} {3:>7}  {4}".format("case", "float64", "float32", "speedup", "max error"))
+    results = []
+    for orig_sr in (44100, 96000):
+        x = test_signal(int(args.seconds * orig_sr))
+        results.append(
+            compare(
+                "resample {0}k -> 48k".format(orig_sr / 1000),
+                lambda dtype: resampling.resample(precision.cast(x, dtype), orig_sr, 48000),
+                args.repeats,
+                precision.ERROR_BOUNDS["resample"],
+            )
+        )
+
+    x = test_signal(int(args.seconds * 48000))
+    h = test_hrir(args.taps)
+    for method in convolution.BACKENDS:
+        if method == "direct" and len(x) * args.taps > 5e8:
+            continue  # <- would take minutes, and it's never picked at these lengths anyway
+        results.append(
+            compare(
+                "convolve ({0})".format(method),
+                lambda dtype: convolution.convolve(precision.cast(x, dtype), precision.cast(h, dtype), method=method)[0],
+                args.repeats,
+                precision.ERROR_BOUNDS["convolve"],
+            )
+        )
+
+    results.append(
+        compare(
+            "render (resample, convolve, norm)",
+            lambda dtype: sofa_render.peak_normalize(
+                sofa_render.convolve_binaural(
+                    resampling.resample(precision.cast(x, dtype), 48000, 44100), precision.cast(h, dtype)
+                )
+            ),
+            args.repeats,
+            precision.ERROR_BOUNDS["render"],
+        )
+    )
+    if args.sofa and args.source:
+        results.append(
+            compare(
+                "render_sofa ({0})".format(os.path.basename(args.sofa)),
+                lambda dtype: sofa_render.render_sofa(args.source, args.sofa, 30, 0, dtype=dtype)[0],
+                args.repeats,
+                precision.ERROR_BOUNDS["render"],
+            )
+        )
+
+    ok, nbytes64, nbytes32 = results[-1]
+    print("render output: {0:.1f} MB as float64, {1:.1f} MB as float32".format(nbytes64 / 1e6, nbytes32 / 1e6))
+    return 0 if all(result[0] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# real-time engine (realtime_engine.py): runs a noise input through the engine at several block sizes, with and without a turning head,
+# and reports the block processing time against the block deadline. fails if any block size overruns more than --max-overruns of its blocks.
+#
+#   python benchmarks/bench_realtime.py subject.sofa
+#   python benchmarks/bench_realtime.py subject.sofa --block-sizes 32 64 128 --seconds 60 --dtype float32
+
+import os  # <- finding the repo root
+import sys  # <- importing from the repo root
+import argparse  # <- cli
+
+import numpy as np  # <- test signal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import realtime_engine  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the real-time binaural engine.")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("--block-sizes", type=int, nargs="+", default=[32, 64, 128, 256, 512], help="block sizes")
+    parser.add_argument("--seconds", type=float, default=20, help="input length in s (default: 20)")
+    parser.add_argument("--fs", type=int, default=48000, help="sampling rate (default: 48000)")
+    parser.add_argument("--rotate", type=float, default=90, help="head yaw speed for the moving case, deg/s (default: 90)")
+    parser.add_argument("--dtype", default=None, help="processing dtype (default: float64)")
+    parser.add_argument("--max-overruns", type=float, default=0.01, help="fraction of blocks allowed to overrun, for scheduler jitter (default: 0.01)")
+    args = parser.parse_args(argv)
+
+    x = np.random.default_rng(0).standard_normal(int(args.seconds * args.fs))
+    print(
+        "{0:>6} {1:>10} {2:>8} {3:>10} {4:>10} {5:>10} {6:>10} {7:>7} {8:>9}".format(
+            "block", "partitions", "head", "deadline", "mean", "p99", "max", "load", "overruns"
+        )
+    )
+    ok = True
+    for block_size in args.block_sizes:
+        engine = realtime_engine.BinauralEngine(args.sofa, args.fs, block_size, azimuth=30, dtype=args.dtype)
+        for rotate in (0.0, args.rotate):
+            engine.reset()
+            engine.process(np.zeros(block_size))  # <- warm up the fft plans
+            engine.reset_timing()
+            realtime_engine.run_offline(engine, x, rotate=rotate)
+            stats = engine.timing()
+            ok = ok and stats["overruns"] <= args.max_overruns * stats["blocks"]
+            print(
+                "{0:>6} {1:>10} {2:>8} {deadline_ms:>7.3f} ms {mean_ms:>7.3f} ms {p99_ms:>7.3f} ms {max_ms:>7.3f} ms "
+                "{load:>6.1%} {overruns:>9}".format(
+                    block_size, engine.partitions.shape[1], "turning" if rotate else "still", **stats
+                )
+            )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
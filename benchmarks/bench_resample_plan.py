@@ -0,0 +1,83 @@
+# benchmark for resample_plan.py: runs every resampling plan for a render on synthetic signals, and checks that the one the planner
+# picks is actually the quickest (or close to it). each case is timed with the HRIR tensor uncached (the first render of a file)
+# and cached (every render after that).
+#
+#   python benchmarks/bench_resample_plan.py
+#   python benchmarks/bench_resample_plan.py --seconds 300 --measurements 1550 --channels 2
+
+import os  # <- finding the repo root
+import sys  # <- importing from the repo root
+import time  # <- timing
+import argparse  # <- cli
+
+import numpy as np  # <- test signals
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import convolution  # noqa: E402
+import resampling  # noqa: E402
+import resample_plan  # noqa: E402
+
+# (source rate, impulse response rate, output rate)
+CASES = [
+    (44100, 44100, 48000),
+    (44100, 48000, 48000),
+    (48000, 44100, 48000),
+    (96000, 96000, 48000),
+    (48000, 96000, 44100),
+]
+
+
+def run_plan(plan: resample_plan.ResamplePlan, x: np.ndarray, fs_x: int, ir: np.ndarray, fs_ir: int, cached: bool, channels: int):
+    # what sofa_render.render_sofa does for a plan, with the tensor resample left out when it's cached
+    h = ir[0, :channels, 0, :].T
+    if cached:
+        h = resampling.resample(h, fs_ir, plan.render_fs)
+    else:
+        h = resampling.resample(ir, fs_ir, plan.render_fs, axis=-1)[0, :channels, 0, :].T
+    y, method = convolution.convolve(resampling.resample(x, fs_x, plan.render_fs), h)
+    return resampling.resample(y, plan.render_fs, plan.target_fs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the resampling plans of a render against the planner's choice.")
+    parser.add_argument("--seconds", type=float, default=120, help="source length in seconds (default: 120)")
+    parser.add_argument("--taps", type=int, default=256, help="impulse response length (default: 256)")
+    parser.add_argument("--measurements", type=int, default=800, help="measurements in the HRIR tensor (default: 800)")
+    parser.add_argument("--channels", type=int, default=2, help="output channels (default: 2)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per plan, best is kept (default: 3)")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print("{0:>20} {1:>8} {2:>8} {3:>12} {4:>10} {5:>8}".format("rates", "tensor", "plan", "est. cost", "time", "chosen"))
+    worst = 1.0
+    for fs_x, fs_ir, target_fs in CASES:
+        x = rng.standard_normal(int(args.seconds * fs_x))
+        ir = rng.standard_normal((args.measurements, args.channels, 1, args.taps))
+        for cached in (False, True):
+            tensor_channels = 0 if cached else args.measurements * args.channels
+            plans = resample_plan.render_plans(len(x), fs_x, fs_ir, target_fs, args.taps, args.channels, tensor_channels)
+            chosen = resample_plan.plan_render(len(x), fs_x, fs_ir, target_fs, args.taps, args.channels, tensor_channels)
+            times = {}
+            for plan in plans:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    run_plan(plan, x, fs_x, ir, fs_ir, cached, args.channels)
+                    best = min(best, time.perf_counter() - start)
+                times[plan.name] = best
+                print(
+                    "{0:>20} {1:>8} {2:>8} {3:>12.3g} {4:>8.3f} s {5:>8}".format(
+                        "{0}/{1}->{2}".format(fs_x, fs_ir, target_fs),
+                        "cached" if cached else "cold",
+                        plan.name,
+                        plan.cost,
+                        best,
+                        "<-" if plan.name == chosen.name else "",
+                    )
+                )
+            worst = max(worst, times[chosen.name] / min(times.values()))
+    print("chosen plans were at most {0:.2f}x the quickest one".format(worst))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmark for scene_render.py: renders scenes of a growing number of sources at random directions, and compares
+# against rendering every source on its own (render_sofa's lookup and convolution) and summing the results.
+#
+#   python benchmarks/bench_scene.py subject.sofa source.wav
+#   python benchmarks/bench_scene.py subject.sofa source.wav --sources 10 50 200 --no-reference
+
+import os  # <- finding the repo root
+import sys  # <- importing from the repo root
+import time  # <- timing
+import argparse  # <- cli
+
+import numpy as np  # <- random scenes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scene_render  # noqa: E402
+import sofa_render  # noqa: E402
+import spatial_index  # noqa: E402
+import hrir_cache  # noqa: E402
+import convolution  # noqa: E402
+
+
+def random_scene(n_sources: int, source_file: str, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        (source_file, float(rng.uniform(0, 360)), float(rng.uniform(-30, 60)), float(rng.uniform(0.25, 1.0)))
+        for _ in range(n_sources)
+    ]
+
+
+def render_one_by_one(scene: list, in_sofa_file: str, target_fs: int):
+    # what building a scene used to take: one full render per source, summed afterwards
+    mix = None
+    index = spatial_index.get_index(in_sofa_file)
+    for source_file, az, el, gain in scene:
+        source_x, fs_x = sofa_render.load_mono_source(source_file)
+        source_x = sofa_render.resample(source_x, fs_x, target_fs)
+        SOFA_H = hrir_cache.hrir_pair(in_sofa_file, index.query(az, el), target_fs)
+        rend, _ = convolution.convolve(gain * source_x, SOFA_H)
+        mix = rend if mix is None else mix + rend
+    return sofa_render.peak_normalize(mix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scene renderer.")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("source", help="source file, placed at every position")
+    parser.add_argument("--sources", type=int, nargs="+", default=[10, 50, 100, 200], help="scene sizes")
+    parser.add_argument("--target-fs", type=int, default=48000, help="target sampling rate (default: 48000)")
+    parser.add_argument("--no-reference", action="store_true", help="skip the one-by-one renders")
+    args = parser.parse_args(argv)
+
+    # warm the caches (spectra, index, resampled tensor) so both sides are timed on rendering alone
+    scene_render.render_scene(random_scene(1, args.source), args.sofa, args.target_fs)
+    render_one_by_one(random_scene(1, args.source), args.sofa, args.target_fs)
+
+    print("{0:>8} {1:>11} {2:>11} {3:>12} {4:>8}  {5}".format("sources", "directions", "scene", "one by one", "speedup", "max diff"))
+    for n_sources in args.sources:
+        scene = random_scene(n_sources, args.source, seed=n_sources)
+        start = time.perf_counter()
+        mix, n_groups = scene_render.render_scene(scene, args.sofa, args.target_fs)
+        scene_time = time.perf_counter() - start
+        if args.no_reference:
+            print("{0:>8} {1:>11} {2:>9.3f} s".format(n_sources, n_groups, scene_time))
+            continue
+        start = time.perf_counter()
+        reference = render_one_by_one(scene, args.sofa, args.target_fs)
+        reference_time = time.perf_counter() - start
+        print(
+            "{0:>8} {1:>11} {2:>9.3f} s {3:>10.3f} s {4:>7.1f}x  {5:.1e}".format(
+                n_sources, n_groups, scene_time, reference_time, reference_time / scene_time,
+                np.max(np.abs(mix - reference)),
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
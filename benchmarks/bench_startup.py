@@ -0,0 +1,118 @@
+# cold start benchmark for main.py: launches the gui with -X importtime, waits for the window to come up, and closes it.
+# reports time-to-window, total import time, the slowest imports, and whether any of the heavy modules (which main.py
+# only imports on first use, see lazy_import.py) got pulled in at startup anyway. exits with 1 if over budget.
+#
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --runs 5 --budget 1.5
+#
+# without a display the window can't come up, so only the imports up to that point get reported; pass --imports-only
+# to check just the imports there (e.g. on a headless ci machine).
+
+import os  # <- finding the repo root, environment
+import sys  # <- exit codes, interpreter path
+import time  # <- timing
+import argparse  # <- cli
+import subprocess  # <- launching the gui
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = [
+    "matplotlib.pyplot",
+    "scipy.signal",
+    "scipy.io.wavfile",
+    "librosa",
+    "sofa",
+    "pygame",
+    "soundfile",
+]  # <- none of these should be imported before the window is up
+READY_MARKER = "GGHSF_WINDOW_READY"
+
+
+def parse_importtime(stderr: str):
+    """
+    Parses -X importtime output.
+
+    Args:
+        stderr (str): stderr of a python process run with -X importtime.
+
+    Returns:
+        list: (module name, self time in s, cumulative time in s, nesting depth) tuples, in import order.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+            self_s, cumulative_s = int(self_us) / 1e6, int(cumulative_us) / 1e6
+        except ValueError:
+            continue  # <- the header line
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        imports.append((name.strip(), self_s, cumulative_s, depth))
+    return imports
+
+
+def run_once(timeout: float):
+    """
+    Launches main.py once.
+
+    Returns:
+        float: Time-to-window in seconds, or None if the window never came up.
+        list: Parsed imports (see parse_importtime).
+        str: Tail of stderr, if the window never came up.
+    """
+    env = dict(os.environ, GGHSF_STARTUP_BENCHMARK="1")
+    start = time.time()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(REPO_ROOT, "main.py")],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    ready = None
+    for line in process.stdout.splitlines():
+        if line.startswith(READY_MARKER):
+            ready = float(line.split()[1]) - start
+    errors = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+    return ready, parse_importtime(process.stderr), "\n".join(errors[-5:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark main.py's cold start.")
+    parser.add_argument("--runs", type=int, default=3, help="launches, best is kept (default: 3)")
+    parser.add_argument("--budget", type=float, default=2.0, help="time-to-window budget in s (default: 2.0)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list (default: 10)")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before a launch is given up on (default: 60)")
+    parser.add_argument("--imports-only", action="store_true", help="don't fail if the window can't come up (no display)")
+    args = parser.parse_args(argv)
+
+    best_ready, best_imports, best_errors = None, None, ""
+    for _ in range(max(1, args.runs)):
+        ready, imports, errors = run_once(args.timeout)
+        if best_imports is None or (ready is not None and (best_ready is None or ready < best_ready)):
+            best_ready, best_imports, best_errors = ready, imports, errors
+
+    total = sum(cumulative for name, self_s, cumulative, depth in best_imports if depth == 0)
+    print("total import time: {0:.3f} s".format(total))
+    print("slowest top-level imports:")
+    top_level = sorted((i for i in best_imports if i[3] == 0), key=lambda i: i[2], reverse=True)
+    for name, self_s, cumulative, depth in top_level[: args.top]:
+        print("  {0:>8.3f} s  {1}".format(cumulative, name))
+
+    imported = {name for name, self_s, cumulative, depth in best_imports}
+    eager = [name for name in HEAVY_MODULES if name in imported]
+    if eager:
+        print("imported at startup, but should be lazy: " + ", ".join(eager))
+
+    if best_ready is None:
+        print("window never came up (no display, or main.py failed):")
+        print(best_errors)
+        return 1 if eager or not args.imports_only else 0
+
+    print("time to window: {0:.3f} s (budget: {1:.3f} s)".format(best_ready, args.budget))
+    return 1 if eager or best_ready > args.budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+# convolution engine used by both the HRTF (.wav) tab and the SOFA render path.
+# there's a direct (time domain) backend, a one-shot fft backend, and two block-based backends (overlap-add and overlap-save).
+# convolve() picks whichever one its cost model says is cheapest for the signal and filter lengths, unless told otherwise
+# (overlap-save is only used when asked for, see below).
+# backends are kept in BACKENDS, so another one can be plugged in with register_backend().
+# float32 in means float32 out (see precision.py): convolve() casts the signal and filter to a common dtype, and every backend keeps it.
+# see benchmarks/bench_convolution.py for where each backend actually wins.
+
+import math  # <- log2 for the cost model
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+from scipy import fft as sp_fft  # <- real ffts, next_fast_len
+
+# rough relative cost of one multiply-add in np.convolve vs one butterfly in an fft.
+# np.convolve is a tight loop, so it's cheaper per operation than the fft path; calibrated with benchmarks/bench_convolution.py
+DIRECT_COST_PER_MAC = 0.25
+FFT_COST_PER_POINT = 1.0
+BLOCK_OVERHEAD = 2000.0  # <- python overhead of one block in the block-based backends, in the same units
+
+BACKENDS = {}  # <- name -> (convolve function, cost function)
+AUTO_METHODS = set()  # <- backends method="auto" picks from
+
+
+def _as_2d(h: np.ndarray):
+    """
+    Makes a filter (filter length, channels), and says whether the output should be squeezed back down to 1d.
+    """
+    h = np.asarray(h)
+    if h.ndim == 1:
+        return h[:, None], True
+    return h, False
+
+
+def _finish(y: np.ndarray, squeeze: bool):
+    if squeeze:
+        return y[:, 0]
+    return y
+
+
+def _fft_cost(n: int):
+    return FFT_COST_PER_POINT * n * math.log2(max(n, 2))
+
+
+def block_fft_size(n_filter: int, block_size: int = None):
+    """
+    Picks the fft size for the block-based backends.
+
+    Args:
+        n_filter (int): Filter length.
+        block_size (int, optional): Number of new input samples per block. Defaults to None, which picks a size from the filter length.
+
+    Returns:
+        int: fft size.
+    """
+    if block_size:
+        return sp_fft.next_fast_len(int(block_size) + n_filter - 1, real=True)
+    # 8x the filter keeps most of each fft useful output, 4096 keeps the per-block python overhead down for short filters
+    return 2 ** math.ceil(math.log2(max(8 * n_filter, 4096)))
+
+
+def direct_convolve(x: np.ndarray, h: np.ndarray):
+    """
+    Time domain convolution, O(N*M). Cheapest for short signals and short filters.
+
+    Args:
+        x (np.ndarray): Mono signal.
+        h (np.ndarray): Filter with shape (M,) or (M, channels).
+
+    Returns:
+        np.ndarray: Full convolution, (N + M - 1,) or (N + M - 1, channels).
+    """
+    h, squeeze = _as_2d(h)
+    y = np.stack([np.convolve(x, h[:, c]) for c in range(h.shape[1])], axis=1)
+    return _finish(y, squeeze)
+
+
+def fft_convolve(x: np.ndarray, h: np.ndarray):
+    """
+    One-shot fft convolution over the whole signal. The signal is only transformed once, no matter how many filter channels there are.
+
+    Args:
+        x (np.ndarray): Mono signal.
+        h (np.ndarray): Filter with shape (M,) or (M, channels).
+
+    Returns:
+        np.ndarray: Full convolution, (N + M - 1,) or (N + M - 1, channels).
+    """
+    h, squeeze = _as_2d(h)
+    n = len(x) + len(h) - 1
+    nfft = sp_fft.next_fast_len(n, real=True)
+    X = sp_fft.rfft(x, nfft)
+    H = sp_fft.rfft(h, nfft, axis=0)
+    y = sp_fft.irfft(X[:, None] * H, nfft, axis=0)[:n]
+    return _finish(y, squeeze)
+
+
+def overlap_add_convolve(x: np.ndarray, h: np.ndarray, block_size: int = None):
+    """
+    Overlap-add convolution. Memory for the ffts stays at the block size instead of the signal length.
+
+    Args:
+        x (np.ndarray): Mono signal.
+        h (np.ndarray): Filter with shape (M,) or (M, channels).
+        block_size (int, optional): Input samples per block. Defaults to None (see block_fft_size).
+
+    Returns:
+        np.ndarray: Full convolution, (N + M - 1,) or (N + M - 1, channels).
+    """
+    h, squeeze = _as_2d(h)
+    n_filter = len(h)
+    nfft = block_fft_size(n_filter, block_size)
+    hop = nfft - n_filter + 1
+    H = sp_fft.rfft(h, nfft, axis=0)
+
+    y = np.zeros((len(x) + n_filter - 1, h.shape[1]), dtype=np.result_type(x, h))
+    for start in range(0, len(x), hop):
+        Y = sp_fft.irfft(sp_fft.rfft(x[start : start + hop], nfft)[:, None] * H, nfft, axis=0)
+        end = min(start + nfft, len(y))
+        y[start:end] += Y[: end - start]
+    return _finish(y, squeeze)
+
+
+class OverlapSaveConvolver(object):
+    """
+    Stateful overlap-save convolver. Feed it blocks of any length with process() and it returns the same number of output samples, carrying the filter history between calls.
+    Call flush() at the end to get the filter tail. Runs at the filter's precision (float32 filters stay float32, anything else is float64).
+
+    Args:
+        h (np.ndarray): Filter with shape (M,) or (M, channels).
+        block_size (int, optional): Input samples per fft. Defaults to None (see block_fft_size).
+    """
+
+    def __init__(self, h: np.ndarray, block_size: int = None):
+        h, self._squeeze = _as_2d(h)
+        self.dtype = np.float32 if h.dtype == np.float32 else np.float64
+        self.filter_length = len(h)
+        self.channels = h.shape[1]
+        self.fft_size = block_fft_size(self.filter_length, block_size)
+        self.hop = self.fft_size - self.filter_length + 1
+        self.set_filter(h)
+        self.reset()
+
+    def set_filter(self, h: np.ndarray):
+        """
+        Swaps the filter without dropping the input history. The new filter must have the same length and channel count.
+        """
+        h, _ = _as_2d(h)
+        if h.shape != (self.filter_length, self.channels):
+            raise ValueError(
+                "Filter shape {0} does not match {1}.".format(
+                    h.shape, (self.filter_length, self.channels)
+                )
+            )
+        self.H = sp_fft.rfft(np.asarray(h, dtype=self.dtype), self.fft_size, axis=0)
+
+    def reset(self):
+        """
+        Clears the input history.
+        """
+        self._history = np.zeros(self.filter_length - 1, dtype=self.dtype)
+
+    def process(self, block: np.ndarray):
+        """
+        Convolves the next block of input.
+
+        Args:
+            block (np.ndarray): Mono input block.
+
+        Returns:
+            np.ndarray: Output block, (len(block),) or (len(block), channels).
+        """
+        block = np.asarray(block, dtype=self.dtype)
+        out = np.empty((len(block), self.channels), dtype=self.dtype)
+        keep = self.filter_length - 1
+        for start in range(0, len(block), self.hop):
+            segment = block[start : start + self.hop]
+            buffer = np.concatenate([self._history, segment])
+            Y = sp_fft.irfft(sp_fft.rfft(buffer, self.fft_size)[:, None] * self.H, self.fft_size, axis=0)
+            # the first M-1 samples are wrapped around by the circular convolution, the rest are exact
+            out[start : start + len(segment)] = Y[keep : keep + len(segment)]
+            self._history = buffer[len(buffer) - keep :]
+        return _finish(out, self._squeeze)
+
+    def flush(self):
+        """
+        Returns the last M-1 samples (the filter tail) and clears the history.
+        """
+        tail = self.process(np.zeros(self.filter_length - 1, dtype=self.dtype))
+        self.reset()
+        return tail
+
+
+class CrossfadeConvolver(object):
+    """
+    Overlap-save convolver for filters that change while it runs (moving sources, head tracking).
+    Filters are given as spectra (e.g. from hrtf_spectra.SpectraStore). When the filter changes, the next block is convolved with both
+    the old and the new filter and crossfaded with a raised cosine, so switching doesn't click or zipper.
+
+    Args:
+        fft_size (int): fft size the filter spectra were computed at.
+        filter_length (int): Filter length (N) the spectra were computed from.
+        channels (int, optional): Number of filter channels. Defaults to 2.
+    """
+
+    def __init__(self, fft_size: int, filter_length: int, channels: int = 2):
+        self.fft_size = int(fft_size)
+        self.filter_length = int(filter_length)
+        self.channels = int(channels)
+        self.hop = self.fft_size - self.filter_length + 1
+        self.H = None
+        self._pending_H = None
+        self._fades = {}  # <- block length -> fade-in curve
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the input history. The current filter is kept.
+        """
+        self._history = np.zeros(self.filter_length - 1)
+
+    def set_filter_spectrum(self, H: np.ndarray):
+        """
+        Sets the filter for the next block. The first filter applies straight away, later ones are crossfaded in over the next block.
+
+        Args:
+            H (np.ndarray): Filter spectra with shape (fft_size // 2 + 1, channels).
+        """
+        if self.H is None:
+            self.H = H
+        else:
+            self._pending_H = H
+
+    def _fade_in(self, n: int):
+        if n not in self._fades:
+            self._fades[n] = (0.5 - 0.5 * np.cos(np.pi * (np.arange(n) + 0.5) / n))[:, None]
+        return self._fades[n]
+
+    def process(self, block: np.ndarray):
+        """
+        Convolves the next block of input.
+
+        Args:
+            block (np.ndarray): Mono input block, at most hop samples long.
+
+        Returns:
+            np.ndarray: Output block with shape (len(block), channels).
+        """
+        n = len(block)
+        if n > self.hop:
+            raise ValueError("Block of {0} samples is longer than the hop size {1}.".format(n, self.hop))
+        keep = self.filter_length - 1
+        buffer = np.concatenate([self._history, np.asarray(block, dtype=float)])
+        X = sp_fft.rfft(buffer, self.fft_size)[:, None]
+        out = sp_fft.irfft(X * self.H, self.fft_size, axis=0)[keep : keep + n]
+        if self._pending_H is not None:
+            new_out = sp_fft.irfft(X * self._pending_H, self.fft_size, axis=0)[keep : keep + n]
+            fade_in = self._fade_in(n)
+            out = out * (1 - fade_in) + new_out * fade_in
+            self.H = self._pending_H
+            self._pending_H = None
+        self._history = buffer[len(buffer) - keep :]
+        return out
+
+
+def partition_spectra(h: np.ndarray, block_size: int):
+    """
+    Splits filters into block_size long partitions and takes the spectrum of each, for PartitionedConvolver.
+
+    Args:
+        h (np.ndarray): Filters with shape (..., N).
+        block_size (int): Partition length.
+
+    Returns:
+        np.ndarray: Spectra with shape (..., partitions, block_size + 1), partitions = ceil(N / block_size).
+    """
+    h = np.asarray(h)
+    block_size = int(block_size)
+    partitions = max(1, -(-h.shape[-1] // block_size))
+    padded = np.zeros(h.shape[:-1] + (partitions * block_size,), dtype=h.dtype)
+    padded[..., : h.shape[-1]] = h
+    blocks = padded.reshape(h.shape[:-1] + (partitions, block_size))
+    return sp_fft.rfft(blocks, 2 * block_size, axis=-1)
+
+
+class PartitionedConvolver(CrossfadeConvolver):
+    """
+    Uniformly partitioned overlap-save convolver, for real time. The filter is cut into block_size long partitions and the past input
+    spectra are kept in a frequency-domain delay line, so the latency is one block whatever the filter length, and each block costs
+    one forward and one inverse fft of 2 * block_size. Filter changes are crossfaded over one block like in CrossfadeConvolver.
+
+    Args:
+        block_size (int): Samples per block (and partition length).
+        partitions (int): Number of partitions of the filter.
+        channels (int, optional): Number of filter channels. Defaults to 2.
+        dtype (np.dtype, optional): Processing dtype of the input buffer (see precision.py). Defaults to np.float64.
+    """
+
+    def __init__(self, block_size: int, partitions: int, channels: int = 2, dtype=np.float64):
+        self.block_size = int(block_size)
+        self.partitions = int(partitions)
+        self.dtype = np.dtype(dtype)
+        super(PartitionedConvolver, self).__init__(2 * self.block_size, self.partitions * self.block_size, channels)
+        self.hop = self.block_size
+
+    def reset(self):
+        """
+        Clears the input history and the delay line. The current filter is kept.
+        """
+        self._buffer = np.zeros(self.fft_size, dtype=self.dtype)
+        self._fdl = np.zeros((self.partitions, self.fft_size // 2 + 1), dtype=np.result_type(self.dtype, np.complex64))
+
+    def set_filter_spectrum(self, H: np.ndarray):
+        """
+        Sets the filter for the next block. The first filter applies straight away, later ones are crossfaded in over the next block.
+
+        Args:
+            H (np.ndarray): Partition spectra with shape (partitions, block_size + 1, channels), e.g. from partition_spectra().
+        """
+        super(PartitionedConvolver, self).set_filter_spectrum(H)
+
+    def process(self, block: np.ndarray):
+        """
+        Convolves the next block of input.
+
+        Args:
+            block (np.ndarray): Mono input block, block_size samples long. Only the last block of a stream should be shorter,
+                since it's zero-padded to block_size.
+
+        Returns:
+            np.ndarray: Output block with shape (len(block), channels).
+        """
+        n = len(block)
+        B = self.block_size
+        if n > B:
+            raise ValueError("Block of {0} samples is longer than the block size {1}.".format(n, B))
+        # slide the input by one block, newest input spectrum goes to the front of the delay line
+        self._buffer[:B] = self._buffer[B:]
+        self._buffer[B : B + n] = block
+        self._buffer[B + n :] = 0
+        self._fdl[1:] = self._fdl[:-1]
+        self._fdl[0] = sp_fft.rfft(self._buffer)
+        out = sp_fft.irfft(np.einsum("pf,pfc->fc", self._fdl, self.H), self.fft_size, axis=0)[B : B + n]
+        if self._pending_H is not None:
+            new_out = sp_fft.irfft(np.einsum("pf,pfc->fc", self._fdl, self._pending_H), self.fft_size, axis=0)[B : B + n]
+            fade_in = self._fade_in(n).astype(out.dtype, copy=False)  # <- float32 stays float32
+            out = out * (1 - fade_in) + new_out * fade_in
+            self.H = self._pending_H
+            self._pending_H = None
+        return out
+
+
+def overlap_save_convolve(x: np.ndarray, h: np.ndarray, block_size: int = None):
+    """
+    Overlap-save convolution. Memory for the ffts stays at the block size instead of the signal length.
+
+    Args:
+        x (np.ndarray): Mono signal.
+        h (np.ndarray): Filter with shape (M,) or (M, channels).
+        block_size (int, optional): Input samples per block. Defaults to None (see block_fft_size).
+
+    Returns:
+        np.ndarray: Full convolution, (N + M - 1,) or (N + M - 1, channels).
+    """
+    convolver = OverlapSaveConvolver(h, block_size)
+    return np.concatenate([convolver.process(x), convolver.flush()])
+
+
+def _direct_cost(n_signal: int, n_filter: int, channels: int):
+    return DIRECT_COST_PER_MAC * n_signal * n_filter * channels
+
+
+def _fft_backend_cost(n_signal: int, n_filter: int, channels: int):
+    nfft = sp_fft.next_fast_len(n_signal + n_filter - 1, real=True)
+    # one forward transform of the signal, then one forward (filter) and one inverse per channel
+    return _fft_cost(nfft) * (1 + 2 * channels) / 2
+
+
+def _block_backend_cost(n_signal: int, n_filter: int, channels: int):
+    nfft = block_fft_size(n_filter)
+    hop = nfft - n_filter + 1
+    n_blocks = math.ceil((n_signal + n_filter - 1) / hop)
+    return n_blocks * (_fft_cost(nfft) * (1 + channels) / 2 + BLOCK_OVERHEAD) + _fft_cost(nfft) * channels / 2
+
+
+def register_backend(name: str, convolve_function, cost_function, auto: bool = True):
+    """
+    Adds (or replaces) a convolution backend.
+
+    Args:
+        name (str): Name to select the backend by.
+        convolve_function (function): Takes (x, h) and returns the full convolution, same layout as fft_convolve.
+        cost_function (function): Takes (signal length, filter length, channels) and returns an estimated cost, in the same units as the built-in backends.
+        auto (bool, optional): Let method="auto" pick it. Defaults to True.
+    """
+    BACKENDS[name] = (convolve_function, cost_function)
+    if auto:
+        AUTO_METHODS.add(name)
+    else:
+        AUTO_METHODS.discard(name)
+
+
+register_backend("direct", direct_convolve, _direct_cost)
+register_backend("fft", fft_convolve, _fft_backend_cost)
+register_backend("overlap_add", overlap_add_convolve, _block_backend_cost)
+# overlap-save does the same ffts as overlap-add, but goes through OverlapSaveConvolver, which copies its history into every block.
+# for a whole signal in one call it came out 5-30% slower than overlap-add in benchmarks/bench_convolution.py, so auto never picks it.
+# it stays selectable by name; its stateful form (OverlapSaveConvolver) is what streaming.py renders block by block with.
+register_backend("overlap_save", overlap_save_convolve, _block_backend_cost, auto=False)
+
+
+def choose_method(n_signal: int, n_filter: int, channels: int = 1):
+    """
+    Picks the cheapest backend for the given lengths, out of AUTO_METHODS.
+
+    Args:
+        n_signal (int): Signal length.
+        n_filter (int): Filter length.
+        channels (int, optional): Number of filter channels. Defaults to 1.
+
+    Returns:
+        str: Name of the backend.
+    """
+    costs = {
+        name: cost_function(n_signal, n_filter, channels)
+        for name, (convolve_function, cost_function) in BACKENDS.items()
+        if name in AUTO_METHODS
+    }
+    return min(costs, key=costs.get)
+
+
+def estimate_cost(n_signal: int, n_filter: int, channels: int = 1, method: str = "auto"):
+    """
+    Estimates what a convolution would cost, in the units of the backends' cost functions.
+
+    Args:
+        n_signal (int): Signal length.
+        n_filter (int): Filter length.
+        channels (int, optional): Number of filter channels. Defaults to 1.
+        method (str, optional): Name of a backend in BACKENDS, or "auto" for the one convolve() would pick. Defaults to "auto".
+
+    Returns:
+        float: Estimated cost.
+    """
+    if method == "auto":
+        method = choose_method(n_signal, n_filter, channels)
+    return BACKENDS[method][1](n_signal, n_filter, channels)
+
+
+def convolve(x: np.ndarray, h: np.ndarray, method: str = "auto"):
+    """
+    Full linear convolution of a mono signal with a (possibly multichannel) filter.
+
+    Args:
+        x (np.ndarray): Mono signal.
+        h (np.ndarray): Filter with shape (M,) or (M, channels).
+        method (str, optional): Name of a backend in BACKENDS, or "auto" to pick the cheapest. Defaults to "auto".
+
+    Returns:
+        np.ndarray: Full convolution, (N + M - 1,) or (N + M - 1, channels).
+        str: Name of the backend that was used.
+    """
+    # a common dtype up front, so a float32 signal isn't silently promoted by a float64 filter (or the other way round)
+    dtype = np.result_type(x, h, np.float32)
+    x = np.asarray(x, dtype=dtype)
+    h = np.asarray(h, dtype=dtype)
+    if method == "auto":
+        channels = h.shape[1] if h.ndim > 1 else 1
+        method = choose_method(len(x), len(h), channels)
+    if method not in BACKENDS:
+        raise ValueError(
+            "Unknown convolution method: {0}. Expected one of: {1}".format(
+                method, ", ".join(["auto"] + list(BACKENDS))
+            )
+        )
+    return BACKENDS[method][0](x, h), method
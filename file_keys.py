@@ -0,0 +1,20 @@
+# cache keys for files on disk, shared by every per-file cache (sofa_cache, audio_cache, hrir_cache, hrtf_spectra, ...).
+# a file is keyed by absolute path + mtime + size, so one that's been overwritten on disk gets a new key and its stale entries get dropped.
+# kept on its own so caches that have nothing to do with SOFA files (audio_cache) don't have to import sofa_cache for it.
+
+import os  # <- file stats
+
+
+def file_key(path: str):
+    """
+    Builds the key a file is cached under, so every per-file cache follows the same invalidation rules.
+
+    Args:
+        path (str): Path to file.
+
+    Returns:
+        tuple: (absolute path, mtime in ns, size in bytes)
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,306 @@
+# headless export of SOFA graphs: source positions, plus the HRIR and HRTF plots for every measurement (or a chosen subset).
+# draws on matplotlib's Agg canvas directly (no pyplot, no gui backend), and spreads the measurements across worker processes.
+# each worker loads the SOFA file once and builds its figures once; every measurement after that only swaps the line data and saves.
+#
+#   python graph_export.py subject.sofa --out graphs
+#   python graph_export.py subject.sofa --out graphs --measurements 0:100 --formats png svg --workers 8
+
+import os  # <- directories, cpu count
+import sys  # <- exit codes
+import time  # <- throughput
+import argparse  # <- cli
+from concurrent.futures import ProcessPoolExecutor, as_completed  # <- process pool
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+FORMATS = ("png", "svg")
+DEFAULT_XLIM = (20, 20000)  # <- same defaults as the gui
+DEFAULT_YLIM = (-150, 0)
+
+_worker = None  # <- this process's GraphWorker, see _init_worker
+
+
+def parse_measurements(spec: str, n_measurements: int):
+    """
+    Parses a measurement selection. Accepts "all", a single index ("5"), a comma separated list ("0,5,10"), or a range as start:stop[:step] (stop excluded), or any mix of those separated by commas.
+
+    Args:
+        spec (str): Measurement spec.
+        n_measurements (int): Number of measurements in the file (M).
+
+    Returns:
+        list: Measurement indices, sorted and without duplicates.
+    """
+    spec = str(spec).replace(" ", "")
+    if spec in ("", "all"):
+        return list(range(n_measurements))
+    indices = set()
+    for part in spec.split(","):
+        if not part:
+            continue
+        if ":" in part:
+            bounds = [int(b) if b else None for b in part.split(":")]
+            indices.update(range(n_measurements)[slice(*bounds)])
+        else:
+            indices.add(int(part))
+    out_of_range = [i for i in indices if not 0 <= i < n_measurements]
+    if out_of_range:
+        raise ValueError(
+            "Measurement(s) {0} out of range; the file has {1}.".format(sorted(out_of_range)[:5], n_measurements)
+        )
+    return sorted(indices)
+
+
+class GraphWorker(object):
+    """
+    One loaded SOFA file and the figures that get reused for every measurement exported from it.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        out_dir (str): Directory to write graphs to.
+        emitter (int, optional): Emitter to plot. Defaults to 0.
+        xlim (tuple, optional): HRTF frequency bounds in Hz. Defaults to DEFAULT_XLIM.
+        ylim (tuple, optional): HRTF magnitude bounds in dB. Defaults to DEFAULT_YLIM.
+        formats (tuple, optional): File formats to save, any of FORMATS. Defaults to ("png",).
+        dpi (int, optional): Resolution of raster formats. Defaults to 100.
+    """
+
+    def __init__(
+        self,
+        in_sofa_file: str,
+        out_dir: str,
+        emitter: int = 0,
+        xlim=DEFAULT_XLIM,
+        ylim=DEFAULT_YLIM,
+        formats=("png",),
+        dpi: int = 100,
+    ):
+        from matplotlib.figure import Figure  # <- no pyplot, so nothing here touches a gui backend
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        import sofa_store
+        import hrir_cache
+        import hrtf_spectra
+
+        self.in_sofa_file = in_sofa_file
+        self.name = os.path.basename(in_sofa_file)
+        self.out_dir = out_dir
+        self.formats = tuple(formats)
+        self.dpi = dpi
+        self._Figure = Figure
+        self._FigureCanvasAgg = FigureCanvasAgg
+
+        self.ir = hrir_cache.get_hrirs(in_sofa_file)  # <- (M, R, E, N), read once
+        self.positions = sofa_store.source_positions(in_sofa_file, "cartesian")
+        self.magnitudes = hrtf_spectra.get_magnitudes(in_sofa_file)  # <- (M, R, E, F), transformed once
+        self.emitter = 0 if self.ir.shape[2] == 1 else int(emitter)  # <- same rule as MagnitudeStore.magnitude
+        self.emitter_label = int(emitter)
+        fs = sofa_store.sampling_rate(in_sofa_file)
+        receivers = self.ir.shape[1]
+        legend = ["Receiver {0}".format(receiver) for receiver in range(receivers)]
+
+        # HRIR figure: one line per receiver, data swapped per measurement
+        self.hrir_fig = self._new_figure((15, 5))
+        self.hrir_ax = self.hrir_fig.add_subplot(111)
+        t = np.arange(self.ir.shape[-1]) / fs
+        self.hrir_lines = [self.hrir_ax.plot(t, np.zeros_like(t))[0] for _ in range(receivers)]
+        self.hrir_ax.legend(legend)
+        self.hrir_ax.set_xlabel("$t$ in s")
+        self.hrir_ax.set_ylabel(r"$h(t)$")
+        self.hrir_ax.grid()
+
+        # HRTF figure: same idea, on fixed bounds
+        self.hrtf_fig = self._new_figure((15, 5))
+        self.hrtf_ax = self.hrtf_fig.add_subplot(111)
+        f_axis = self.magnitudes.f_axis
+        self.hrtf_lines = [self.hrtf_ax.semilogx(f_axis, np.zeros_like(f_axis))[0] for _ in range(receivers)]
+        self.hrtf_ax.set_xlim(list(xlim))
+        self.hrtf_ax.set_ylim(list(ylim))
+        self.hrtf_ax.grid()
+        self.hrtf_ax.grid(which="minor", color="0.9")
+        self.hrtf_ax.set_xlabel("Frequency (Hz)")
+        self.hrtf_ax.set_ylabel("Magnitude (dB)")
+        self.hrtf_ax.legend(legend)
+
+    def _new_figure(self, figsize):
+        fig = self._Figure(figsize=figsize)
+        self._FigureCanvasAgg(fig)
+        return fig
+
+    def _save(self, fig, stem: str):
+        written = []
+        for fmt in self.formats:
+            path = os.path.join(self.out_dir, stem + "." + fmt)
+            fig.savefig(path, format=fmt, dpi=self.dpi)
+            written.append(path)
+        return written
+
+    def export_positions(self):
+        """
+        Saves the source positions plot (the same for every measurement, so it's only saved once).
+
+        Returns:
+            list: Paths of the written files.
+        """
+        fig = self._new_figure((10, 7))
+        ax = fig.add_subplot(111, projection="3d")
+        x0 = self.positions
+        ax.quiver(x0[:, 0], x0[:, 1], x0[:, 2], x0[:, 0], x0[:, 1], x0[:, 2], length=0.1)
+        ax.set_xlabel("x (m)")
+        ax.set_ylabel("y (m)")
+        ax.set_title("Source positions for: " + self.name)
+        return self._save(fig, "SOFA_Source_Positions_for_" + self.name.replace(" ", "_"))
+
+    def export_measurement(self, M_idx: int):
+        """
+        Saves the HRIR and HRTF plots for one measurement.
+
+        Args:
+            M_idx (int): Measurement index.
+
+        Returns:
+            list: Paths of the written files.
+        """
+        file_label = self.name.replace(" ", "_")
+        for line, hrir in zip(self.hrir_lines, self.ir[M_idx, :, self.emitter, :]):
+            line.set_ydata(hrir)
+        self.hrir_ax.relim()
+        self.hrir_ax.autoscale_view()
+        self.hrir_ax.set_title(
+            "{0}: HRIR at M={1} for emitter {2}".format(self.name, M_idx, self.emitter_label)
+        )
+        written = self._save(
+            self.hrir_fig,
+            "Head-Related_Impulse_Response_at_M={0}_E={1}_for_{2}".format(M_idx, self.emitter_label, file_label),
+        )
+
+        for line, magnitude in zip(self.hrtf_lines, self.magnitudes.magnitude(M_idx, self.emitter).T):
+            line.set_ydata(magnitude)
+        self.hrtf_ax.set_title(
+            "{0}: HRTF at M={1} for emitter {2}".format(self.name, M_idx, self.emitter_label)
+        )
+        written.extend(
+            self._save(
+                self.hrtf_fig,
+                "Head-Related_Transfer_Function_at_M={0}_E={1}_for_{2}".format(M_idx, self.emitter_label, file_label),
+            )
+        )
+        return written
+
+
+def _init_worker(*args):
+    # runs once per worker process: load the file and build the figures
+    global _worker
+    _worker = GraphWorker(*args)
+
+
+def _export_chunk(M_indices: list, positions: bool = False):
+    written = _worker.export_positions() if positions else []
+    for M_idx in M_indices:
+        written.extend(_worker.export_measurement(M_idx))
+    return written
+
+
+def export_graphs(
+    in_sofa_file: str,
+    out_dir: str,
+    measurements: list = None,
+    emitter: int = 0,
+    xlim=DEFAULT_XLIM,
+    ylim=DEFAULT_YLIM,
+    formats=("png",),
+    workers: int = None,
+    dpi: int = 100,
+    verbose: bool = True,
+):
+    """
+    Exports the source positions plot, and the HRIR and HRTF plots of the given measurements, across a process pool.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        out_dir (str): Directory to write graphs to. Created if it doesn't exist.
+        measurements (list, optional): Measurement indices to export. Defaults to None (all of them).
+        emitter (int, optional): Emitter to plot. Defaults to 0.
+        xlim (tuple, optional): HRTF frequency bounds in Hz. Defaults to DEFAULT_XLIM.
+        ylim (tuple, optional): HRTF magnitude bounds in dB. Defaults to DEFAULT_YLIM.
+        formats (tuple, optional): File formats to save, any of FORMATS. Defaults to ("png",).
+        workers (int, optional): Number of worker processes. Defaults to the cpu count.
+        dpi (int, optional): Resolution of raster formats. Defaults to 100.
+        verbose (bool, optional): Print progress and throughput. Defaults to True.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    import sofa_store
+    import hrir_cache
+
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError("Unknown format(s): {0}. Expected any of: {1}".format(", ".join(unknown), ", ".join(FORMATS)))
+    dims = sofa_store.dimensions(in_sofa_file)
+    # checked here, so a bad emitter fails once up front instead of in every worker after the pool has started
+    hrir_cache.resolve_channels((dims["M"], dims["R"], dims["E"], dims["N"]), None, emitter)
+    if measurements is None:
+        measurements = list(range(dims["M"]))
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(measurements) or 1))
+
+    # a few chunks per worker, so the pool stays busy without paying for a task per image
+    n_chunks = max(1, min(len(measurements), workers * 4))
+    chunks = [[int(M_idx) for M_idx in chunk] for chunk in np.array_split(measurements, n_chunks)]
+
+    written = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(in_sofa_file, out_dir, emitter, tuple(xlim), tuple(ylim), tuple(formats), dpi),
+    ) as pool:
+        futures = [pool.submit(_export_chunk, chunk, index == 0) for index, chunk in enumerate(chunks)]
+        for future in as_completed(futures):
+            written.extend(future.result())
+            if verbose:
+                print("{0} files written".format(len(written)))
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(
+            "exported {0} measurements ({1} files) in {2:.2f} s with {3} workers".format(
+                len(measurements), len(written), elapsed, workers
+            )
+        )
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export SOFA graphs (source positions, HRIR, HRTF) without the gui.")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("--out", default=None, help="output directory (default: [sofa file]-measurements next to it)")
+    parser.add_argument("--measurements", default="all", help='e.g. "all", "5", "0,5,10" or "0:100:2"')
+    parser.add_argument("--emitter", type=int, default=0, help="emitter (default: 0)")
+    parser.add_argument("--xlim", default="20,20000", help="HRTF frequency bounds in Hz (default: 20,20000)")
+    parser.add_argument("--ylim", default="-150,0", help="HRTF magnitude bounds in dB (default: -150,0)")
+    parser.add_argument("--formats", nargs="+", default=["png"], choices=FORMATS, help="file formats (default: png)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: cpu count)")
+    parser.add_argument("--dpi", type=int, default=100, help="resolution of png files (default: 100)")
+    args = parser.parse_args(argv)
+
+    import sofa_store
+
+    out_dir = args.out or os.path.abspath(args.sofa) + "-measurements"
+    measurements = parse_measurements(args.measurements, sofa_store.dimensions(args.sofa)["M"])
+    export_graphs(
+        args.sofa,
+        out_dir,
+        measurements,
+        emitter=args.emitter,
+        xlim=tuple(float(v) for v in args.xlim.split(",")),
+        ylim=tuple(float(v) for v in args.ylim.split(",")),
+        formats=args.formats,
+        workers=args.workers,
+        dpi=args.dpi,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
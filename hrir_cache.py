@@ -0,0 +1,177 @@
+# process-wide cache of resampled impulse responses, per SOFA file and target sampling rate.
+# rendering used to resample the chosen HRIR pair on every call, so 500 positions meant 500 resamples of the same file.
+# here the whole Data.IR tensor gets resampled once, in one vectorized call, and every later render just indexes into it.
+# entries are keyed like sofa_cache (path + mtime + size), and the least recently used ones get dropped past MAX_HRIR_BYTES.
+# files with a compiled store (see sofa_store.py) at the rate asked for skip the cache entirely: the store's memory map is handed out as is.
+
+import os  # <- absolute paths for invalidation
+import threading  # <- the cache can be hit from worker threads
+from collections import OrderedDict  # <- lru ordering
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+import sofa_cache  # <- cached SOFA handles
+import sofa_store  # <- compiled stores
+import sofa_render  # <- resampling
+
+MAX_HRIR_BYTES = 256 * 1024 * 1024  # <- total size of cached tensors before the least recently used ones get dropped
+
+_tensors = OrderedDict()  # <- (file key, fs) -> np.ndarray (M, R, E, N)
+_lock = threading.RLock()
+_hits = 0
+_misses = 0
+
+
+def get_hrirs(in_sofa_file: str, target_fs: int = None):
+    """
+    Returns every impulse response of a SOFA file at a sampling rate, resampling the whole tensor on first use.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        target_fs (int, optional): Sampling rate to resample to. Defaults to None (the file's own rate).
+
+    Returns:
+        np.ndarray: Impulse responses with shape (M, R, E, N) at target_fs. Shared between callers, so it's read-only.
+    """
+    global _hits, _misses
+    store = sofa_store.find_store(in_sofa_file)
+    sofa_fs_H = store.sampling_rate if store is not None else sofa_store.sampling_rate(in_sofa_file)
+    target_fs = int(target_fs or sofa_fs_H)
+    if store is not None and target_fs == sofa_fs_H:
+        return store.ir  # <- already read-only, and costs nothing to keep around
+    file_key = sofa_cache.file_key(in_sofa_file)
+    key = (file_key, target_fs)
+    with _lock:
+        if key in _tensors:
+            _hits += 1
+            _tensors.move_to_end(key)
+            return _tensors[key]
+        _misses += 1
+
+    ir = sofa_render.resample(
+        store.ir if store is not None else sofa_store.ir_tensor(in_sofa_file), sofa_fs_H, target_fs, axis=-1
+    )
+    ir = np.ascontiguousarray(ir)
+    ir.setflags(write=False)
+
+    with _lock:
+        for stale_key in [k for k in _tensors if k[0][0] == file_key[0] and k[0] != file_key]:
+            del _tensors[stale_key]
+        _tensors[key] = ir
+        while len(_tensors) > 1 and sum(t.nbytes for t in _tensors.values()) > MAX_HRIR_BYTES:
+            _tensors.popitem(last=False)
+    return ir
+
+
+def is_cached(in_sofa_file: str, target_fs: int = None):
+    """
+    Says whether get_hrirs() would return straight away, without reading or resampling anything.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        target_fs (int, optional): Sampling rate. Defaults to None (the file's own rate).
+
+    Returns:
+        bool: True if the tensor at target_fs is cached, or comes straight out of a compiled store.
+    """
+    store = sofa_store.find_store(in_sofa_file)
+    sofa_fs_H = store.sampling_rate if store is not None else sofa_store.sampling_rate(in_sofa_file)
+    target_fs = int(target_fs or sofa_fs_H)
+    if store is not None and target_fs == sofa_fs_H:
+        return True
+    with _lock:
+        return (sofa_cache.file_key(in_sofa_file), target_fs) in _tensors
+
+
+def resolve_channels(shape: tuple, receivers=None, emitter: int = 0):
+    """
+    Checks a receiver subset and an emitter against an impulse response tensor.
+
+    Args:
+        shape (tuple): Shape of the tensor, (M, R, E, N).
+        receivers (list, optional): Receiver indices, one output channel each, in that order. Defaults to None (every receiver).
+        emitter (int, optional): Emitter index. Ignored if there's only one (python-sofa does the same for files without an emitter dimension on Data.IR). Defaults to 0.
+
+    Returns:
+        list: Receiver indices.
+        int: Emitter index.
+    """
+    n_receivers, n_emitters = shape[1], shape[2]
+    receivers = list(range(n_receivers)) if receivers is None else [int(receiver) for receiver in receivers]
+    if not receivers:
+        raise ValueError("No receivers given.")
+    bad = [receiver for receiver in receivers if not 0 <= receiver < n_receivers]
+    if bad:
+        raise ValueError(
+            "Receiver(s) {0} out of range: the file has {1} (0 to {2}).".format(
+                ", ".join(str(receiver) for receiver in bad), n_receivers, n_receivers - 1
+            )
+        )
+    emitter = 0 if n_emitters == 1 else int(emitter)
+    if not 0 <= emitter < n_emitters:
+        raise ValueError("Emitter {0} out of range: the file has {1} (0 to {2}).".format(emitter, n_emitters, n_emitters - 1))
+    return receivers, emitter
+
+
+def hrirs(in_sofa_file: str, M_idx: int, receivers=(0, 1), emitter: int = 0, target_fs: int = None):
+    """
+    Impulse responses of any receivers of one emitter for a given measurement, from the cached tensor.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        M_idx (int): Measurement index.
+        receivers (list, optional): Receivers, one output channel each (see resolve_channels). Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter. Defaults to 0.
+        target_fs (int, optional): Sampling rate. Defaults to None (the file's own rate).
+
+    Returns:
+        np.ndarray: Impulse responses with shape (N, len(receivers)).
+    """
+    ir = get_hrirs(in_sofa_file, target_fs)
+    receivers, emitter = resolve_channels(ir.shape, receivers, emitter)
+    return ir[M_idx, receivers, emitter, :].T
+
+
+def hrir_pair(in_sofa_file: str, M_idx: int, target_fs: int = None):
+    """
+    Left (R=0) and right (R=1) impulse responses of the first emitter for a given measurement, from the cached tensor.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        M_idx (int): Measurement index.
+        target_fs (int, optional): Sampling rate. Defaults to None (the file's own rate).
+
+    Returns:
+        np.ndarray: HRIR pair with shape (N, 2).
+    """
+    return hrirs(in_sofa_file, M_idx, (0, 1), 0, target_fs)
+
+
+def invalidate(in_sofa_file: str = None):
+    """
+    Drops cached tensors.
+
+    Args:
+        in_sofa_file (str, optional): Path to SOFA file to drop. Drops every cached tensor if not given.
+    """
+    with _lock:
+        if in_sofa_file is None:
+            _tensors.clear()
+            return
+        path = os.path.abspath(in_sofa_file)
+        for key in [k for k in _tensors if k[0][0] == path]:
+            del _tensors[key]
+
+
+def cache_info():
+    """
+    Returns:
+        dict: hits, misses, cached tensors, and their total size in bytes.
+    """
+    with _lock:
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "tensors": len(_tensors),
+            "nbytes": sum(t.nbytes for t in _tensors.values()),
+        }
@@ -0,0 +1,321 @@
+# HRIR interpolation between measured directions, instead of snapping to the nearest measurement.
+# the measured directions are triangulated once per file (the convex hull of points on the unit sphere is their spherical delaunay triangulation),
+# and a requested direction gets barycentric weights from the triangle it falls in. both the triangulation and the weight lookups are cached.
+# the hull also closes over whatever wasn't measured (e.g. everything below -30deg), with long triangles whose corners can be on opposite
+# sides of the head, so triangles spanning more than MAX_TRIANGLE_SPAN are dropped. directions that fall in one of those gaps
+# are blended along the closest measured edge, or get the nearest measurement.
+#
+# two ways of blending the three HRIRs:
+# - "time": each HRIR's onset delay is taken out, the time-aligned HRIRs are blended, and the blended delay is put back in.
+#   blending HRIRs as-is would comb filter, since each ear's arrival time changes with direction.
+# - "magnitude_phase": magnitudes and unwrapped phases are blended separately.
+# the spectra a blend needs are only computed for the measurements it blends, and only for its method, then kept in one cache shared by
+# every interpolator, so an array set with thousands of long, many-channel measurements never gets transformed as a whole.
+# the least recently used ones get dropped past MAX_SPECTRA_BYTES.
+
+import os  # <- absolute paths for invalidation
+import itertools  # <- interpolator serials
+import threading  # <- the cache can be hit from worker threads
+from collections import OrderedDict  # <- lru ordering
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+from scipy import fft as sp_fft  # <- real ffts, next_fast_len
+from scipy.spatial import ConvexHull, QhullError, cKDTree  # <- triangulation, vertex lookup
+
+import sofa_cache  # <- cached SOFA handles
+import sofa_store  # <- sampling rate & source positions (from a compiled store if there is one)
+import hrir_cache  # <- resampled impulse responses
+import spatial_index  # <- unit vectors
+
+METHODS = ("time", "magnitude_phase")
+ONSET_THRESHOLD = 0.1  # <- onset = first sample at or above 10% (-20dB) of the peak
+MAX_CACHED_INTERPOLATORS = 8
+MAX_CACHED_WEIGHTS = 65536
+WEIGHT_CACHE_RESOLUTION = 0.01  # <- directions closer than this (in deg) share a weight lookup
+MAX_TRIANGLE_SPAN = 30.0  # <- triangles with an edge longer than this (in deg) bridge a gap in the measurement grid...
+MAX_SPAN_FACTOR = 3.0  # <- ...unless the grid is so sparse that this many times its median spacing is longer still
+MAX_SPECTRA_BYTES = 64 * 1024 * 1024  # <- total size of cached per-measurement spectra, across every interpolator
+
+_interpolators = OrderedDict()  # <- (file key, fs) -> HRIRInterpolator
+_spectra = OrderedDict()  # <- (interpolator serial, method, M) -> (dict of arrays, bytes)
+_spectra_bytes = 0
+_serials = itertools.count()
+_lock = threading.RLock()
+
+
+def _normalized(weights: np.ndarray):
+    weights = np.clip(weights, 0, None)  # <- rounding can leave a corner a hair below zero on an edge
+    return weights / weights.sum()
+
+
+class HRIRInterpolator(object):
+    """
+    Interpolates HRIRs of a SOFA file at any direction.
+
+    Args:
+        ir (np.ndarray): Impulse responses with shape (M, R, E, N).
+        sofa_positions (np.ndarray): Source positions in spherical coordinates, one row per measurement.
+        fs (int): Sampling rate of ir.
+    """
+
+    def __init__(self, ir: np.ndarray, sofa_positions: np.ndarray, fs: int):
+        self.ir = ir
+        self.fs = int(fs)
+        self.filter_length = ir.shape[-1]
+        self.serial = next(_serials)  # <- keys its entries in the spectra cache
+        self.nfft = sp_fft.next_fast_len(2 * self.filter_length, real=True)
+        self.omega = 2 * np.pi * np.arange(self.nfft // 2 + 1) / self.nfft
+
+        # multi-radius sets measure the same direction more than once; interpolation is by direction only, so keep the first of each
+        units = spatial_index.spherical_to_unit(sofa_positions[:, 0], sofa_positions[:, 1])
+        _, first = np.unique(np.round(units, 9), axis=0, return_index=True)
+        self.vertex_measurements = np.sort(first)  # <- vertex -> measurement index
+        self.vertices = units[self.vertex_measurements]
+        self.tree = cKDTree(self.vertices)
+
+        try:
+            self.triangles = ConvexHull(self.vertices).simplices
+        except (QhullError, ValueError):
+            # too few directions, or all of them on one ring (flat), so there's nothing to triangulate
+            self.triangles = None
+        if self.triangles is not None:
+            self.triangles = self._drop_gap_triangles(self.triangles)
+        self.edges = set()
+        if self.triangles is not None:
+            # weights = inverse(triangle corners) @ direction, so keep the inverses around
+            self.inverses = np.linalg.pinv(np.transpose(self.vertices[self.triangles], (0, 2, 1)))
+            self.vertex_triangles = [[] for _ in range(len(self.vertices))]
+            for t, triangle in enumerate(self.triangles):
+                for v in triangle:
+                    self.vertex_triangles[v].append(t)
+                a, b, c = triangle
+                self.edges.update((frozenset((a, b)), frozenset((b, c)), frozenset((a, c))))
+
+        self._weights = OrderedDict()
+        self._weights_lock = threading.Lock()
+
+    def _drop_gap_triangles(self, triangles: np.ndarray):
+        spacing, _ = self.tree.query(self.vertices, k=2)
+        max_chord = max(
+            2 * np.sin(np.radians(MAX_TRIANGLE_SPAN) / 2),  # <- chord length of the angle, since the vertices are unit vectors
+            MAX_SPAN_FACTOR * np.median(spacing[:, 1]),
+        )
+        corners = self.vertices[triangles]  # <- (T, 3 corners, xyz)
+        edges = np.linalg.norm(corners - np.roll(corners, 1, axis=1), axis=-1).max(axis=1)
+        kept = triangles[edges <= max_chord]
+        return kept if len(kept) else None
+
+    def _triangle_weights(self, triangle_ids, unit):
+        w = np.einsum("...ij,...j->...i", self.inverses[triangle_ids], unit)
+        return w
+
+    def _edge_lookup(self, unit: np.ndarray):
+        # outside the measured grid: blend the two closest directions if a kept triangle joins them, otherwise take the closest one
+        _, nearest = self.tree.query(unit, k=min(2, len(self.vertices)))
+        nearest = np.atleast_1d(nearest)
+        if len(nearest) == 2 and frozenset(nearest) in self.edges:
+            a, b = nearest
+            # least squares of unit onto the two directions, i.e. its projection onto the edge's great circle
+            w, _, _, _ = np.linalg.lstsq(self.vertices[[a, b]].T, unit, rcond=None)
+            w = np.clip(w, 0, None)
+            if w.sum() > 0:
+                return np.array([a, b, b]), np.array([w[0], w[1], 0.0]) / w.sum()
+        return np.array([nearest[0]] * 3), np.array([1.0, 0.0, 0.0])
+
+    def _lookup(self, unit: np.ndarray):
+        if self.triangles is None:
+            # fall back to inverse-distance weights between the two closest directions
+            dist, nearest = self.tree.query(unit, k=min(2, len(self.vertices)))
+            nearest = np.atleast_1d(nearest)
+            dist = np.atleast_1d(dist)
+            if dist[0] < 1e-12 or len(nearest) < 2:
+                return np.array([nearest[0]] * 3), np.array([1.0, 0.0, 0.0])
+            w = 1.0 / dist
+            return np.array([nearest[0], nearest[1], nearest[1]]), np.array([w[0], w[1], 0.0]) / w.sum()
+
+        _, nearest = self.tree.query(unit)
+        candidates = self.vertex_triangles[nearest]
+        if candidates:
+            w = self._triangle_weights(candidates, unit)
+            best = int(np.argmax(w.min(axis=1)))
+            if w[best].min() >= -1e-9:
+                return self.triangles[candidates[best]], _normalized(w[best])
+        # the triangle that holds it doesn't touch the nearest vertex (near long thin triangles, or in a gap), so check them all
+        w_all = self._triangle_weights(slice(None), unit)
+        t = int(np.argmax(w_all.min(axis=1)))
+        if w_all[t].min() >= -1e-9:
+            return self.triangles[t], _normalized(w_all[t])
+        # in none of them: it's in a gap of the measurement grid (an unmeasured cap, or a hole)
+        return self._edge_lookup(unit)
+
+    def weights(self, azimuth: float, elevation: float):
+        """
+        Barycentric weights for a direction. Cached.
+
+        Args:
+            azimuth (float): Azimuth in degrees.
+            elevation (float): Elevation in degrees.
+
+        Returns:
+            np.ndarray: The three measurement indices (M) to blend.
+            np.ndarray: Their weights, summing to 1.
+        """
+        key = (
+            round(float(azimuth) % 360 / WEIGHT_CACHE_RESOLUTION),
+            round(float(elevation) / WEIGHT_CACHE_RESOLUTION),
+        )
+        with self._weights_lock:
+            if key in self._weights:
+                self._weights.move_to_end(key)
+                return self._weights[key]
+        triangle, weights = self._lookup(spatial_index.spherical_to_unit(azimuth, elevation))
+        result = (self.vertex_measurements[triangle], weights)
+        with self._weights_lock:
+            self._weights[key] = result
+            while len(self._weights) > MAX_CACHED_WEIGHTS:
+                self._weights.popitem(last=False)
+        return result
+
+    def weights_batch(self, azimuth, elevation):
+        """
+        Barycentric weights for many directions.
+
+        Args:
+            azimuth (np.ndarray): Azimuths in degrees.
+            elevation (np.ndarray): Elevations in degrees.
+
+        Returns:
+            np.ndarray: Measurement indices with shape (directions, 3).
+            np.ndarray: Weights with shape (directions, 3).
+        """
+        azimuth, elevation = np.broadcast_arrays(np.atleast_1d(azimuth), np.atleast_1d(elevation))
+        results = [self.weights(az, el) for az, el in zip(azimuth, elevation)]
+        return np.array([r[0] for r in results]), np.array([r[1] for r in results])
+
+    def _measurement_spectra(self, M_idx: int, method: str):
+        # what blending one measurement with a method needs in the frequency domain, for every receiver & emitter. cached
+        global _spectra_bytes
+        key = (self.serial, method, int(M_idx))
+        with _lock:
+            if key in _spectra:
+                _spectra.move_to_end(key)
+                return _spectra[key][0]
+
+        ir = self.ir[M_idx]  # <- (R, E, N)
+        spectra = sp_fft.rfft(ir, self.nfft, axis=-1)
+        if method == "time":
+            peaks = np.max(np.abs(ir), axis=-1, keepdims=True)
+            onsets = np.argmax(np.abs(ir) >= ONSET_THRESHOLD * peaks, axis=-1)  # <- (R, E)
+            data = {
+                "aligned": spectra * np.exp(1j * self.omega * onsets[..., None]),  # <- onset delay taken out
+                "onsets": onsets,
+            }
+        else:
+            data = {"magnitude": np.abs(spectra), "phase": np.unwrap(np.angle(spectra), axis=-1)}
+        size = sum(array.nbytes for array in data.values())
+
+        with _lock:
+            if key not in _spectra:
+                _spectra[key] = (data, size)
+                _spectra_bytes += size
+            while len(_spectra) > 1 and _spectra_bytes > MAX_SPECTRA_BYTES:
+                _, (_, dropped) = _spectra.popitem(last=False)
+                _spectra_bytes -= dropped
+        return data
+
+    def hrir(
+        self,
+        azimuth: float,
+        elevation: float,
+        receivers=(0, 1),
+        emitter: int = 0,
+        method: str = "time",
+    ):
+        """
+        Interpolated HRIR for a direction.
+
+        Args:
+            azimuth (float): Azimuth in degrees.
+            elevation (float): Elevation in degrees.
+            receivers (tuple, optional): Receivers to return, one output channel each. Defaults to (0, 1) (left, right).
+            emitter (int, optional): Emitter. Defaults to 0.
+            method (str, optional): "time" (time-aligned blending) or "magnitude_phase". Defaults to "time".
+
+        Returns:
+            np.ndarray: HRIR with shape (N, len(receivers)).
+        """
+        if method not in METHODS:
+            raise ValueError(
+                "Unknown interpolation method: {0}. Expected one of: {1}".format(method, ", ".join(METHODS))
+            )
+        M_indices, weights = self.weights(azimuth, elevation)
+        receivers = list(receivers)
+        data = [self._measurement_spectra(M_idx, method) for M_idx in M_indices]
+        w = weights[:, None, None]
+
+        if method == "time":
+            aligned = np.stack([d["aligned"][receivers, emitter] for d in data])  # <- (3, R, F)
+            onsets = np.stack([d["onsets"][receivers, emitter] for d in data])  # <- (3, R)
+            delay = np.sum(weights[:, None] * onsets, axis=0)  # <- (R,), fractional
+            spectrum = np.sum(w * aligned, axis=0) * np.exp(-1j * self.omega * delay[:, None])
+        else:
+            magnitude = np.sum(w * np.stack([d["magnitude"][receivers, emitter] for d in data]), axis=0)
+            phase = np.sum(w * np.stack([d["phase"][receivers, emitter] for d in data]), axis=0)
+            spectrum = magnitude * np.exp(1j * phase)
+
+        return sp_fft.irfft(spectrum, self.nfft, axis=-1)[:, : self.filter_length].T
+
+
+def get_interpolator(in_sofa_file: str, target_fs: int = None):
+    """
+    Returns the interpolator for a SOFA file, triangulating it on first use.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        target_fs (int, optional): Sampling rate to resample the impulse responses to first. Defaults to None (the file's own rate).
+
+    Returns:
+        HRIRInterpolator
+    """
+    sofa_fs_H = sofa_store.sampling_rate(in_sofa_file)
+    target_fs = int(target_fs or sofa_fs_H)
+    file_key = sofa_cache.file_key(in_sofa_file)
+    key = (file_key, target_fs)
+    with _lock:
+        if key in _interpolators:
+            _interpolators.move_to_end(key)
+            return _interpolators[key]
+
+    ir = hrir_cache.get_hrirs(in_sofa_file, target_fs)
+    sofa_positions = sofa_store.source_positions(in_sofa_file, "spherical")
+    interpolator = HRIRInterpolator(ir, sofa_positions, target_fs)
+
+    with _lock:
+        for stale_key in [k for k in _interpolators if k[0][0] == file_key[0] and k[0] != file_key]:
+            del _interpolators[stale_key]
+        _interpolators[key] = interpolator
+        while len(_interpolators) > MAX_CACHED_INTERPOLATORS:
+            _interpolators.popitem(last=False)
+    return interpolator
+
+
+def invalidate(in_sofa_file: str = None):
+    """
+    Drops cached interpolators (and with them, their triangulations, weight lookups and spectra).
+
+    Args:
+        in_sofa_file (str, optional): Path to SOFA file to drop. Drops every cached interpolator if not given.
+    """
+    global _spectra_bytes
+    with _lock:
+        if in_sofa_file is None:
+            _interpolators.clear()
+            _spectra.clear()
+            _spectra_bytes = 0
+            return
+        path = os.path.abspath(in_sofa_file)
+        serials = set()
+        for key in [k for k in _interpolators if k[0][0] == path]:
+            serials.add(_interpolators.pop(key).serial)
+        for key in [k for k in _spectra if k[0] in serials]:
+            _spectra_bytes -= _spectra.pop(key)[1]
@@ -0,0 +1,285 @@
+# precomputed HRTF spectra per SOFA file and fft size, plus a frequency domain render path that only multiplies spectra.
+# every measurement, receiver and emitter is transformed once with one batched rfft, and kept around for the next render.
+# sources get cut into blocks and transformed once too (see SourceBlocks), so rendering the same source at another
+# position is just a multiply and an inverse fft per block (block-wise overlap-add, so memory doesn't scale with fft size x source length).
+# the gui's HRTF plots get their own cached dB magnitude tensor (see MagnitudeStore), so browsing measurements is just slicing.
+# that one is computed a few measurements at a time and kept as float32, and files too big for it are transformed per measurement instead.
+
+import os  # <- absolute paths for invalidation
+import threading  # <- the cache can be hit from worker threads
+from collections import OrderedDict  # <- lru ordering
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+from scipy import fft as sp_fft  # <- real ffts, next_fast_len
+
+import sofa_cache  # <- cached SOFA handles
+import sofa_store  # <- sampling rate (from a compiled store if there is one)
+import convolution  # <- block fft sizes
+import hrir_cache  # <- resampled impulse responses
+
+MAX_SPECTRA_BYTES = 512 * 1024 * 1024  # <- total size of cached spectra before the least recently used ones get dropped
+MAX_MAGNITUDE_BYTES = 256 * 1024 * 1024  # <- same, for the dB magnitude tensors
+MAGNITUDE_OVERSAMPLING = 8  # <- plots zero pad to 8N, for smooth curves
+MAGNITUDE_CHUNK_BYTES = 64 * 1024 * 1024  # <- complex spectra held at once while a magnitude tensor is computed
+
+_stores = OrderedDict()  # <- (file key, fft size, fs) -> SpectraStore
+_magnitudes = OrderedDict()  # <- file key -> MagnitudeStore
+_lock = threading.RLock()
+
+
+def aligned_fft_size(n: int):
+    """
+    Rounds an fft size up to the next size scipy's fft is fast at.
+
+    Args:
+        n (int): Minimum fft size.
+
+    Returns:
+        int: Aligned fft size.
+    """
+    return sp_fft.next_fast_len(int(n), real=True)
+
+
+class SpectraStore(object):
+    """
+    Spectra of every impulse response in a SOFA file, at one fft size.
+
+    Args:
+        ir (np.ndarray): Impulse responses with shape (M, R, E, N).
+        fs (int): Sampling rate of ir.
+        fft_size (int, optional): fft size, aligned with next_fast_len. Defaults to None, which uses the block size convolution.py would pick for this filter length.
+    """
+
+    def __init__(self, ir: np.ndarray, fs: int, fft_size: int = None):
+        self.filter_length = ir.shape[-1]
+        if fft_size is None:
+            fft_size = convolution.block_fft_size(self.filter_length)
+        if fft_size < self.filter_length:
+            raise ValueError(
+                "fft size {0} is shorter than the filter length {1}.".format(
+                    fft_size, self.filter_length
+                )
+            )
+        self.fft_size = aligned_fft_size(fft_size)
+        self.fs = int(fs)
+        self.spectra = sp_fft.rfft(ir, self.fft_size, axis=-1)  # <- (M, R, E, F), all at once
+
+    @property
+    def nbytes(self):
+        return self.spectra.nbytes
+
+    @property
+    def hop(self):
+        """
+        Number of new source samples per block that fit in one fft without wrapping around.
+        """
+        return self.fft_size - self.filter_length + 1
+
+    def transfer_functions(self, M_idx: int, receivers=(0, 1), emitter: int = 0):
+        """
+        Args:
+            M_idx (int): Measurement index.
+            receivers (tuple, optional): Receivers to return, one output channel each. Defaults to (0, 1) (left, right).
+            emitter (int, optional): Emitter. Defaults to 0.
+
+        Returns:
+            np.ndarray: Spectra with shape (F, len(receivers)).
+        """
+        return self.spectra[M_idx, list(receivers), emitter, :].T
+
+
+class SourceBlocks(object):
+    """
+    A mono source cut into blocks and transformed once, ready to be multiplied with any spectra from a SpectraStore of the same fft size.
+
+    Args:
+        source_x (np.ndarray): Mono signal, at the store's sampling rate.
+        store (SpectraStore): Store the source will be rendered against.
+    """
+
+    def __init__(self, source_x: np.ndarray, store: SpectraStore):
+        source_x = np.asarray(source_x, dtype=float)
+        self.length = len(source_x)
+        self.fft_size = store.fft_size
+        self.hop = store.hop
+        self.filter_length = store.filter_length
+        n_blocks = max(1, -(-self.length // self.hop))
+        blocks = np.zeros((n_blocks, self.hop))
+        blocks.reshape(-1)[: self.length] = source_x
+        self.spectra = sp_fft.rfft(blocks, self.fft_size, axis=-1)  # <- (blocks, F)
+
+
+def render_spectral(source_blocks: SourceBlocks, H: np.ndarray):
+    """
+    Frequency domain render: multiplies the source blocks with the given spectra and overlap-adds the result.
+
+    Args:
+        source_blocks (SourceBlocks): Transformed source.
+        H (np.ndarray): Spectra with shape (F, channels), e.g. from SpectraStore.transfer_functions().
+
+    Returns:
+        np.ndarray: Full convolution with shape (source length + N - 1, channels).
+    """
+    blocks = sp_fft.irfft(
+        source_blocks.spectra[:, :, None] * H[None, :, :], source_blocks.fft_size, axis=1
+    )  # <- (blocks, fft size, channels)
+    return overlap_add(blocks, source_blocks.hop)[: source_blocks.length + source_blocks.filter_length - 1]
+
+
+def overlap_add(blocks: np.ndarray, hop: int):
+    """
+    Overlap-adds inverse transformed blocks that start hop samples apart.
+
+    Args:
+        blocks (np.ndarray): Blocks with shape (blocks, fft size, channels).
+        hop (int): Samples between the starts of consecutive blocks.
+
+    Returns:
+        np.ndarray: Summed signal with shape (blocks * hop + spill, channels), where spill covers the last block's tail, rounded up to a whole hop.
+    """
+    n_blocks, fft_size, channels = blocks.shape
+    # each block's first hop samples land on its own slot, the rest spills into the following slots
+    n_spill = -(-(fft_size - hop) // hop)
+    out = np.zeros(((n_blocks + n_spill) * hop, channels))
+    out[: n_blocks * hop] += blocks[:, :hop].reshape(-1, channels)
+    for k in range(n_spill):
+        spill = blocks[:, hop + k * hop : hop + (k + 1) * hop]
+        start = (k + 1) * hop
+        out[start : start + n_blocks * hop].reshape(n_blocks, hop, channels)[:, : spill.shape[1]] += spill
+    return out
+
+
+class MagnitudeStore(object):
+    """
+    dB magnitude of every impulse response in a SOFA file, for plotting and comparing.
+    The whole (M, R, E, F) tensor is computed a few measurements at a time, unless it would go over max_bytes;
+    then each measurement is transformed when it's asked for instead.
+
+    Args:
+        ir (np.ndarray): Impulse responses with shape (M, R, E, N).
+        fs (int): Sampling rate of ir.
+        nfft (int, optional): fft size. Defaults to None (MAGNITUDE_OVERSAMPLING x N).
+        max_bytes (int, optional): Largest tensor to precompute. Defaults to None (MAX_MAGNITUDE_BYTES).
+    """
+
+    def __init__(self, ir: np.ndarray, fs: int, nfft: int = None, max_bytes: int = None):
+        self.nfft = int(nfft or MAGNITUDE_OVERSAMPLING * ir.shape[-1])
+        self.fs = int(fs)
+        self.f_axis = sp_fft.rfftfreq(self.nfft, 1 / self.fs)
+        self.shape = ir.shape[:-1] + (len(self.f_axis),)
+        self.ir = None
+        self.magnitude_db = None
+
+        max_bytes = MAX_MAGNITUDE_BYTES if max_bytes is None else int(max_bytes)
+        if np.prod(self.shape) * np.dtype(np.float32).itemsize > max_bytes:
+            self.ir = ir  # <- per measurement on demand (the tensor itself is hrir_cache's, so it isn't held twice)
+            return
+        self.magnitude_db = np.empty(self.shape, dtype=np.float32)
+        # chunks over M, so the complex spectra never take more than MAGNITUDE_CHUNK_BYTES at once
+        chunk = max(1, MAGNITUDE_CHUNK_BYTES // (int(np.prod(self.shape[1:])) * np.dtype(np.complex128).itemsize))
+        for start in range(0, self.shape[0], chunk):
+            self.magnitude_db[start : start + chunk] = self._transform(ir[start : start + chunk])
+
+    def _transform(self, ir: np.ndarray):
+        spectra = sp_fft.rfft(ir, self.nfft, axis=-1)
+        with np.errstate(divide="ignore"):  # <- exact zeros come out as -inf dB, same as before
+            return (20 * np.log10((2 / self.nfft) * np.abs(spectra))).astype(np.float32)
+
+    @property
+    def nbytes(self):
+        return 0 if self.magnitude_db is None else self.magnitude_db.nbytes
+
+    def magnitude(self, M_idx: int, emitter: int = 0, receivers=None):
+        """
+        Args:
+            M_idx (int): Measurement index.
+            emitter (int, optional): Emitter. Ignored if there's only one (like python-sofa ignores it for files without an emitter dimension on Data.IR). Defaults to 0.
+            receivers (tuple, optional): Receivers to return. Defaults to None (all of them).
+
+        Returns:
+            np.ndarray: Magnitude in dB with shape (F, receivers), as float32.
+        """
+        if self.shape[2] == 1:
+            emitter = 0  # <- so any emitter index works for files with just one
+        receivers = slice(None) if receivers is None else list(receivers)
+        if self.magnitude_db is None:
+            return self._transform(self.ir[M_idx, receivers, emitter, :]).T
+        return self.magnitude_db[M_idx, receivers, emitter, :].T
+
+
+def get_spectra(in_sofa_file: str, fft_size: int = None, target_fs: int = None):
+    """
+    Returns the spectra store for a SOFA file at an fft size, computing it on first use.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        fft_size (int, optional): fft size, aligned with next_fast_len. Defaults to None (see SpectraStore).
+        target_fs (int, optional): Sampling rate to resample the impulse responses to before transforming them. Defaults to None (the file's own rate).
+
+    Returns:
+        SpectraStore: Spectra of every measurement, receiver and emitter.
+    """
+    sofa_fs_H = sofa_store.sampling_rate(in_sofa_file)
+    target_fs = int(target_fs or sofa_fs_H)
+    file_key = sofa_cache.file_key(in_sofa_file)
+    key = (file_key, None if fft_size is None else aligned_fft_size(fft_size), target_fs)
+    with _lock:
+        if key in _stores:
+            _stores.move_to_end(key)
+            return _stores[key]
+
+    store = SpectraStore(hrir_cache.get_hrirs(in_sofa_file, target_fs), target_fs, fft_size)
+
+    with _lock:
+        for stale_key in [k for k in _stores if k[0][0] == file_key[0] and k[0] != file_key]:
+            del _stores[stale_key]
+        _stores[key] = store
+        while len(_stores) > 1 and sum(s.nbytes for s in _stores.values()) > MAX_SPECTRA_BYTES:
+            _stores.popitem(last=False)
+    return store
+
+
+def get_magnitudes(in_sofa_file: str):
+    """
+    Returns the dB magnitude tensor for a SOFA file (at its own sampling rate), computing it on first use.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+
+    Returns:
+        MagnitudeStore: Magnitudes of every measurement, receiver and emitter.
+    """
+    file_key = sofa_cache.file_key(in_sofa_file)
+    with _lock:
+        if file_key in _magnitudes:
+            _magnitudes.move_to_end(file_key)
+            return _magnitudes[file_key]
+
+    store = MagnitudeStore(hrir_cache.get_hrirs(in_sofa_file), sofa_store.sampling_rate(in_sofa_file))
+
+    with _lock:
+        for stale_key in [k for k in _magnitudes if k[0] == file_key[0] and k != file_key]:
+            del _magnitudes[stale_key]
+        _magnitudes[file_key] = store
+        while len(_magnitudes) > 1 and sum(m.nbytes for m in _magnitudes.values()) > MAX_MAGNITUDE_BYTES:
+            _magnitudes.popitem(last=False)
+    return store
+
+
+def invalidate(in_sofa_file: str = None):
+    """
+    Drops cached spectra and magnitudes.
+
+    Args:
+        in_sofa_file (str, optional): Path to SOFA file to drop. Drops every cached store if not given.
+    """
+    with _lock:
+        if in_sofa_file is None:
+            _stores.clear()
+            _magnitudes.clear()
+            return
+        path = os.path.abspath(in_sofa_file)
+        for key in [k for k in _stores if k[0][0] == path]:
+            del _stores[key]
+        for key in [k for k in _magnitudes if k[0] == path]:
+            del _magnitudes[key]
@@ -0,0 +1,230 @@
+# background jobs for the gui. renders, resampling, spectrograms and SOFA loading used to run right in tk's button callbacks,
+# so the whole window froze until they were done. JobExecutor runs them on a thread pool instead, and the ui thread polls them with
+# root.after (tk isn't thread safe, so the work itself never touches widgets): progress and ETA get passed on while a job runs,
+# and its done/error/cancel callback runs on the ui thread once it ends.
+# threads rather than processes: the work is numpy, scipy and netCDF, which release the GIL, and results are big arrays that a process
+# pool would have to pickle back.
+# cancelling is cooperative. a job that reports progress (Job.report) stops at its next report; one that doesn't is left to finish
+# in the background, and its result is thrown away. either way its cancel callback runs straight away.
+# controls are disabled when the first job starts and put back together once the last one's worker has actually stopped (see
+# ControlLock), so a cancelled job that's still running can't end up running alongside the next one.
+
+import time  # <- elapsed time & ETA
+import threading  # <- cancel flag
+from concurrent.futures import ThreadPoolExecutor  # <- workers
+
+DEFAULT_WORKERS = 2
+POLL_MS = 100  # <- how often the ui thread checks on running jobs
+
+
+class Cancelled(Exception):
+    """
+    Raised inside a job's work by Job.report once the job has been cancelled.
+    """
+
+
+class Job(object):
+    """
+    Handle of a submitted job. The work function gets it as its only argument.
+
+    Args:
+        title (str): Shown in progress windows.
+    """
+
+    def __init__(self, title: str):
+        self.title = str(title)
+        self.progress = None  # <- fraction between 0 and 1, once the work reports one
+        self.message = ""
+        self.future = None
+        self.submitted = time.perf_counter()
+        self.started = None
+        self._cancel_event = threading.Event()
+
+    def report(self, fraction: float = None, message: str = None):
+        """
+        Reports progress from the work. Raises Cancelled if the job has been cancelled, so long loops stop here.
+
+        Args:
+            fraction (float, optional): Fraction done, between 0 and 1. Defaults to None (unchanged).
+            message (str, optional): Status text. Defaults to None (unchanged).
+        """
+        if self._cancel_event.is_set():
+            raise Cancelled(self.title)
+        if fraction is not None:
+            self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = str(message)
+
+    def cancel(self):
+        """
+        Asks the job to stop. Safe to call from any thread.
+        """
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()  # <- only works if it hasn't started yet
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - (self.started or self.submitted)
+
+    def eta(self):
+        """
+        Returns:
+            float: Estimated seconds left, from the progress reported so far. None until there's progress to go on.
+        """
+        if self.started is None or not self.progress:
+            return None
+        return self.elapsed * (1.0 - self.progress) / self.progress
+
+
+class JobExecutor(object):
+    """
+    Runs jobs on a thread pool and hands their progress and results back to the ui thread.
+
+    Args:
+        schedule (callable): Calls a function on the ui thread after a delay in ms, i.e. root.after.
+        workers (int, optional): Worker threads. Defaults to DEFAULT_WORKERS.
+        poll_ms (int, optional): Polling interval in ms. Defaults to POLL_MS.
+        on_busy (callable, optional): Called with True when the first job starts and False when the last one ends (e.g. ControlLock.set). Defaults to None.
+    """
+
+    def __init__(self, schedule, workers: int = DEFAULT_WORKERS, poll_ms: int = POLL_MS, on_busy=None):
+        self.schedule = schedule
+        self.poll_ms = int(poll_ms)
+        self.on_busy = on_busy
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="job")
+        self._jobs = []  # <- (job, callbacks), only touched on the ui thread
+        self._stopping = []  # <- cancelled jobs whose work hasn't returned yet
+
+    @property
+    def busy(self):
+        return bool(self._jobs or self._stopping)
+
+    def submit(self, title: str, work, on_done=None, on_error=None, on_cancel=None, on_progress=None):
+        """
+        Starts a job. Call from the ui thread. Every callback runs on the ui thread.
+
+        Args:
+            title (str): Title of the job.
+            work (callable): Called on a worker thread with the Job; its return value goes to on_done.
+            on_done (callable, optional): Called with the result. Defaults to None.
+            on_error (callable, optional): Called with the exception if the work raised one. Defaults to None (re-raised on the ui thread).
+            on_cancel (callable, optional): Called with the Job once it's been cancelled. Defaults to None.
+            on_progress (callable, optional): Called with the Job on every poll while it runs. Defaults to None.
+
+        Returns:
+            Job: Handle to report progress through and cancel with.
+        """
+        job = Job(title)
+
+        def run():
+            job.started = time.perf_counter()
+            job.report()  # <- cancelled before it got a worker
+            return work(job)
+
+        job.future = self._pool.submit(run)
+        was_busy = self.busy
+        self._jobs.append((job, (on_done, on_error, on_cancel, on_progress)))
+        if not was_busy:
+            if self.on_busy is not None:
+                self.on_busy(True)
+            self.schedule(self.poll_ms, self._poll)
+        return job
+
+    def _poll(self):
+        finished = []
+        for entry in list(self._jobs):
+            job, (on_done, on_error, on_cancel, on_progress) = entry
+            if job.cancelled or job.future.done():
+                self._jobs.remove(entry)
+                finished.append(entry)
+                if not job.future.done():
+                    self._stopping.append(job)
+            elif on_progress is not None:
+                on_progress(job)
+        self._stopping = [job for job in self._stopping if not job.future.done()]
+        # controls go back before the callbacks run, so whatever the callbacks enable or disable sticks
+        if not self.busy and self.on_busy is not None:
+            self.on_busy(False)
+        for job, callbacks in finished:
+            self._finish(job, *callbacks)
+        if self.busy:
+            self.schedule(self.poll_ms, self._poll)
+
+    def _finish(self, job: Job, on_done, on_error, on_cancel, on_progress):
+        if job.cancelled:
+            if on_cancel is not None:
+                on_cancel(job)
+            return
+        error = job.future.exception()
+        if isinstance(error, Cancelled):
+            if on_cancel is not None:
+                on_cancel(job)
+        elif error is not None:
+            if on_error is None:
+                raise error
+            on_error(error)
+        elif on_done is not None:
+            on_done(job.future.result())
+
+    def cancel_all(self):
+        for job, _ in list(self._jobs):
+            job.cancel()
+
+    def shutdown(self):
+        """
+        Cancels every job and stops the workers without waiting for them.
+        """
+        self.cancel_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ControlLock(object):
+    """
+    Disables a set of controls as one step and puts each one back in the state it was in.
+
+    Args:
+        controls (list, optional): Widgets with a state option (buttons, entries), or (menu, index) pairs for menu entries. Defaults to ().
+    """
+
+    def __init__(self, controls=()):
+        self.controls = list(controls)
+        self._saved = None
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    @property
+    def locked(self):
+        return self._saved is not None
+
+    def _state(self, control):
+        if isinstance(control, tuple):
+            menu, index = control
+            return str(menu.entrycget(index, "state"))
+        return str(control.cget("state"))
+
+    def _set_state(self, control, state: str):
+        if isinstance(control, tuple):
+            menu, index = control
+            menu.entryconfig(index, state=state)
+        else:
+            control.config(state=state)
+
+    def set(self, locked: bool):
+        """
+        Args:
+            locked (bool): Disable the controls (True) or restore them (False).
+        """
+        if locked and self._saved is None:
+            self._saved = [self._state(control) for control in self.controls]
+            for control in self.controls:
+                self._set_state(control, "disabled")
+        elif not locked and self._saved is not None:
+            for control, state in zip(self.controls, self._saved):
+                self._set_state(control, state)
+            self._saved = None
@@ -0,0 +1,57 @@
+# deferred imports, so main.py can get its window up before the heavy modules (matplotlib, scipy, sofa, pygame, ...) are loaded.
+# lazy_import("matplotlib.pyplot") hands back a stand-in that imports the real module the first time one of its attributes is used,
+# so code like plt.figure() works unchanged. check startup cost with benchmarks/bench_startup.py.
+
+import sys  # <- already imported modules
+import importlib  # <- importing by name
+import threading  # <- first use can come from worker threads
+
+
+class LazyModule(object):
+    """
+    Stand-in for a module that hasn't been imported yet.
+
+    Args:
+        name (str): Full module name, e.g. "scipy.signal".
+    """
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _lazy_load(self):
+        module = self._lazy_module
+        if module is None:
+            with self._lazy_lock:
+                module = self._lazy_module
+                if module is None:
+                    module = importlib.import_module(self._lazy_name)
+                    object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._lazy_load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return "<lazy module '{0}' ({1})>".format(self._lazy_name, state)
+
+
+def lazy_import(name: str):
+    """
+    Returns the module if it's already been imported somewhere, or a stand-in that imports it on first use.
+
+    Args:
+        name (str): Full module name, e.g. "scipy.signal".
+
+    Returns:
+        module or LazyModule
+    """
+    return sys.modules.get(name) or LazyModule(name)
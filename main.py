@@ -8,6 +8,7 @@
 import sys  # <- replacement for pythonic quit(), which doesn't play nicely with cx_freeze
 import os  # <- reading files from disk, adapting to differing os directory path conventions
 import tempfile  # <- adapting to differing os temp file locations
+import time  # <- startup benchmark timestamp
 from unittest.mock import MagicMock # <- trying to get librosa to run without numba so i can use nuitka for compile; see https://github.com/librosa/librosa/issues/1854#event-18920426125
 
 # mock numba module
@@ -31,14 +32,38 @@ os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = (
     "hide"  # <- gets rid of pygame welcome message, which clutters up cli
 )
 
+import shutil  # <- clearing the librosa cache without importing librosa
 import numpy as np  # <- matrix calc & more (but mostly matrix calc)
-import matplotlib.pyplot as plt  # <- data visualization
-import soundfile as sf  # <- read audio into ndarray
-import sofa  # <- read SOFA HRTFs
-import librosa  # <- resample function
-from scipy import signal  # <- fast convolution function
-from scipy.io import wavfile  # <- used for spectrogram
-import pygame  # <- for playing audio files directly
+from lazy_import import lazy_import  # <- heavy modules below only get imported on first use, so the window comes up fast
+
+plt = lazy_import("matplotlib.pyplot")  # <- data visualization
+sf = lazy_import("soundfile")  # <- read audio into ndarray
+sofa_cache = lazy_import("sofa_cache")  # <- read SOFA HRTFs (cached handles, see sofa_cache.py)
+signal = lazy_import("scipy.signal")  # <- fast convolution function
+audio_window = lazy_import("audio_window")  # <- windowed reads for the spectrogram
+spectrogram_pyramid = lazy_import("spectrogram_pyramid")  # <- cached multi-resolution spectrograms for long windows
+pygame = lazy_import("pygame")  # <- for playing audio files directly
+convolution = lazy_import("convolution")  # <- convolution engine, shared with sofa_render.py
+sofa_render = lazy_import("sofa_render")  # <- headless SOFA rendering, shared with batch_render.py
+resampling = lazy_import("resampling")  # <- resampler backends (soxr, polyphase, librosa)
+resample_plan = lazy_import("resample_plan")  # <- picks what gets resampled
+hrtf_spectra = lazy_import("hrtf_spectra")  # <- cached HRTF magnitudes for plotting
+precision = lazy_import("precision")  # <- float32/float64 processing
+scene_render = lazy_import("scene_render")  # <- multi-source scene mixes
+playback = lazy_import("playback")  # <- in-memory playback through one mixer session
+audio_cache = lazy_import("audio_cache")  # <- decoded audio files, shared between the tabs
+sofa_store = lazy_import("sofa_store")  # <- compiled SOFA stores (see sofa_store.py)
+hrir_cache = lazy_import("hrir_cache")  # <- whole HRIR tensors, from a store if there is one
+
+
+def _freezer_hints():
+    # never called. pyinstaller, nuitka and cx_freeze find modules by scanning for import statements,
+    # and lazy_import() hides the ones above from them, so they're listed here to still get bundled.
+    import matplotlib.pyplot, soundfile, sofa_cache, scipy.signal, scipy.io.wavfile, pygame  # noqa: F401
+    import convolution, sofa_render, resampling, hrtf_spectra, audio_window, spectrogram_pyramid, precision, scene_render, playback, audio_cache, resample_plan, sofa_store, hrir_cache  # noqa: F401
+    import librosa  # noqa: F401
+
+
 import tkinter as tk  # <- reliable, if clunky, gui
 from tkinter import (
     ttk,
@@ -46,6 +71,9 @@ from tkinter import (
 from tkinter import filedialog  # <- gui file selection from disk
 from tkinter import font  # <- ensures fonts are system-compatible
 import webbrowser  # <- help page links
+from concurrent.futures import ThreadPoolExecutor, as_completed  # <- loading SOFA files for comparison plots concurrently
+import queue  # <- handing loaded comparison files to the ui thread as they finish
+import jobs  # <- runs long operations off the ui thread
 import sv_ttk  # <- handles ttk
 import darkdetect  # <- detects os light/dark mode
 from base64 import b64decode  # <- decode bitmap image backup for asset
@@ -53,9 +81,9 @@ from base64 import b64decode  # <- decode bitmap image backup for asset
 if sys.platform == "win32":
     import pywinstyles # <- aesthetics on dark mode for windows only
     try:
-        import matplotlib
         import pyi_splash # <- windows-only splash screen (needed for pyinstaller, bc pyinstaller wipes the matplotlib cache everytime the application closes, and cx_freeze doesn't build to windows with python 3.13)
         pyi_splash.close()
+        import matplotlib # <- after pyi_splash, so matplotlib only gets imported this early in pyinstaller builds
         matplotlib.use('TkAgg')
     except:
         pass
@@ -66,9 +94,13 @@ if sys.platform == "darwin":
 if sys.platform == "linux":
     pass
 
-librosa.cache.clear(warn=False)
+# same as librosa.cache.clear(), without importing librosa at startup (it's only a fallback resampler now, see resampling.py)
+shutil.rmtree(os.path.join(os.environ["LIBROSA_CACHE_DIR"], "joblib"), ignore_errors=True)
 
 source_file = None
+SOFA_LOADER_WORKERS = min(8, os.cpu_count() or 1)  # <- threads for loading & transforming SOFA files in comparison plots
+PROGRESS_WINDOW_DELAY = 0.3  # <- seconds a job runs before it gets a progress window, so quick ones don't flash one up
+SPECTROGRAM_MAX_COLUMNS = 2000  # <- spectrograms wider than this (in stft columns) get drawn from a cached pyramid instead
 
 class ToolTip(
     object
@@ -227,6 +259,124 @@ def messageWindow(
     return -1
 
 
+def progressWindow(
+    title: str = "Working...",
+    maximum: int = 100,
+    width: int = 350,
+    height: int = 100,
+):
+    """
+    Creates a progress window. Update it with progress_bar["value"], progress_label.config(text=...) and window.update(), and destroy it when done.
+    For anything long, use runJob instead, which runs the work off the ui thread and keeps one of these up to date.
+
+    Args:
+        title (str, optional): Title of window. Defaults to 'Working...'.
+        maximum (int, optional): Value of a full progress bar. Defaults to 100.
+        width (int, optional): Width of window. Defaults to 350.
+        height (int, optional): Height of window. Defaults to 100.
+
+    Returns:
+        tk.Toplevel: The window.
+        ttk.Progressbar: Its progress bar.
+        ttk.Label: Its label.
+    """
+    progressWindow = tk.Toplevel(root)
+    progressWindow.iconphoto(False, icon_photo)
+    centered_window(progressWindow)
+    progressWindow.title(str(title))
+    progressWindow.geometry(str(width) + "x" + str(height))
+    progressWindow.minsize(width, height)
+    progressLabel = ttk.Label(progressWindow, text="\n", justify="center")
+    progressLabel.pack()
+    progressBar = ttk.Progressbar(
+        progressWindow, orient="horizontal", length=width - 40, mode="determinate", maximum=maximum
+    )
+    progressBar.pack()
+    apply_theme_to_titlebar(progressWindow)
+    progressWindow.update()
+    return progressWindow, progressBar, progressLabel
+
+
+def runJob(title: str, work, on_done=None, on_error=None, progress_text: str = "Working...", on_progress=None):
+    """
+    Runs work off the ui thread (see jobs.py), with the controls disabled until it's done. If it takes a moment, a progress window shows
+    its progress and ETA, and has a cancel button. Only one job runs at a time.
+
+    Args:
+        title (str): Title of the progress window.
+        work (callable): Called on a worker thread with the jobs.Job, which it can report progress through. Must not touch any widgets.
+        on_done (callable, optional): Called on the ui thread with the result of work. Defaults to None.
+        on_error (callable, optional): Called on the ui thread with the exception if work raised one. Defaults to None (shown in an error window).
+        progress_text (str, optional): Text shown until work reports a message of its own. Defaults to "Working...".
+        on_progress (callable, optional): Called on the ui thread with the jobs.Job on every poll while it runs, e.g. to show partial results. Defaults to None.
+
+    Returns:
+        jobs.Job: The job, or None if another one is still running.
+    """
+    if job_executor.busy:
+        errorWindow("Please wait for the current operation\nto finish (or cancel it) first.", width=350, height=140)
+        return None
+
+    window = {}
+
+    def closeProgress():
+        if window and window["window"].winfo_exists():
+            window["window"].destroy()
+        window.clear()
+
+    def showProgress(job):
+        if on_progress is not None:
+            on_progress(job)
+        if not window:
+            if job.elapsed < PROGRESS_WINDOW_DELAY:
+                return
+            progress_window, progress_bar, progress_label = progressWindow(title=title, maximum=1.0, height=150)
+            cancelButton = ttk.Button(
+                progress_window, text="Cancel", style="my.TButton", command=lambda: job.cancel()
+            )
+            cancelButton.pack(pady=10)
+            progress_window.protocol("WM_DELETE_WINDOW", lambda: job.cancel())
+            window.update(window=progress_window, bar=progress_bar, label=progress_label)
+        progress_bar = window["bar"]
+        if job.progress is None:
+            # no progress reported (yet), so just show that it's alive
+            if str(progress_bar.cget("mode")) != "indeterminate":
+                progress_bar.config(mode="indeterminate")
+                progress_bar.start(20)
+            status = "{0:.0f} s".format(job.elapsed)
+        else:
+            if str(progress_bar.cget("mode")) == "indeterminate":
+                progress_bar.stop()
+                progress_bar.config(mode="determinate")
+            progress_bar["value"] = job.progress
+            eta = job.eta()
+            status = "{0:.0%}".format(job.progress)
+            if eta is not None and job.progress < 1:
+                status += ", about {0:.0f} s left".format(eta)
+        window["label"].config(text=(job.message or progress_text) + "\n" + status)
+
+    def finished(result):
+        closeProgress()
+        if on_done is not None:
+            on_done(result)
+
+    def failed(error):
+        closeProgress()
+        if on_error is not None:
+            on_error(error)
+        else:
+            errorWindow(str(error), width=400)
+
+    return job_executor.submit(
+        title,
+        work,
+        on_done=finished,
+        on_error=failed,
+        on_cancel=lambda job: closeProgress(),
+        on_progress=showProgress,
+    )
+
+
 def shorten_file_name(old_filename: str, num_shown_char: int):
     # TODO: REVISIT, you know better ways to do this.
     """
@@ -249,14 +399,30 @@ def shorten_file_name(old_filename: str, num_shown_char: int):
 
 def playAudio(path_to_audio_file: str):
     """
-    Uses pygame to play audio in the app.
+    Uses pygame to play audio in the app. The mixer is initialised once and kept (see playback.py).
 
     Args:
         path_to_audio_file (str): Path to audio file to be loaded.
     """
-    pygame.mixer.init()
-    pygame.mixer.music.load(path_to_audio_file)
-    pygame.mixer.music.play()
+    playback.play_file(path_to_audio_file)
+
+
+def playArray(audio: np.ndarray, samplerate: int):
+    """
+    Plays rendered audio straight from memory, without exporting it first.
+
+    Args:
+        audio (np.ndarray): Audio with shape (samples,) or (samples, channels).
+        samplerate (int): Sampling rate of audio.
+    """
+    try:
+        playback.play_array(audio, samplerate)
+    except pygame.error as e:  # <- no audio device, or the mixer couldn't be set up
+        errorWindow("Could not play audio:\n" + str(e), width=400)
+
+
+def pauseAudio():
+    playback.pause()
 
 
 def selectHRTFFile():
@@ -266,9 +432,10 @@ def selectHRTFFile():
     global fs_H
     hrtf_file = filedialog.askopenfilename(filetypes=[(".wav files", ".wav")])
     root.focus_force()
+    # decoded once and cached (see audio_cache.py), so the HRTF tab and any render of the same file share it
     try:
         if hrtf_file:
-            [HRIR, fs_H] = sf.read(hrtf_file)
+            [HRIR, fs_H] = audio_cache.read(hrtf_file)
     except RuntimeError:
         errorWindow(
             "\nError loading file:\n\n"
@@ -295,7 +462,6 @@ def selectHRTFFile():
             root_menu_file_hrtf.entryconfigure(2, state='normal')
             root_menu_file_hrtf.entryconfigure(3, state='normal')
             root_menu_file_hrtf.entryconfigure(4, state='normal')
-            [HRIR, fs_H] = sf.read(hrtf_file)
         else:
             return
 
@@ -308,9 +474,10 @@ def selectSourceFile():
     source_file = filedialog.askopenfilename(filetypes=[(".wav files", ".wav")])
     root.focus_force()
     # check to see if the selected file is on the drive (in the case of network drives, for example)
+    # decoded once and cached (see audio_cache.py), so rendering it with a SOFA file later doesn't read it again
     try:
         if source_file:
-            [sig, fs_s] = sf.read(source_file)
+            [sig, fs_s] = audio_cache.read(source_file)
     except RuntimeError:
         errorWindow(
             "\nError loading file:\n\n"
@@ -338,7 +505,6 @@ def selectSourceFile():
         root_menu_file_source.entryconfig(2, state='normal')
         root_menu_file_source.entryconfig(3, state='normal')
         root_menu_file_source.entryconfig(4, state='normal')
-        [sig, fs_s] = sf.read(source_file)
 
 
 def getHRTFFileData(in_hrtf_file: str, in_HRIR: np.ndarray):
@@ -397,7 +563,7 @@ def getHRTFFileData(in_hrtf_file: str, in_HRIR: np.ndarray):
             hrtfFileDataWindow,
             text="Pause HRTF",
             style="my.TButton",
-            command=lambda: pygame.mixer.music.pause(),
+            command=lambda: pauseAudio(),
         )
         hrtfPauseFileButton.pack()
         hrtfFileDataCloseWindowButton = ttk.Button(
@@ -450,7 +616,7 @@ def getSourceFileData(in_source_file: str):
         sourceFileDataWindow,
         text="Pause Source File",
         style="my.TButton",
-        command=lambda: pygame.mixer.music.pause(),
+        command=lambda: pauseAudio(),
     )
     sourcePauseFileButton.pack()
     sourceFileDataCloseWindowButton = ttk.Button(
@@ -465,7 +631,7 @@ def getSourceFileData(in_source_file: str):
 def stopAudioAndCloseWindow(window_to_close):
     # cannot believe i'm actually making this function
     try:
-        pygame.mixer.music.pause()
+        pauseAudio()
     except pygame.error:
         pass
     finally:
@@ -544,51 +710,67 @@ def stereoToMono(in_sig: np.ndarray):
 
 
 
+def processing_dtype():
+    """
+    Precision that resampling, convolution and rendering run at, from the File menu. float32 halves memory and speeds up the ffts;
+    see precision.py for how far its results can be from float64.
+
+    Returns:
+        str: "float32" or "float64".
+    """
+    return "float32" if singlePrecisionBooleanVar.get() else "float64"
+
+
 def fs_resample(s1: np.ndarray, f1: int, s2: np.ndarray, f2: int):
     """
-    For two signals that have differing sample rates, resample the lower to meet the higher.
+    For two signals that have differing sample rates, resample whichever one is cheaper to the other's rate, in the background.
+    That's nearly always the HRIR (see resample_plan.plan_match), so a long source isn't resampled just to match a short filter.
+    The resampled source and HRIR replace sig_mono and HRIR (and their sampling rates) once it's done.
 
     Args:
-        s1 (numpy.ndarray): First signal.
+        s1 (numpy.ndarray): First signal (the mono source).
         f1 (int): Sampling rate of s1.
-        s2 (numpy.ndarray): Second signal.
+        s2 (numpy.ndarray): Second signal (the HRIR).
         f2 (int): Sampling rate of s2.
 
     Returns:
-        s1 (numpy.ndarray): Resampled signal 1.
-        f1 (int): signal 1's resampled sampling rate.
-        s2 (numpy.ndarray): resampled signal 2.
-        f2 (int): signal 2's resampled sampling rate.
-    """
-    if f1 != f2:
-        if f2 < f1:
-            s2 = librosa.core.resample(s2.transpose(), f2, f1)
-            s2 = s2.transpose()
-        else:
-            s1 = librosa.core.resample(s1.transpose(), f1, f2)
-            s1.transpose()
-    fmax = max([f1, f2])
-    f1 = fmax
-    f2 = fmax
+        jobs.Job: The resampling job.
+    """
+    dtype = processing_dtype()  # <- tk variables are only read on the ui thread
+    plan = resample_plan.plan_match(len(s1), f1, len(s2), f2, s2.shape[1] if s2.ndim > 1 else 1)
+    resample_plan.log_plan(plan, "the HRTF tab")
 
-    messageWindow(
-        message=(
-            "Resampled at: "
-            + str(fmax)
-            + "Hz\n\n"
-            + "Signal/source dimensions: "
-            + str(s1.shape)
-            + "\n"
-            + "HRIR Dimensions: "
-            + str(s2.shape)
-        ),
-        title="Resample",
-        width=250,
-        height=170,
-    )
+    def resampleSignals(job):
+        r1 = resampling.resample(precision.cast(s1, dtype), f1, plan.render_fs, axis=0)
+        r2 = resampling.resample(precision.cast(s2, dtype), f2, plan.render_fs, axis=0)
+        return r1, r2
+
+    def showResampled(result):
+        global sig_mono, fs_s, HRIR, fs_H
+        sig_mono, HRIR = result
+        fs_s = fs_H = plan.render_fs
+
+        messageWindow(
+            message=(
+                "Resampled at: "
+                + str(plan.render_fs)
+                + "Hz\n"
+                + ("\n".join(plan.steps) or "Nothing to resample")
+                + "\n\n"
+                + "Signal/source dimensions: "
+                + str(sig_mono.shape)
+                + "\n"
+                + "HRIR Dimensions: "
+                + str(HRIR.shape)
+            ),
+            title="Resample",
+            width=250,
+            height=190,
+        )
+
+        timeDomainConvolveButton.config(state="active")
 
-    timeDomainConvolveButton.config(state="active")
-    return s1, f1, s2, f2
+    return runJob("Resample", resampleSignals, on_done=showResampled, progress_text="Resampling...")
 
 
 def timeDomainConvolve(in_sig_mono: np.ndarray, in_HRIR: np.ndarray):
@@ -600,21 +782,31 @@ def timeDomainConvolve(in_sig_mono: np.ndarray, in_HRIR: np.ndarray):
         in_HRIR (np.ndarray): HRIR signal in np.ndarray format.
     """
     global Bin_Mix
-    s_L = np.convolve(in_sig_mono, in_HRIR[:, 0])
-    s_R = np.convolve(in_sig_mono, in_HRIR[:, 1])
-
-    Bin_Mix = np.vstack([s_L, s_R]).transpose()
+    dtype = processing_dtype()
+    # convolution.py picks direct (time domain) convolution for short sources, and switches to fft/block methods once that gets too slow.
+    Bin_Mix, convolve_method = convolution.convolve(
+        precision.cast(in_sig_mono, dtype), precision.cast(in_HRIR[:, 0:2], dtype)
+    )
 
     messageWindow(
-        message=("New data dimensions: " + str(Bin_Mix.shape)),
+        message=(
+            "New data dimensions: "
+            + str(Bin_Mix.shape)
+            + "\nMethod: "
+            + convolve_method.replace("_", "-")
+            + "\nPrecision: "
+            + str(Bin_Mix.dtype)
+        ),
         title="Time Domain Convolve",
         width=250,
+        height=140,
     )
 
     exportConvolvedButton.config(state="active")
+    playConvolvedButton.config(state="active")
 
 
-# freq domain convolution goes here at some point
+# freq domain convolution lives in convolution.py (fft & block backends) and hrtf_spectra.py (precomputed SOFA spectra)
 
 
 def exportConvolved(
@@ -660,33 +852,57 @@ def exportConvolved(
 
 
 def selectSOFAFile():
-    global sofa_file_print
     global sofa_file_path_list
-    global sofa_mode_selection
 
+    if job_executor.busy:  # <- the keyboard shortcut still works while the buttons are disabled
+        return
     sofa_file_path_list = filedialog.askopenfilenames(
         filetypes=[(".SOFA files", ".sofa")]
     )
     root.focus_force()
+    selected_files = [file for file in sofa_file_path_list if file]
+    if not selected_files:
+        return
+
+    def checkSOFAFiles(job):
+        # opening a SOFA file reads the whole netCDF file, so checking several can take a while
+        for checked, file in enumerate(selected_files):
+            job.report(
+                checked / len(selected_files),
+                "Checking " + shorten_file_name(os.path.basename(file), 30),
+            )
+            try:
+                metadata_test = sofa_cache.open_sofa(file).Metadata.list_attributes()
+            except OSError:
+                return file
+        return None
+
+    def showSOFASelection(failed_file):
+        if failed_file:
+            errorWindow(
+                "\nError loading file:\n\n"
+                + str(os.path.basename(failed_file))
+                + "\n\nOS error.\nDoes this file exist on the local drive?\n\nAlternatively, does this SOFA file\ncontain correct metadata?",
+                title="Error",
+                width=300,
+                height=270,
+                tooltip_text=failed_file,
+            )
+            return
+        applySOFASelection()
+
+    runJob("Loading SOFA files", checkSOFAFiles, on_done=showSOFASelection, progress_text="Checking SOFA files...")
+
+
+def applySOFASelection():
+    """
+    Sets up the SOFA section for the checked selection in sofa_file_path_list: one file for everything, or several for comparison graphs only.
+    """
+    global sofa_file_print
+    global sofa_mode_selection
+
     if len(sofa_file_path_list) > 1:
         sofa_mode_selection = 1
-        for file in sofa_file_path_list:
-            if file:
-                try:
-                    metadata_test = sofa.Database.open(file).Metadata.list_attributes()
-                except OSError:
-                    errorWindow(
-                        "\nError loading file:\n\n"
-                        + str(os.path.basename(file))
-                        + "\n\nOS error.\nDoes this file exist on the local drive?\n\nAlternatively, does this SOFA file\ncontain correct metadata?",
-                        title="Error",
-                        width=300,
-                        height=270,
-                        tooltip_text=file,
-                    )
-                    return
-                else:
-                    continue
         selectSOFAFileLabel.config(text="SOFA files:\nHover to see selected files.")
         create_tooltip(
             selectSOFAFileLabel,
@@ -699,55 +915,44 @@ def selectSOFAFile():
         getSOFAFileDimensionsButton.config(state="disabled")
         azimuthTextBox.config(state="disabled")
         elevationTextBox.config(state="disabled")
+        sofaReceiversTextBox.config(state="disabled")
         sofaRenderButton.config(state="disabled")
+        sofaPlayButton.config(state="disabled")
         sofaViewButton.config(text="View SOFA HRTF")
         root_menu_file_sofa.entryconfig(5, label='View SOFA HRTF', state='normal')
         sofaSaveButton.config(text="Save SOFA HRTF...")
         root_menu_file_sofa.entryconfig(6, label='Save SOFA HRTF...', state='normal')
+        root_menu_file_sofa.entryconfig(8, state='disabled')
+        root_menu_file_sofa.entryconfig(9, state='disabled')
+        root_menu_file_sofa.entryconfig(10, state='disabled')
 
     if len(sofa_file_path_list) == 1:
         sofa_mode_selection = 0
-        try:
-            if sofa_file_path_list[0]:
-                metadata_test = sofa.Database.open(
-                    sofa_file_path_list[0]
-                ).Metadata.list_attributes()
-        except OSError:
-            errorWindow(
-                "\nError loading file:\n\n"
-                + str(os.path.basename(sofa_file_path_list[0]))
-                + "\n\nOS error.\nDoes this file exist on the local drive?\n\nAlternatively, does this SOFA file\ncontain correct metadata?",
-                title="Error",
-                width=300,
-                height=270,
-                tooltip_text=sofa_file_path_list[0],
-            )
-            return
-        else:
-            if sofa_file_path_list[0]:
-                sofa_file_print = sofa_file_path_list[0].split("/")
-                selectSOFAFileLabel.config(
-                    text="SOFA file:\n"
-                    + shorten_file_name(os.path.basename(sofa_file_path_list[0]), 20)
-                )
-                create_tooltip(selectSOFAFileLabel, text=str(sofa_file_path_list[0]))
-                getSOFAFileMetadataButton.config(state="active")
-                getSOFAFileDimensionsButton.config(state="active")
-                azimuthTextBox.config(state="normal")
-                elevationTextBox.config(state="normal")
-                sofaRenderButton.config(state="active")
-                sofaViewButton.config(text="View SOFA file")
-                sofaSaveButton.config(text="Save all SOFA graphs")
-                # root_menu_file_sofa.entryconfig(1, state='normal') # separator
-                root_menu_file_sofa.entryconfig(2, state='normal')
-                root_menu_file_sofa.entryconfig(3, state='normal')
-                # root_menu_file_sofa.entryconfig(4, state='normal') # separator
-                root_menu_file_sofa.entryconfig(5, state='normal')
-                root_menu_file_sofa.entryconfig(6, state='normal')
-                # root_menu_file_sofa.entryconfig(7, state='normal') # separator
-                root_menu_file_sofa.entryconfig(8, state='normal')
-            else:
-                return
+        sofa_file_print = sofa_file_path_list[0].split("/")
+        selectSOFAFileLabel.config(
+            text="SOFA file:\n"
+            + shorten_file_name(os.path.basename(sofa_file_path_list[0]), 20)
+        )
+        create_tooltip(selectSOFAFileLabel, text=str(sofa_file_path_list[0]))
+        getSOFAFileMetadataButton.config(state="active")
+        getSOFAFileDimensionsButton.config(state="active")
+        azimuthTextBox.config(state="normal")
+        elevationTextBox.config(state="normal")
+        sofaReceiversTextBox.config(state="normal")
+        sofaRenderButton.config(state="active")
+        sofaPlayButton.config(state="active")
+        sofaViewButton.config(text="View SOFA file")
+        sofaSaveButton.config(text="Save all SOFA graphs")
+        # root_menu_file_sofa.entryconfig(1, state='normal') # separator
+        root_menu_file_sofa.entryconfig(2, state='normal')
+        root_menu_file_sofa.entryconfig(3, state='normal')
+        # root_menu_file_sofa.entryconfig(4, state='normal') # separator
+        root_menu_file_sofa.entryconfig(5, state='normal')
+        root_menu_file_sofa.entryconfig(6, state='normal')
+        # root_menu_file_sofa.entryconfig(7, state='normal') # separator
+        root_menu_file_sofa.entryconfig(8, state='normal')
+        root_menu_file_sofa.entryconfig(9, state='normal')
+        root_menu_file_sofa.entryconfig(10, state='normal')
 
     if sofa_file_path_list:
         sofaViewButton.config(state="active")
@@ -773,13 +978,14 @@ def getSOFAFileMetadata(in_sofa_file: str):
     sofaMetadataWindow.title("SOFA File Metadata")
     v = tk.Scrollbar(sofaMetadataWindow, orient="vertical")
     v.pack(side="right", fill="y")
+    SOFA_HRTF = sofa_cache.open_sofa(in_sofa_file)
     myString = ""
-    for attr in sofa.Database.open(in_sofa_file).Metadata.list_attributes():
+    for attr in SOFA_HRTF.Metadata.list_attributes():
         myString = (
             myString
             + (
                 "{0}: {1}".format(
-                    attr, sofa.Database.open(in_sofa_file).Metadata.get_attribute(attr)
+                    attr, SOFA_HRTF.Metadata.get_attribute(attr)
                 )
             )
             + "\n"
@@ -813,14 +1019,15 @@ def getSOFAFileDimensions(in_sofa_file: str):
         text="\nM = Number of measurements.\n\nR = Number of receivers, or harmonic coefficients\ndescribing receivers (depending on ReceiverPosition_Type).\n\nE = Number of emitters, or harmonic coefficients\ndescribing emitters (depending on EmitterPosition_Type).\n\nN = Number of data samples describing\none measurement (depending on self.GLOBAL_DataType).\n\nS = number of characters in a string.\n\nI = Single dimension (always one).\n\nC = Size of coordinate dimension (always three).\n",
     )
     definitionsLabel.pack()
+    SOFA_HRTF = sofa_cache.open_sofa(in_sofa_file)
     myString = ""
-    for dimen in sofa.Database.open(in_sofa_file).Dimensions.list_dimensions():
+    for dimen in SOFA_HRTF.Dimensions.list_dimensions():
         myString = (
             myString
             + (
                 "{0}: {1}".format(
                     dimen,
-                    sofa.Database.open(in_sofa_file).Dimensions.get_dimension(dimen),
+                    SOFA_HRTF.Dimensions.get_dimension(dimen),
                 )
             )
             + "\n"
@@ -861,7 +1068,7 @@ def sanitizeBounds(bounds: str):
     return lower_limit, upper_limit
 
 
-def plot_coordinates(in_sofa_file: str, fig: plt.Figure):
+def plot_coordinates(in_sofa_file: str, fig: "plt.Figure"):
     """
     Plots source coordinate positions of a SOFA file.
 
@@ -872,8 +1079,7 @@ def plot_coordinates(in_sofa_file: str, fig: plt.Figure):
     Returns:
         mpl_toolkits.mplot3d.art3d.Line3DCollection: 3D plot data
     """
-    SOFA_HRTF = sofa.Database.open(in_sofa_file)
-    x0 = SOFA_HRTF.Source.Position.get_values(system="cartesian")
+    x0 = sofa_store.source_positions(in_sofa_file, system="cartesian")  # <- from the file's store, if it has one
     n0 = x0
     ax = fig.add_subplot(111, projection="3d")
     q = ax.quiver(
@@ -887,7 +1093,8 @@ def plot_coordinates(in_sofa_file: str, fig: plt.Figure):
 
 def computeHRIR(in_sofa_file: str, measurement: int):
     """
-    Computes the HRIR for a given SOFA file at the measurement and emitter given. Returns t (time, x-axis), receiver_dimensions, and SOFA_HRTF.Data.IR
+    Computes the HRIR for a given SOFA file at the measurement and emitter given. Returns t (time, x-axis), receiver_dimensions, and the file's impulse responses.
+    Reads through hrir_cache, so a compiled store (see sofa_store.py) gets used if there is one, and a store's path works too.
 
     Args:
         in_sofa_file (str): Path to SOFA file
@@ -896,21 +1103,20 @@ def computeHRIR(in_sofa_file: str, measurement: int):
     Returns:
         ndarray: t (time, to be used on the x-axis)
         int: receiver dimension
-        sofa.access.variables.Variable: IR from the SOFA file to be plotted against t
+        ndarray: Impulse responses with shape (M, R, E, N), to be plotted against t
     """
-    SOFA_HRTF = sofa.Database.open(in_sofa_file)
+    ir = hrir_cache.get_hrirs(in_sofa_file)
 
-    receiver_dimensions = SOFA_HRTF.Dimensions.R
-    t = np.arange(0, SOFA_HRTF.Dimensions.N) * SOFA_HRTF.Data.SamplingRate.get_values(
-        indices={"M": measurement}
-    )
+    receiver_dimensions = ir.shape[1]
+    t = np.arange(0, ir.shape[-1]) / sofa_store.sampling_rate(in_sofa_file)
 
-    return t, receiver_dimensions, SOFA_HRTF.Data.IR
+    return t, receiver_dimensions, ir
 
 
 def computeHRTF(in_sofa_file: str, measurement: int, emitter: int):
     """
     Computes the HRTF for a given SOFA file at the measurement and emitter given. Returns f_axis (frequency in Hz, usually used on x-axis) and HRTF_mag_dB (magnitude in dB, usually used on y-axis)
+    The whole file is transformed once (see hrtf_spectra.get_magnitudes), so browsing other measurements is just slicing.
 
     Args:
         in_sofa_file (str): Path to SOFA file
@@ -919,43 +1125,14 @@ def computeHRTF(in_sofa_file: str, measurement: int, emitter: int):
 
     Returns:
         ndarray: Frequency axis, usually used on x-axis
-        ndarray: Magnitude in dB, usually used on y-axis
+        ndarray: Magnitude in dB with shape (frequencies, receivers), usually used on y-axis
+        list: Legend entry for each receiver
     """
-    SOFA_HRTF = sofa.Database.open(in_sofa_file)
-    receiver_legend = []
-
-    for receiver in np.arange(SOFA_HRTF.Dimensions.R):
-        receiver_legend.append("Receiver {0}".format(receiver))
-
-    nfft = (
-        len(
-            SOFA_HRTF.Data.IR.get_values(
-                indices={"M": measurement, "R": receiver, "E": emitter}
-            )
-        )
-        * 8
-    )
-    HRTF = np.fft.fft(
-        SOFA_HRTF.Data.IR.get_values(
-            indices={"M": measurement, "R": receiver, "E": emitter}
-        ),
-        n=nfft,
-        axis=0,
-    )
-    HRTF_mag = (2 / nfft) * np.abs(HRTF[0 : int(len(HRTF) / 2) + 1])
-    HRTF_mag_dB = 20 * np.log10(HRTF_mag)
-    f_axis = np.linspace(
-        0,
-        (
-            SOFA_HRTF.Data.SamplingRate.get_values(
-                indices={"M": measurement, "R": receiver, "E": emitter}
-            )
-        )
-        / 2,
-        len(HRTF_mag_dB),
-    )
+    magnitudes = hrtf_spectra.get_magnitudes(in_sofa_file)
+    HRTF_mag_dB = magnitudes.magnitude(measurement, emitter)
+    receiver_legend = ["Receiver {0}".format(receiver) for receiver in range(HRTF_mag_dB.shape[1])]
 
-    return f_axis, HRTF_mag_dB, receiver_legend
+    return magnitudes.f_axis, HRTF_mag_dB, receiver_legend
 
 
 def plotHRIR(in_sofa_file, legend: list, measurement: int, emitter: int):
@@ -968,6 +1145,13 @@ def plotHRIR(in_sofa_file, legend: list, measurement: int, emitter: int):
         measurement (int): Measurement index to plot.
         emitter (int): Emitter to plot.
     """
+    t, receiver_dimensions, ir = computeHRIR(in_sofa_file, measurement)
+    # same channel rules as the renders & the HRTF plot: any emitter works for files with just one, anything else out of range is a ValueError
+    receivers, emitter_index = hrir_cache.resolve_channels(ir.shape, None, emitter)
+    if not 0 <= measurement < ir.shape[0]:
+        raise ValueError(
+            "Measurement {0} out of range: the file has {1} (0 to {2}).".format(measurement, ir.shape[0], ir.shape[0] - 1)
+        )
     plt.figure(
         figsize=(15, 5),
         num=(
@@ -977,11 +1161,8 @@ def plotHRIR(in_sofa_file, legend: list, measurement: int, emitter: int):
             + os.path.basename(in_sofa_file)
         ),
     )
-    t, receiver_dimensions, ir = computeHRIR(in_sofa_file, measurement)
-    for receiver in np.arange(receiver_dimensions):
-        plt.plot(
-            t, ir.get_values(indices={"M": measurement, "R": receiver, "E": emitter})
-        )
+    for receiver in receivers:
+        plt.plot(t, ir[measurement, receiver, emitter_index])
         legend.append("Receiver {0}".format(receiver))
     plt.title(
         "{0}: HRIR at M={1} for emitter {2}".format(
@@ -996,8 +1177,122 @@ def plotHRIR(in_sofa_file, legend: list, measurement: int, emitter: int):
     return
 
 
+def closeFiguresSince(open_figures: set):
+    """
+    Closes every figure opened since plt.get_fignums() returned open_figures, e.g. a half-drawn graph after an error.
+
+    Args:
+        open_figures (set): Figure numbers that were open before.
+    """
+    for number in set(plt.get_fignums()) - set(open_figures):
+        plt.close(number)
+
+
+def sofaGraphErrorMessage(error: Exception):
+    """
+    Text for an error window when a SOFA file's HRIR or HRTF can't be plotted.
+
+    Args:
+        error (Exception): What plotting raised.
+
+    Returns:
+        str: The message itself for bad input (an out of range measurement, receiver or emitter), or a note that the file isn't supported.
+    """
+    if isinstance(error, ValueError):
+        return str(error)
+    return f"{error}\nThis SOFA file is not supported for\nHRIR or HRTF."
+
+
+def comparison_file_list(in_sofa_file):
+    in_sofa_files_list = in_sofa_file
+    in_sofa_files_list = ", ".join(in_sofa_files_list)
+    in_sofa_files_list = in_sofa_files_list.split(",")
+    return [file.strip(" ") for file in in_sofa_files_list]
+
+
+def loadHRTFs(in_sofa_files_list: list, measurement: int, emitter: int, job: "jobs.Job" = None, on_loaded=None):
+    """
+    Loads & transforms SOFA files for a comparison plot, on a thread pool. Doesn't touch any widgets, so it can run as a background job.
+
+    Args:
+        in_sofa_files_list (list): Paths to sofa files.
+        measurement (int): Measurement index to load.
+        emitter (int): Emitter to load.
+        job (jobs.Job, optional): Job to report progress to (and be cancelled through). Defaults to None.
+        on_loaded (callable, optional): Called with (index, path, f_axis, HRTF_mag_dB) as soon as each file has loaded, from the thread
+            running this function (so it mustn't touch widgets either). Defaults to None.
+
+    Returns:
+        list: (index in in_sofa_files_list, path, f_axis, HRTF_mag_dB) for every file that loaded, in list order.
+        list: Error message for every file that didn't.
+    """
+    loaded_files = []
+    failed = []
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(SOFA_LOADER_WORKERS, len(in_sofa_files_list)))
+    )
+    try:
+        futures = {
+            pool.submit(computeHRTF, i, measurement, emitter): (index, i)
+            for index, i in enumerate(in_sofa_files_list)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            index, i = futures[future]
+            try:
+                f_axis, HRTF_mag_dB, receiver_legend = future.result()
+            except Exception as e:
+                failed.append("{0}: {1}".format(os.path.basename(i), e))
+            else:
+                loaded_files.append((index, i, f_axis, HRTF_mag_dB))
+                if on_loaded is not None:
+                    on_loaded(loaded_files[-1])
+            if job is not None:
+                job.report(
+                    done / len(in_sofa_files_list),
+                    "Loaded {0} of {1}:\n{2}".format(
+                        done, len(in_sofa_files_list), shorten_file_name(os.path.basename(i), 30)
+                    ),
+                )
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)  # <- a cancelled job doesn't wait for the files it hasn't started on
+    loaded_files.sort(key=lambda loaded_file: loaded_file[0])
+    return loaded_files, failed
+
+
+def prefetchSOFAGraphs(in_sofa_file, mode: int, measurement: int, emitter: int, job: "jobs.Job"):
+    """
+    Loads what the SOFA graphs need in the background, so plotting them on the ui thread afterwards is quick.
+
+    Args:
+        in_sofa_file (list): Selected sofa files.
+        mode (int): sofa_mode_selection (0 for one file, 1 for a comparison).
+        measurement (int): Measurement index to plot.
+        emitter (int): Emitter to plot.
+        job (jobs.Job): Job to report progress to.
+
+    Returns:
+        tuple: What loadHRTFs returned in comparison mode, None otherwise.
+    """
+    if mode == 1:
+        return loadHRTFs(comparison_file_list(in_sofa_file), measurement, emitter, job)
+    job.report(message="Loading " + shorten_file_name(os.path.basename(in_sofa_file[0]), 30))
+    sofa_store.source_positions(in_sofa_file[0])  # <- opens the file (or its store), so one that can't be read fails here
+    try:
+        hrir_cache.get_hrirs(in_sofa_file[0])
+        hrtf_spectra.get_magnitudes(in_sofa_file[0])  # <- cached, so computeHRIR & computeHRTF just slice them later
+    except Exception:
+        pass  # <- files that can't be transformed (e.g. SOS) get reported when they're plotted, same as before
+    return None
+
+
 def plotHRTF(
-    in_sofa_file, legend: list, xlim: str, ylim: str, measurement: int, emitter: int
+    in_sofa_file,
+    legend: list,
+    xlim: str,
+    ylim: str,
+    measurement: int,
+    emitter: int,
+    loaded: tuple = None,
 ):
     """
     Plots a head-related transfer function graph for a given .sofa file with a given legend, x-axis bounds, y-axis bounds, measurement index, and emitter. If multiple SOFA files are selected, they will all be plotted on the same graph.
@@ -1009,6 +1304,7 @@ def plotHRTF(
         ylim (str): Bounds for the y-axis, should be passed in the format [lower, upper] (e.g., [-150, 0]).
         measurement (int): Measurement index to plot.
         emitter (int): Emitter to plot.
+        loaded (tuple, optional): In multi-file mode, what loadHRTFs returned for these files (e.g. from a background job). Defaults to None (loaded here).
     """
     xlim_start, xlim_end = sanitizeBounds(xlim)
     ylim_start, ylim_end = sanitizeBounds(ylim)
@@ -1032,18 +1328,21 @@ def plotHRTF(
         )
 
     if sofa_mode_selection == 1:
-        in_sofa_files_list = in_sofa_file
-        in_sofa_files_list = ", ".join(in_sofa_files_list)
-        in_sofa_files_list = in_sofa_files_list.split(",")
-        in_sofa_files_list = [file.strip(" ") for file in in_sofa_files_list]
+        in_sofa_files_list = comparison_file_list(in_sofa_file)
         plt.figure(
             figsize=(15, 5),
             num=str("Left-Channel Head-Related Transfer Function Comparison"),
         )
-        for i in in_sofa_files_list:
-            legend.append(os.path.basename(i))
-            f_axis, HRTF_mag_dB, receiver_legend = computeHRTF(i, measurement, emitter)
-            plt.semilogx(f_axis, HRTF_mag_dB)
+        plt.xscale("log")  # <- set up front, since the curves can be drawn in later (see viewSOFAGraphs)
+        if loaded is None:
+            loaded = loadHRTFs(in_sofa_files_list, measurement, emitter)
+        loaded_files, failed = loaded
+        drawComparisonCurves(plt.gca(), loaded_files, {})
+        if failed:
+            errorWindow(
+                error_message="Couldn't load {0} file(s).".format(len(failed)),
+                tooltip_text="\n".join(failed),
+            )
         plt.title(
             "Left-Channel HRTF Comparison at M={0} for emitter {1}".format(
                 measurement, emitter
@@ -1057,13 +1356,32 @@ def plotHRTF(
     plt.grid(which="minor", color="0.9")  # Vertical grid lines
     plt.xlabel("Frequency (Hz)")
     plt.ylabel("Magnitude (dB)")
-    plt.legend(legend)
+    if sofa_mode_selection == 0:
+        plt.legend(legend)  # <- the comparison's legend is kept up to date by drawComparisonCurves
 
     return
 
 
+def drawComparisonCurves(ax: "plt.Axes", loaded_files: list, curves: dict):
+    """
+    Draws loaded files into an HRTF comparison plot and puts its legend in list order. Can be called again as more files load.
+
+    Args:
+        ax (matplotlib.axes.Axes): Axes of the comparison plot.
+        loaded_files (list): (index, path, f_axis, HRTF_mag_dB) for each file to draw, as loadHRTFs returns them.
+        curves (dict): Index -> line of every file already drawn in ax. The new ones get added to it.
+    """
+    # each file keeps the color of its place in the list, so the plot looks the same no matter which finished loading first
+    for index, i, f_axis, HRTF_mag_dB in loaded_files:
+        (curves[index],) = ax.semilogx(
+            f_axis, HRTF_mag_dB[:, 0], color="C{0}".format(index % 10), label=os.path.basename(i)
+        )  # <- left channel (receiver 0)
+    if curves:
+        ax.legend(handles=[curves[index] for index in sorted(curves)])
+
+
 def viewSOFAGraphs(
-    in_sofa_file, xlim: str, ylim: str, measurement: int = 0, emitter: int = 1
+    in_sofa_file, xlim: str, ylim: str, measurement: int = 0, emitter: int = 0
 ):
     """
     Calls functions to plot source positions, HRIR, and HRTF for a given SOFA file, and displays them. Provides default values if they aren't given.
@@ -1073,18 +1391,80 @@ def viewSOFAGraphs(
         xlim (str): Bounds for the x-axis, should be passed in the format [lower, upper] (e.g., [20, 20000]).
         ylim (str): Bounds for the y-axis, should be passed in the format [lower, upper] (e.g., [-150, 0]).
         measurement (int, optional): Measurement index to plot. Defaults to 0.
-        emitter (int, optional): Emitter to plot. Defaults to 1.
+        emitter (int, optional): Emitter to plot. Defaults to 0, same as renders.
     """
 
     if not xlim:
         xlim = "20, 20000"
     if not ylim:
         ylim = "-150, 0"
-    if not measurement:
-        measurement = 0
-    if not emitter:
-        emitter = 1
-    
+    try:
+        measurement = int(measurement) if str(measurement).strip() else 0
+        emitter = int(emitter) if str(emitter).strip() else 0  # <- same default as renderWithSOFA & renderSceneWithSOFA
+    except ValueError:
+        errorWindow("The measurement and emitter should be indices.")
+        return -1
+
+    # the files get loaded in the background, then plotted here on the ui thread (matplotlib has to stay on it)
+    mode = sofa_mode_selection
+    if mode == 1:
+        # the comparison goes up straight away, and each file's curve gets drawn in on the next poll after it's loaded
+        finished_files = queue.Queue()  # <- filled by the loader, drained on the ui thread
+        curves = {}
+        plotHRTF(in_sofa_file, [], xlim, ylim, measurement, emitter, loaded=([], []))
+        comparison_fig = plt.gcf()
+        plt.show(block=False)
+
+        def drawFinished(job=None):
+            loaded_files = []
+            while not finished_files.empty():
+                loaded_files.append(finished_files.get())
+            if loaded_files and plt.fignum_exists(comparison_fig.number):
+                drawComparisonCurves(comparison_fig.axes[0], loaded_files, curves)
+                comparison_fig.canvas.draw_idle()
+
+        def comparisonDone(loaded):
+            drawFinished()
+            loaded_files, failed = loaded
+            if failed:
+                errorWindow(
+                    error_message="Couldn't load {0} file(s).".format(len(failed)),
+                    tooltip_text="\n".join(failed),
+                )
+
+        job = runJob(
+            "Loading SOFA files",
+            lambda job: loadHRTFs(
+                comparison_file_list(in_sofa_file), measurement, emitter, job, on_loaded=finished_files.put
+            ),
+            on_done=comparisonDone,
+            progress_text="Loading SOFA files...",
+            on_progress=drawFinished,
+        )
+        if job is None:
+            plt.close(comparison_fig)  # <- another job's still running
+        return
+
+    runJob(
+        "Loading SOFA files",
+        lambda job: prefetchSOFAGraphs(in_sofa_file, mode, measurement, emitter, job),
+        on_done=lambda loaded: showSOFAGraphs(in_sofa_file, xlim, ylim, measurement, emitter, loaded),
+        progress_text="Loading SOFA files...",
+    )
+
+
+def showSOFAGraphs(in_sofa_file, xlim: str, ylim: str, measurement: int, emitter: int, loaded: tuple = None):
+    """
+    Plots source positions, HRIR, and HRTF for a given SOFA file (or the HRTF comparison of several), and displays them.
+
+    Args:
+        in_sofa_file (str): Path to sofa file to graph.
+        xlim (str): Bounds for the x-axis.
+        ylim (str): Bounds for the y-axis.
+        measurement (int): Measurement index to plot.
+        emitter (int): Emitter to plot.
+        loaded (tuple, optional): What loadHRTFs returned, in multi-file mode. Defaults to None.
+    """
     legend = []
     
     bool_plot_hrtf = True
@@ -1097,12 +1477,14 @@ def viewSOFAGraphs(
             figsize=(10, 7),
             num=str("SOFA Source Positions for " + os.path.basename(in_sofa_file)),
         )
+        open_figures = set(plt.get_fignums())
         try:
             plotHRIR(in_sofa_file, legend, measurement, emitter)
             plot_coordinates(in_sofa_file, sofa_pos_fig)
-        except (AttributeError or Exception) as e: # if the SOFA file is SOS, I can't currently use it, so just show the coordinate plot. 
-            plt.close() # trash whatever plots are currently in memory (since plotHRIR needs to try to plot something before it can throw an error, and without this then a blank HRIR graph would pop up.)
-            errorWindow(error_message=f"{e}\nThis SOFA file is not supported for\nHRIR or HRTF.")
+        except Exception as e: # if the SOFA file is SOS (or the measurement/emitter is out of range), just show the coordinate plot.
+            closeFiguresSince(open_figures) # trash a half-drawn HRIR graph, so it doesn't pop up blank
+            errorWindow(error_message=sofaGraphErrorMessage(e))
+            sofa_pos_fig.clf()
             plot_coordinates(in_sofa_file, sofa_pos_fig)
             bool_plot_hrtf = False
             plt.show()
@@ -1110,7 +1492,7 @@ def viewSOFAGraphs(
             return -1
     
     if bool_plot_hrtf: # probably redundant, since the exception handling should exit the function if there's an exception before this point.
-        plotHRTF(in_sofa_file, legend, xlim, ylim, measurement, emitter)
+        plotHRTF(in_sofa_file, legend, xlim, ylim, measurement, emitter, loaded=loaded)
     
     plt.show()
     
@@ -1119,7 +1501,7 @@ def viewSOFAGraphs(
 
 
 def saveSOFAGraphs(
-    in_sofa_file, xlim: str, ylim: str, measurement: int = 0, emitter: int = 1
+    in_sofa_file, xlim: str, ylim: str, measurement: int = 0, emitter: int = 0
 ):
     """
     Calls functions to plot source positions, HRIR, and HRTF for a given SOFA file, and saves them. Provides default values if they aren't given.
@@ -1129,7 +1511,7 @@ def saveSOFAGraphs(
         xlim (str): Bounds for the x-axis, should be passed in the format [lower, upper] (e.g., [20, 20000]).
         ylim (str): Bounds for the y-axis, should be passed in the format [lower, upper] (e.g., [-150, 0]).
         measurement (int, optional): Measurement index to plot. Defaults to 0.
-        emitter (int, optional): Emitter to plot. Defaults to 1.
+        emitter (int, optional): Emitter to plot. Defaults to 0, same as renders.
 
     Returns:
     """
@@ -1139,11 +1521,12 @@ def saveSOFAGraphs(
         xlim = "20, 20000"
     if not ylim:
         ylim = "-150, 0"
-    if not measurement:
-        measurement = 0
-    if not emitter:
-        emitter = 1
-    legend = []
+    try:
+        measurement = int(measurement) if str(measurement).strip() else 0
+        emitter = int(emitter) if str(emitter).strip() else 0  # <- same default as renderWithSOFA & renderSceneWithSOFA
+    except ValueError:
+        errorWindow("The measurement and emitter should be indices.")
+        return -1
 
     export_directory = filedialog.askdirectory(
         title="Select Save Directory", initialdir=os.path.dirname(in_sofa_file[0])
@@ -1152,6 +1535,34 @@ def saveSOFAGraphs(
         errorWindow(error_message="Directory not given.")
         return -1
 
+    mode = sofa_mode_selection
+    runJob(
+        "Loading SOFA files",
+        lambda job: prefetchSOFAGraphs(in_sofa_file, mode, measurement, emitter, job),
+        on_done=lambda loaded: writeSOFAGraphs(
+            in_sofa_file, xlim, ylim, measurement, emitter, export_directory, loaded
+        ),
+        progress_text="Loading SOFA files...",
+    )
+
+
+def writeSOFAGraphs(
+    in_sofa_file, xlim: str, ylim: str, measurement: int, emitter: int, export_directory: str, loaded: tuple = None
+):
+    """
+    Plots source positions, HRIR, and HRTF for a given SOFA file (or the HRTF comparison of several), and saves them to export_directory.
+
+    Args:
+        in_sofa_file (str): Path to sofa file to graph.
+        xlim (str): Bounds for the x-axis.
+        ylim (str): Bounds for the y-axis.
+        measurement (int): Measurement index to plot.
+        emitter (int): Emitter to plot.
+        export_directory (str): Directory to save into.
+        loaded (tuple, optional): What loadHRTFs returned, in multi-file mode. Defaults to None.
+    """
+    legend = []
+
     if sofa_mode_selection == 0:
         in_sofa_file = in_sofa_file[0]
 
@@ -1183,6 +1594,7 @@ def saveSOFAGraphs(
         )
         
         # plot & save HRIR
+        open_figures = set(plt.get_fignums())
         try:
             plotHRIR(in_sofa_file, legend, measurement, emitter)
             plt.savefig(
@@ -1197,9 +1609,10 @@ def saveSOFAGraphs(
                 ),
             )
         )
-        except (AttributeError or Exception) as e: # if the SOFA file is SOS, I can't currently use it, so just show the coordinate plot. 
-            plt.close() # trash whatever plots are currently in memory (since plotHRIR needs to try to plot something before it can throw an error, and without this then a blank HRIR graph would pop up.)
-            errorWindow(error_message=f"{e}\nThis SOFA file is not supported for\nHRIR or HRTF.")
+        except Exception as e: # if the SOFA file is SOS (or the measurement/emitter is out of range), only the coordinate plot gets saved.
+            closeFiguresSince(open_figures) # trash a half-drawn HRIR graph
+            plt.close(sofa_pos_fig) # <- already saved
+            errorWindow(error_message=sofaGraphErrorMessage(e))
             return -1
         
         
@@ -1213,7 +1626,7 @@ def saveSOFAGraphs(
             pass
 
     # plot & save HRTF
-    plotHRTF(in_sofa_file, legend, xlim, ylim, measurement, emitter)
+    plotHRTF(in_sofa_file, legend, xlim, ylim, measurement, emitter, loaded=loaded)
     plt.savefig(
         os.path.join(
             export_directory,
@@ -1236,15 +1649,38 @@ def saveSOFAGraphs(
     )
 
 
+def parse_receivers(receivers: str):
+    """
+    Parses the receivers box.
+
+    Args:
+        receivers (str): e.g. "0, 1", "[0, 1, 2]" or "all". Blank means left and right (0, 1).
+
+    Returns:
+        list: Receiver indices, or None for all of them.
+    """
+    receivers = str(receivers).strip().strip("[]")
+    if not receivers:
+        return [0, 1]
+    if receivers.lower() == "all":
+        return None
+    return [int(receiver) for receiver in receivers.split(",") if receiver.strip()]
+
+
 def renderWithSOFA(
     angle: str,
     elev: str,
     in_source_file: str,
     in_sofa_file: str,
     target_fs: int = 48000,
+    receivers: str = "",
+    emitter: str = "",
+    export: bool = True,
 ):
     """
     Renders a given source file with a given sofa file at the given azimuth and elevation. Targets a sampling rate of 48kHz.
+    The export gets one channel per receiver, so microphone arrays and other multi-receiver sets render to N-channel files.
+    With export off, the render is played straight from memory instead (the first two receivers), with no directory dialog.
 
     Args:
         angle (str): Desired azimuth to convolve the source file with.
@@ -1252,11 +1688,13 @@ def renderWithSOFA(
         in_source_file (str): Path to source file.
         in_sofa_file (str): Path to sofa file.
         target_fs (int, optional): Target sampling rate. Defaults to 48000.
+        receivers (str, optional): Receivers to render, e.g. "0, 1" or "all". Defaults to "" (0, 1, i.e. left and right).
+        emitter (str, optional): Emitter to render. Defaults to "" (0).
+        export (bool, optional): Export to a .wav, or just play the render. Defaults to True.
 
     Returns:
-        np.ndarray: Convolved audio from azimuth and elevation.
+        jobs.Job: The render, running in the background. Stereo3D holds the convolved audio once it's done.
     """
-    global Stereo3D
     try:
         isinstance(in_source_file, str)
     except NameError:
@@ -1282,6 +1720,13 @@ def renderWithSOFA(
         if not elev:
             elev = 0
 
+        try:
+            receivers = parse_receivers(receivers)
+            emitter = int(emitter) if str(emitter).strip() else 0
+        except ValueError:
+            errorWindow("Receivers should be a list of indices (e.g. 0, 1)\nor \"all\", and the emitter an index.")
+            return
+
         # init
         """
         new SOFA convolution process, this is more reliable methinks. 
@@ -1290,75 +1735,54 @@ def renderWithSOFA(
         - some SOFA datasets have 0deg = directly to the right of the listener (this is not an incorrect way to reference polar coordinates). however, depending on how the SOFA file was sampled, the previous encoding process of "angle = 360 - angle" may not result in a genuine center position, or may be left heavy.
         - if a SOFA file's coordinate system is "listener from above" instead of "listener from front", this angle reassignment would cause a discrepancy where what is referred to as "0deg" is not exactly 0deg. 
         """
-        SOFA_HRTF = sofa.Database.open(in_sofa_file)
-        sofa_fs_H = SOFA_HRTF.Data.SamplingRate.get_values()[0]
-        sofa_positions = SOFA_HRTF.Source.Position.get_values(system="spherical")
-
         angle = int(angle)
         elev = int(elev)
-        
-        desired_az = angle
-        desired_el = elev
-        az_array = sofa_positions[:,0]
-        el_array = sofa_positions[:,1]
-        
-        dist = np.sqrt((az_array - desired_az) ** 2 + (el_array - desired_el) ** 2)
-        M_idx = np.argmin(dist)
-        
-        SOFA_H = np.zeros((SOFA_HRTF.Dimensions.N, 2))
-        SOFA_H[:, 0] = SOFA_HRTF.Data.IR.get_values(indices={"M": M_idx, "R": 0, "E": 0})
-        SOFA_H[:, 1] = SOFA_HRTF.Data.IR.get_values(indices={"M": M_idx, "R": 1, "E": 0})
 
         # database specific format adjustments
         global angle_label
         global elev_label
         angle_label = angle
         elev_label = elev
-        
-        if sofa_fs_H != target_fs:
-            # print("---\n** Recalc SR **\nSOFA file SR =", sofa_fs_H, "\nTarget SR =", target_fs)
-            # print("---\nOld shape =", SOFA_H.shape)
-            SOFA_H = librosa.core.resample(
-                SOFA_H.transpose(),
-                orig_sr=int(sofa_fs_H),
-                target_sr=int(target_fs),
-                fix=True,
-            ).transpose()
-            # print("New shape =", SOFA_H.shape)
-
-        # pick a source (already picked)
-        [source_x, fs_x] = sf.read(in_source_file)
-        # if it's not mono, make it mono.
-        if len(source_x.shape) > 1:
-            if source_x.shape[1] > 1:
-                source_x = np.mean(source_x, axis=1)
-        if fs_x != target_fs:
-            # print("** Recalc SR **\nAudio file SR =", fs_x, "\nTarget SR =", target_fs)
-            source_x = librosa.core.resample(
-                source_x.transpose(),
-                orig_sr=int(fs_x),
-                target_sr=int(target_fs),
-                fix=True,
-            ).transpose()
-
-        rend_L = signal.fftconvolve(source_x, SOFA_H[:, 0])
-        rend_R = signal.fftconvolve(source_x, SOFA_H[:, 1])
-        M_norm = np.max([np.abs(rend_L), np.abs(rend_R)])
-        Stereo3D = np.zeros((len(rend_L), 2))
-        Stereo3D[:, 0] = rend_L / M_norm
-        Stereo3D[:, 1] = rend_R / M_norm
-
-        exportSOFAConvolved(
-            in_source_file,
-            in_sofa_file,
-            angle_label,
-            elev_label,
-            Stereo3D,
-            sofa_positions,
-            int(target_fs),
-        )
 
-        return Stereo3D
+        # lookup, resampling and convolution live in sofa_render.py so batch_render.py can share them. they run in the background,
+        # and a receiver or emitter that's out of range for this file comes back as a ValueError in an error window
+        dtype = processing_dtype()
+
+        def renderSource(job):
+            return sofa_render.render_sofa(
+                in_source_file,
+                in_sofa_file,
+                angle,
+                elev,
+                int(target_fs),
+                dtype=dtype,
+                receivers=receivers,
+                emitter=emitter,
+                progress=job.report,  # <- a cancelled render stops at its next stage
+            )
+
+        def showRender(result):
+            global Stereo3D
+            Stereo3D, sofa_positions = result
+            if not export:
+                playArray(Stereo3D, int(target_fs))
+                return
+            exportSOFAConvolved(
+                in_source_file,
+                in_sofa_file,
+                angle_label,
+                elev_label,
+                Stereo3D,
+                sofa_positions,
+                int(target_fs),
+            )
+
+        return runJob(
+            "SOFA Rendering",
+            renderSource,
+            on_done=showRender,
+            progress_text="Rendering " + shorten_file_name(os.path.basename(in_source_file), 30) + "...",
+        )
 
 
 def exportSOFAConvolved(
@@ -1399,21 +1823,14 @@ def exportSOFAConvolved(
         return -1
 
     if export_directory:
-        export_filename = (
-            str(
-                os.path.join(
-                    str(export_directory), str(os.path.basename(in_sofa_file)[:-5])
-                )
-            )
-            + "-"
-            + str(os.path.basename(in_source_file)[:-4])
-            + "-azi_"
-            + str(angle_label)
-            + "-elev_"
-            + str(elev_label)
-            + "-export.wav"
+        export_filename = os.path.join(
+            str(export_directory),
+            sofa_render.sofa_export_name(
+                in_sofa_file, in_source_file, angle_label, elev_label
+            ),
         )
-        sf.write(export_filename, audioContent, samplerate=samplerate)
+        # soundfile converts straight from float32, so a single precision render never gets copied up to float64 on its way out
+        sf.write(export_filename, precision.cast(audioContent, processing_dtype()), samplerate=samplerate)
         messageWindow(
             message=(
                 "Using HRTF set: "
@@ -1439,6 +1856,96 @@ def exportSOFAConvolved(
         return -1
 
 
+def renderSceneWithSOFA(
+    in_sofa_file: str,
+    target_fs: int = 48000,
+    receivers: str = "",
+    emitter: str = "",
+):
+    """
+    Renders a scene of many sources (a .csv with columns source,azimuth,elevation and optionally gain) with a given sofa file into one normalized mix, and exports it.
+    Sources are looked up the same way as renderWithSOFA; see scene_render.py.
+
+    Args:
+        in_sofa_file (str): Path to sofa file.
+        target_fs (int, optional): Target sampling rate. Defaults to 48000.
+        receivers (str, optional): Receivers to render, e.g. "0, 1" or "all". Defaults to "" (0, 1, i.e. left and right).
+        emitter (str, optional): Emitter to render. Defaults to "" (0).
+    """
+    scene_file = filedialog.askopenfilename(
+        title="Select Scene File", filetypes=[(".csv files", ".csv")]
+    )
+    root.focus_force()
+    if not scene_file:
+        return
+
+    try:
+        receivers = parse_receivers(receivers)
+        emitter = int(emitter) if str(emitter).strip() else 0
+        scene = scene_render.read_scene(scene_file)
+    except (ValueError, KeyError) as e:
+        errorWindow(
+            "Couldn't read the scene:\n" + str(e) + "\n\nScenes are .csv files with a header row of\nsource,azimuth,elevation,gain",
+            width=400,
+            height=200,
+        )
+        return
+
+    # bad receivers/emitter, or a source file that can't be read, come back as an error window
+    runJob(
+        "Scene Rendering",
+        lambda job: scene_render.render_scene(
+            scene, in_sofa_file, int(target_fs), receivers, emitter, progress=job.report
+        ),
+        on_done=lambda result: exportScene(in_sofa_file, scene_file, scene, result, target_fs),
+        progress_text="Rendering " + str(len(scene)) + " sources...",
+    )
+
+
+def exportScene(in_sofa_file: str, scene_file: str, scene: list, result: tuple, target_fs: int = 48000):
+    """
+    Exports a rendered scene to [sofa]-[scene]-scene-export.wav in a directory the user picks.
+
+    Args:
+        in_sofa_file (str): Path to sofa file.
+        scene_file (str): Path to the scene .csv.
+        scene (list): The scene's sources (see scene_render.read_scene).
+        result (tuple): What scene_render.render_scene returned: the mix, and the number of distinct measurements.
+        target_fs (int, optional): Sampling rate of the mix. Defaults to 48000.
+    """
+    mix, n_groups = result
+    export_directory = filedialog.askdirectory(
+        title="Select Save Directory", initialdir=os.path.dirname(scene_file)
+    )
+    if not export_directory:
+        errorWindow(error_message="\nNot rendered: Export directory not given.")
+        return -1
+    export_filename = os.path.join(
+        str(export_directory),
+        os.path.splitext(os.path.basename(in_sofa_file))[0]
+        + "-"
+        + os.path.splitext(os.path.basename(scene_file))[0]
+        + "-scene-export.wav",
+    )
+    sf.write(export_filename, mix, samplerate=int(target_fs))
+    messageWindow(
+        message=(
+            "Using HRTF set: "
+            + str(os.path.basename(in_sofa_file))
+            + "\n\n"
+            + str(len(scene))
+            + " sources at "
+            + str(n_groups)
+            + " distinct measurements\nmixed into "
+            + str(os.path.basename(export_filename))
+        ),
+        title="Scene Rendering",
+        width=500,
+        height=170,
+        tooltip_text=str(export_filename),
+    )
+
+
 def spectrogramWindow(audio_file_path: str):
     """
     Creates a window to configure the spectrogram with.
@@ -1556,16 +2063,15 @@ def spectrogram(
         dynamic_range_max (str): Upper bound dynamic range of graph in dB. Defaults to auto-calculation by matplotlib.
         plot_title (str): Title of plot. Defaults to file name of given audio file.
     """
-    sr, samples = wavfile.read(str(audio_file_path))
+    # only the header gets read here; the samples are read further down, and only between start_ms and end_ms
+    sr, n_frames = audio_window.audio_info(audio_file_path)
 
     if not plot_title:
         plot_title = os.path.basename(audio_file_path)
-    if len(samples.shape) > 1:
-        samples = samples.transpose()[0]
     if not start_ms:
         start_ms = "0"
     if not end_ms:
-        end_ms = str((len(samples) / sr) * 1000)
+        end_ms = str((n_frames / sr) * 1000)
 
     start_in_samples = (float(start_ms) / 1000) * sr
     end_in_samples = (float(end_ms) / 1000) * sr
@@ -1579,50 +2085,112 @@ def spectrogram(
 
     start_in_samples = int(start_in_samples)
     end_in_samples = int(end_in_samples)
-    rebound_samples = samples[start_in_samples:end_in_samples]
-
-    f, t, spectrogram = signal.spectrogram(rebound_samples, sr)
-
-    fig, ax = plt.subplots()
-    if dynamic_range_min and dynamic_range_max:
-        p = ax.pcolormesh(
-            t,
-            f,
-            10 * np.log10(spectrogram),
-            vmin=int(dynamic_range_min),
-            vmax=int(dynamic_range_max),
-            shading="auto",
-        )
-    elif not dynamic_range_min and dynamic_range_max:
-        p = ax.pcolormesh(
-            t,
-            f,
-            10 * np.log10(spectrogram),
-            vmax=int(dynamic_range_max),
-            shading="auto",
-        )
-    elif dynamic_range_min and not dynamic_range_max:
-        p = ax.pcolormesh(
-            t,
-            f,
-            10 * np.log10(spectrogram),
-            vmin=int(dynamic_range_min),
-            shading="auto",
+
+    start_s = start_in_samples / sr
+    use_pyramid = (end_in_samples - start_in_samples) // (
+        spectrogram_pyramid.NPERSEG - spectrogram_pyramid.NOVERLAP
+    ) > SPECTROGRAM_MAX_COLUMNS
+
+    def computeSpectrogram(job):
+        if use_pyramid:
+            # long windows are drawn from a cached spectrogram pyramid (see spectrogram_pyramid.py), at a resolution that fits the plot.
+            # it covers the whole file if the window is a good part of it, and just the window otherwise
+            job.report(message="Preparing spectrogram (only needed once per window)...")
+            pyramid = spectrogram_pyramid.get_pyramid(
+                audio_file_path, progress=job.report, start=start_in_samples, end=end_in_samples
+            )
+            f, t, spectrogram, level = pyramid.view(
+                start_s, end_in_samples / sr, SPECTROGRAM_MAX_COLUMNS
+            )
+            return pyramid, f, t - start_s, spectrogram, level, sr  # <- times start at the window, same as the direct path
+        rebound_samples, window_sr = audio_window.read_window(
+            audio_file_path, start_in_samples, end_in_samples
+        )  # <- first channel, memory mapped
+        f, t, spectrogram = signal.spectrogram(rebound_samples, window_sr)
+        return None, f, t, spectrogram, None, window_sr
+
+    def drawSpectrogram(pyramid, f, t, spectrogram, level, sr):
+        fig, ax = plt.subplots()
+        if dynamic_range_min and dynamic_range_max:
+            p = ax.pcolormesh(
+                t,
+                f,
+                10 * np.log10(spectrogram),
+                vmin=int(dynamic_range_min),
+                vmax=int(dynamic_range_max),
+                shading="auto",
+            )
+        elif not dynamic_range_min and dynamic_range_max:
+            p = ax.pcolormesh(
+                t,
+                f,
+                10 * np.log10(spectrogram),
+                vmax=int(dynamic_range_max),
+                shading="auto",
+            )
+        elif dynamic_range_min and not dynamic_range_max:
+            p = ax.pcolormesh(
+                t,
+                f,
+                10 * np.log10(spectrogram),
+                vmin=int(dynamic_range_min),
+                shading="auto",
+            )
+        else:
+            p = ax.pcolormesh(t, f, 10 * np.log10(spectrogram), shading="auto")
+
+        ax.set_ylim(1, int(sr / 2))
+        ax.set_ylabel("Frequency (Hz)")
+        ax.set_xlabel("Time (s)")
+
+        colorbar = fig.colorbar(p, label="Intensity (dB)")
+        fig.canvas.manager.set_window_title(
+            str("Spectrogram for " + os.path.basename(audio_file_path))
         )
-    else:
-        p = ax.pcolormesh(t, f, 10 * np.log10(spectrogram), shading="auto")
 
-    ax.set_ylim(1, int(sr / 2))
-    ax.set_ylabel("Frequency (Hz)")
-    ax.set_xlabel("Time (s)")
+        if pyramid is not None:
+            # zooming/panning redraws the visible part from whichever pyramid level fits, instead of scaling one huge mesh
+            ax.set_autoscale_on(False)
+            mesh = {"p": p, "level": level, "span": (t[0], t[-1]) if len(t) else (0, 0)}
 
-    fig.colorbar(p, label="Intensity (dB)")
-    fig.canvas.manager.set_window_title(
-        str("Spectrogram for " + os.path.basename(audio_file_path))
-    )
+            def refreshSpectrogram(ax):
+                x_start, x_end = ax.get_xlim()
+                f, t, spectrogram, level = pyramid.view(
+                    start_s + max(x_start, 0), start_s + x_end, SPECTROGRAM_MAX_COLUMNS
+                )
+                t = t - start_s
+                if not len(t) or (
+                    level == mesh["level"]
+                    and mesh["span"][0] <= max(x_start, 0)
+                    and x_end <= mesh["span"][1]
+                ):
+                    return  # <- the current mesh already covers the view at this resolution
+                old_p = mesh["p"]
+                new_p = ax.pcolormesh(
+                    t,
+                    f,
+                    10 * np.log10(spectrogram),
+                    norm=old_p.norm,
+                    cmap=old_p.cmap,
+                    shading="auto",
+                )
+                old_p.remove()
+                colorbar.update_normal(new_p)
+                mesh.update({"p": new_p, "level": level, "span": (t[0], t[-1])})
+                ax.figure.canvas.draw_idle()
 
-    plt.title(str(plot_title))
-    plt.show()
+            ax.callbacks.connect("xlim_changed", refreshSpectrogram)
+
+        plt.title(str(plot_title))
+        plt.show()
+
+    # the stft runs in the background, the plot gets drawn on the ui thread once it's done
+    runJob(
+        "Spectrogram",
+        computeSpectrogram,
+        on_done=lambda result: drawSpectrogram(*result),
+        progress_text="Computing spectrogram...",
+    )
 
 
 def callback_url(url: str):
@@ -1723,7 +2291,7 @@ def hrtfHelpPage():
 
     resampleTutorialLabel = tk.Label(
         tutorialWindowContentFrame,
-        text='"Resample"\nResamples source file to match sample rate of loaded HRTF file.\nResampled source file is held in memory, not exported.\nSource File Stereo -> Mono MUST be pressed first!\n',
+        text='"Resample"\nBrings the source and HRTF files to one sample rate, resampling\nwhichever is quicker (usually the HRTF file, keeping the source as is).\nResampled files are held in memory, not exported.\nSource File Stereo -> Mono MUST be pressed first!\n',
     )
     resampleTutorialLabel.grid(row=5, column=1)
     timeDomainConvolveTutorialLabel = tk.Label(
@@ -1733,7 +2301,7 @@ def hrtfHelpPage():
     timeDomainConvolveTutorialLabel.grid(row=6, column=1)
     exportConvolvedTutorialLabel = tk.Label(
         tutorialWindowContentFrame,
-        text='"Export convolved..."\nExports the time domain convolved file loaded in memory.\nFile naming convention is:\n[Source File Name]-[HRTF File Name]-export.wav\n',
+        text='"Export convolved..."\nExports the time domain convolved file loaded in memory.\nFile naming convention is:\n[Source File Name]-[HRTF File Name]-export.wav\n"Play convolved" plays it without exporting.\n',
     )
     exportConvolvedTutorialLabel.grid(row=7, column=1)
 
@@ -1814,7 +2382,7 @@ def sofaHelpPage():
     saveSOFAFileTutorialLabel.grid(row=6, column=2)
     renderSOFATutorialLabel = tk.Label(
         tutorialWindowContentFrame,
-        text='"Render source with SOFA file..."\nConvolves the source file with\nthe desired values in the .SOFA file.\nDisabled if multiple .SOFA files are selected.\n',
+        text='"Render source with SOFA file..."\nConvolves the source file with\nthe desired values in the .SOFA file.\n"Play source with SOFA file" plays the render\nwithout exporting it.\nDisabled if multiple .SOFA files are selected.\n',
     )
     renderSOFATutorialLabel.grid(row=7, column=1)
 
@@ -1913,6 +2481,7 @@ def generalHelpPage():
         - Magnitude (dB): -150, 0
         - Azimuth (deg): 0
         - Elevation (deg): 0
+        - Receivers: 0, 1 (renders get one channel per receiver, "all" renders every one)
     """,
         justify="left",
     )
@@ -1972,7 +2541,9 @@ def quit_function():
     """
     Quit function that properly closes out of pygame and the python script, which prevents a segfault when this project is compiled by nuitka.
     """    
-    pygame.quit()
+    job_executor.shutdown()  # <- jobs that report progress stop at their next report instead of holding up the exit
+    if "pygame" in sys.modules: # <- pygame is imported lazily, so don't import it just to quit it
+        pygame.quit()
     sys.exit()
 
 def apply_theme_to_titlebar(
@@ -1998,7 +2569,7 @@ def apply_theme_to_titlebar(
 
 
 root = tk.Tk()
-root.minsize(565, 960)
+root.minsize(565, 1080)
 root.grid_columnconfigure(0, weight=1)
 root.grid_rowconfigure(0, weight=1)
 
@@ -2010,6 +2581,8 @@ root.option_add('*tearOff', False)
 root_menubar = tk.Menu(root)
 root['menu'] = root_menubar
 
+singlePrecisionBooleanVar = tk.BooleanVar(value=False)  # <- see processing_dtype()
+
 # File menu
 root_menu_file = tk.Menu(root_menubar)
 root_menubar.add_cascade(menu=root_menu_file, label='File')
@@ -2081,9 +2654,33 @@ root_menu_file_sofa.add_command(label='Render source with SOFA file...',
                                                     elevationStringVar.get(),
                                                     source_file,
                                                     sofa_file_path_list[0],
+                                                    receivers=sofaReceiversStringVar.get(),
+                                                    emitter=sofaEmitterStringVar.get(),
+                                                ),
+                                state='disabled')
+root_menu_file_sofa.add_command(label='Render scene with SOFA file...',
+                                command=lambda: renderSceneWithSOFA(
+                                                    sofa_file_path_list[0],
+                                                    receivers=sofaReceiversStringVar.get(),
+                                                    emitter=sofaEmitterStringVar.get(),
+                                                ),
+                                state='disabled')
+root_menu_file_sofa.add_command(label='Play source with SOFA file',
+                                command=lambda: renderWithSOFA(
+                                                    azimuthStringVar.get(),
+                                                    elevationStringVar.get(),
+                                                    source_file,
+                                                    sofa_file_path_list[0],
+                                                    receivers=sofaReceiversStringVar.get(),
+                                                    emitter=sofaEmitterStringVar.get(),
+                                                    export=False,
                                                 ),
                                 state='disabled')
 
+root_menu_file.add_separator()
+root_menu_file.add_checkbutton(label='Single precision (float32) processing',
+                               variable=singlePrecisionBooleanVar)
+
 
 if sys.platform == "darwin": # macOS
     # Shortcuts for file menu
@@ -2257,6 +2854,14 @@ exportConvolvedButton = ttk.Button(
     command=lambda: exportConvolved(Bin_Mix, fs_s, source_file, hrtf_file),
 )
 exportConvolvedButton.grid(row=3, column=1)
+playConvolvedButton = ttk.Button(
+    hrtfOperationsFrame,
+    text="Play convolved",
+    style="my.TButton",
+    state="disabled",
+    command=lambda: playArray(Bin_Mix, fs_s),
+)
+playConvolvedButton.grid(row=4, column=1)
 
 sectionalLabel = ttk.Label(rootFrame, text="\n")
 sectionalLabel.grid(row=2, column=0, columnspan=3)
@@ -2290,6 +2895,7 @@ freqXLimStringVar = tk.StringVar()
 magYLimStringVar = tk.StringVar()
 azimuthStringVar = tk.StringVar()
 elevationStringVar = tk.StringVar()
+sofaReceiversStringVar = tk.StringVar()
 
 bottomLeftFrame = tk.Frame(bottomSectionFrame, borderwidth=10, relief="flat")
 bottomLeftFrame.grid(row=2, column=0)
@@ -2333,7 +2939,7 @@ sofaEmitterTextBox = ttk.Entry(
 )
 sofaEmitterTextBox.grid(row=2, column=0)
 sofaEmitterLabel = ttk.Label(
-    bottomRightFrame, text="Emitter\n(default: 1)\n", justify="center"
+    bottomRightFrame, text="Emitter\n(default: 0)\n", justify="center"
 )
 sofaEmitterLabel.grid(row=3, column=0)
 
@@ -2412,6 +3018,15 @@ elevationLabel = ttk.Label(
 )
 elevationLabel.grid(row=9, column=0)
 
+sofaReceiversTextBox = ttk.Entry(
+    bottomLeftFrame, state="disabled", width=15, textvariable=sofaReceiversStringVar
+)
+sofaReceiversTextBox.grid(row=10, column=0)
+sofaReceiversLabel = ttk.Label(
+    bottomLeftFrame, text="Receivers to render\n(default: 0, 1; or all)", justify="center"
+)
+sofaReceiversLabel.grid(row=11, column=0)
+
 sofaRenderButton = ttk.Button(
     bottomSectionFrame,
     text="Render source with SOFA file...",
@@ -2422,9 +3037,27 @@ sofaRenderButton = ttk.Button(
         elevationStringVar.get(),
         source_file,
         sofa_file_path_list[0],
+        receivers=sofaReceiversStringVar.get(),
+        emitter=sofaEmitterStringVar.get(),
     ),
 )
 sofaRenderButton.grid(row=5, column=0, columnspan=3)
+sofaPlayButton = ttk.Button(
+    bottomSectionFrame,
+    text="Play source with SOFA file",
+    style="my.TButton",
+    state="disabled",
+    command=lambda: renderWithSOFA(
+        azimuthStringVar.get(),
+        elevationStringVar.get(),
+        source_file,
+        sofa_file_path_list[0],
+        receivers=sofaReceiversStringVar.get(),
+        emitter=sofaEmitterStringVar.get(),
+        export=False,
+    ),
+)
+sofaPlayButton.grid(row=6, column=0, columnspan=3)
 
 tutorialButton = ttk.Button(
     rootFrame, text="Help", style="my.TButton", command=lambda: createHelpWindow()
@@ -2439,7 +3072,28 @@ quitButton.grid(row=6, column=2, sticky="E")
 # prevents the window from appearing at the bottom of the stack
 root.focus_force()
 
-root.protocol("WM_DELETE_WINDOW", lambda: sys.exit())
+root.protocol("WM_DELETE_WINDOW", lambda: (job_executor.shutdown(), sys.exit()))
+
+# long operations run as background jobs; while one runs, everything that could start another (or change its inputs) is disabled
+control_lock = jobs.ControlLock(
+    [
+        selectHRTFFileButton,
+        selectSourceFileButton,
+        stereoToMonoButton,
+        resampleButton,
+        timeDomainConvolveButton,
+        exportConvolvedButton,
+        playConvolvedButton,  # <- plays from globals that resample & render jobs replace
+        selectSOFAFileButton,
+        sofaViewButton,
+        sofaSaveButton,
+        sofaRenderButton,
+        sofaPlayButton,
+    ]
+    + [(root_menu_file_hrtf, 0), (root_menu_file_source, 0), (root_menu_file_source, 4)]
+    + [(root_menu_file_sofa, index) for index in (0, 5, 6, 8, 9, 10)]
+)
+job_executor = jobs.JobExecutor(root.after, on_busy=control_lock.set)
 
 if sys.platform != 'win32':
     ttkStyles = ttk.Style()
@@ -2453,4 +3107,10 @@ if sys.platform == 'win32':
     apply_theme_to_titlebar(root) # yes i know this is redundant
     pass
 
+if os.environ.get("GGHSF_STARTUP_BENCHMARK"):
+    # set by benchmarks/bench_startup.py: report when the window is up and idle, then close
+    root.after_idle(
+        lambda: (print("GGHSF_WINDOW_READY " + repr(time.time()), flush=True), root.destroy())
+    )
+
 root.mainloop()
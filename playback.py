@@ -0,0 +1,156 @@
+# in-memory playback through one persistent pygame mixer session.
+# playAudio used to call pygame.mixer.init() on every click, and rendered audio (Bin_Mix, Stereo3D) could only be heard by exporting it
+# to a .wav and loading that back. here the mixer is initialised once and kept, and ndarrays are handed to it directly as a Sound
+# (pygame.sndarray), so auditioning a render is a conversion to the mixer's sample format and nothing else.
+# the mixer is only re-initialised when an array comes in at a different sampling rate than the session's, since Sounds aren't resampled
+# by pygame. files still stream through pygame.mixer.music, which resamples on its own, on the same session.
+# pygame is imported on first use, so importing this module stays cheap.
+
+import threading  # <- playback can be started from worker threads
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+DEFAULT_FS = 48000
+DEFAULT_CHANNELS = 2
+BUFFER_SIZE = 1024  # <- mixer buffer in samples, pygame's default latency
+
+# mixer sample size (as reported by pygame.mixer.get_init) -> numpy dtype Sounds have to be made of
+SAMPLE_FORMATS = {
+    8: np.uint8,
+    -8: np.int8,
+    16: np.uint16,
+    -16: np.int16,
+    32: np.float32,
+}
+
+_lock = threading.RLock()
+_sound = None  # <- the Sound that's playing, kept alive for as long as it plays
+
+
+def mixer(fs: int = None):
+    """
+    Returns the mixer session, initialising it on first use (or if fs differs from the session's rate).
+
+    Args:
+        fs (int, optional): Sampling rate the session should run at. Defaults to None (whatever's running, or DEFAULT_FS).
+
+    Returns:
+        tuple: (sampling rate, sample size, channels) the mixer actually runs at.
+    """
+    import pygame
+
+    with _lock:
+        session = pygame.mixer.get_init()
+        if session is not None and (fs is None or session[0] == int(fs)):
+            return session
+        if session is not None:
+            stop()
+            pygame.mixer.quit()
+        pygame.mixer.init(frequency=int(fs or DEFAULT_FS), size=-16, channels=DEFAULT_CHANNELS, buffer=BUFFER_SIZE)
+        return pygame.mixer.get_init()
+
+
+def to_mixer_array(x: np.ndarray, size: int = -16, channels: int = DEFAULT_CHANNELS):
+    """
+    Converts audio to the sample format and channel count of a mixer session.
+    Mono is copied to every channel, extra channels (e.g. more receivers than the mixer has outputs) are dropped, and audio that
+    goes over full scale (e.g. an unnormalized convolution) is scaled down to fit instead of clipping.
+
+    Args:
+        x (np.ndarray): Audio with shape (samples,) or (samples, channels), float in [-1, 1] or integer PCM.
+        size (int, optional): Mixer sample size (see SAMPLE_FORMATS). Defaults to -16.
+        channels (int, optional): Mixer channels. Defaults to DEFAULT_CHANNELS.
+
+    Returns:
+        np.ndarray: C-contiguous array with shape (samples, channels), or (samples,) for a mono mixer.
+    """
+    if size not in SAMPLE_FORMATS:
+        raise ValueError("Unsupported mixer sample size: {0}".format(size))
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.integer):
+        x = x / float(np.iinfo(x.dtype).max + 1)
+    x = x.reshape(len(x), -1)
+    if x.shape[1] == 1:
+        x = np.repeat(x, channels, axis=1)
+    elif x.shape[1] >= channels:
+        x = x[:, :channels]
+    else:
+        x = np.pad(x, ((0, 0), (0, channels - x.shape[1])))
+    peak = np.max(np.abs(x)) if x.size else 0.0
+    if peak > 1.0:
+        x = x / peak
+
+    dtype = np.dtype(SAMPLE_FORMATS[size])
+    if dtype.kind == "f":
+        out = x.astype(dtype)
+    else:
+        info = np.iinfo(dtype)
+        scale = (int(info.max) - int(info.min)) / 2.0
+        offset = 0.0 if info.min < 0 else scale  # <- unsigned formats are centred on half scale
+        out = np.clip(np.round(x * scale + offset), info.min, info.max).astype(dtype)
+    if channels == 1:
+        out = out[:, 0]
+    return np.ascontiguousarray(out)
+
+
+def play_array(x: np.ndarray, fs: int):
+    """
+    Plays audio straight from memory, replacing whatever's playing.
+
+    Args:
+        x (np.ndarray): Audio with shape (samples,) or (samples, channels).
+        fs (int): Sampling rate of x.
+    """
+    global _sound
+    import pygame
+
+    with _lock:
+        stop()
+        rate, size, channels = mixer(fs)
+        _sound = pygame.sndarray.make_sound(to_mixer_array(x, size, channels))
+        _sound.play()
+
+
+def play_file(path: str):
+    """
+    Streams an audio file, replacing whatever's playing.
+
+    Args:
+        path (str): Path to audio file.
+    """
+    import pygame
+
+    with _lock:
+        stop()
+        mixer()
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play()
+
+
+def pause():
+    """
+    Pauses whatever's playing (files and arrays). Does nothing if the mixer was never started.
+    """
+    import pygame
+
+    with _lock:
+        if pygame.mixer.get_init() is None:
+            return
+        pygame.mixer.music.pause()
+        pygame.mixer.pause()
+
+
+def stop():
+    """
+    Stops whatever's playing (files and arrays), keeping the session.
+    """
+    global _sound
+    import pygame
+
+    with _lock:
+        if pygame.mixer.get_init() is None:
+            return
+        pygame.mixer.music.stop()
+        if _sound is not None:
+            _sound.stop()
+            _sound = None
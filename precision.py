@@ -0,0 +1,47 @@
+# single precision (float32) processing.
+# everything used to run in float64: sf.read's default, the resamplers, and the convolution buffers. float32 halves the memory
+# of every signal and buffer along the way and makes the ffts and convolutions faster (1.1-1.7x, depending on the backend),
+# at an error far below what a 16-bit export can even represent.
+# the rendering functions take a dtype argument, which goes through resolve(), so only these two are accepted.
+#
+# error bounds against the float64 path, as the largest absolute sample error relative to full scale (renders are peak normalized,
+# so full scale is 1.0). measured by benchmarks/bench_precision.py, which fails if any of them is exceeded:
+# - resampling (44.1k/96k -> 48k): below 1e-6 (-120 dBFS). soxr's HQ preset works in single precision internally anyway
+# - convolution with a 256-1024 tap HRIR, any backend: below 2e-6 (-114 dBFS), typically 2e-7
+# - a full render (read, resample, convolve, normalize): below 2e-6 (-114 dBFS), typically 5e-7
+# for reference, one step of a 16-bit export is 3.1e-5 (-90 dBFS), so a float32 render written as 16-bit differs from the float64 one
+# by at most one step, and only on samples that sit right on a rounding boundary.
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+DEFAULT_DTYPE = "float64"
+ERROR_BOUNDS = {"resample": 1e-6, "convolve": 2e-6, "render": 2e-6}  # <- see above
+
+
+def resolve(dtype=None):
+    """
+    Args:
+        dtype (str or np.dtype, optional): "float32" or "float64" (or the numpy types). Defaults to None (DEFAULT_DTYPE).
+
+    Returns:
+        np.dtype: The processing dtype.
+    """
+    name = np.dtype(dtype or DEFAULT_DTYPE).name
+    if name not in PRECISIONS:
+        raise ValueError("Unsupported processing dtype: {0}. Expected one of: {1}".format(name, ", ".join(PRECISIONS)))
+    return np.dtype(PRECISIONS[name])
+
+
+def cast(x: np.ndarray, dtype=None):
+    """
+    Converts a signal to a processing dtype, without copying if it's already there.
+
+    Args:
+        x (np.ndarray): Signal.
+        dtype (str or np.dtype, optional): See resolve(). Defaults to None (DEFAULT_DTYPE).
+
+    Returns:
+        np.ndarray: x as dtype.
+    """
+    return np.asarray(x, dtype=resolve(dtype))
@@ -0,0 +1,382 @@
+# real-time binaural engine: a mono input is rendered block by block with a pull-style process(block), the way an audio callback would drive it.
+# the filters are the cached HRIRs (hrir_cache), cut into block sized partitions up front (convolution.PartitionedConvolver), so the latency
+# is one block whatever the HRIR length and nothing is read, resampled or allocated per measurement while running.
+# direction changes (head tracker orientation, source position) go through a control queue that's drained at the start of every block,
+# so they can come from any thread, e.g. UDPControl, a stand-in for an OSC head tracker. the latest change per block wins, and switching
+# to another measurement is crossfaded over that block.
+# every block's processing time is measured against its deadline (block_size / fs), so the engine can be tested offline, without an
+# audio device, and report whether it would keep up.
+#
+# control messages are one per UDP datagram, either text or OSC (float/int/double arguments), in degrees:
+#   head <yaw> [pitch] [roll]     or /head ,fff       <- head orientation, yaw counter-clockwise (to the left) like azimuth, pitch up
+#   source <azimuth> <elevation>  or /source ,ff      <- source direction in the room
+#
+#   python realtime_engine.py source.wav subject.sofa out.wav --azimuth 30 --rotate 45
+#   python realtime_engine.py source.wav subject.sofa out.wav --block-size 128 --udp-port 9000 --paced
+
+import sys  # <- exit codes
+import time  # <- per-block timing, pacing
+import queue  # <- control queue
+import socket  # <- udp control
+import struct  # <- osc arguments
+import argparse  # <- cli
+import threading  # <- udp control thread
+from collections import deque  # <- recent block times
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+import convolution  # <- partitioned convolution
+import hrir_cache  # <- cached (resampled) impulse responses, receiver/emitter checks
+import spatial_index  # <- nearest-measurement lookup
+import precision  # <- processing dtype
+
+DEFAULT_BLOCK_SIZE = 256  # <- 5.3 ms at 48 kHz
+TIMING_WINDOW = 10000  # <- blocks kept for the mean/percentile figures; max and overruns count every block
+DEFAULT_UDP_PORT = 9000
+
+
+def rotation_matrix(yaw: float, pitch: float = 0.0, roll: float = 0.0):
+    """
+    Head orientation as a rotation matrix (yaw about z, then pitch about y, then roll about x).
+
+    Args:
+        yaw (float): Counter-clockwise (to the left) in degrees, like azimuth.
+        pitch (float, optional): Up in degrees. Defaults to 0.
+        roll (float, optional): Right ear down in degrees. Defaults to 0.
+
+    Returns:
+        np.ndarray: 3x3 rotation matrix from head to room coordinates.
+    """
+    y, p, r = np.radians([yaw, pitch, roll])
+    Rz = np.array([[np.cos(y), -np.sin(y), 0], [np.sin(y), np.cos(y), 0], [0, 0, 1]])
+    Ry = np.array([[np.cos(p), 0, -np.sin(p)], [0, 1, 0], [np.sin(p), 0, np.cos(p)]])
+    Rx = np.array([[1, 0, 0], [0, np.cos(r), -np.sin(r)], [0, np.sin(r), np.cos(r)]])
+    return Rz @ Ry @ Rx
+
+
+def head_relative(azimuth: float, elevation: float, yaw: float = 0.0, pitch: float = 0.0, roll: float = 0.0):
+    """
+    Direction of a source as seen from a turned head.
+
+    Args:
+        azimuth (float): Source azimuth in the room, in degrees.
+        elevation (float): Source elevation in the room, in degrees.
+        yaw (float, optional): Head yaw in degrees. Defaults to 0.
+        pitch (float, optional): Head pitch in degrees. Defaults to 0.
+        roll (float, optional): Head roll in degrees. Defaults to 0.
+
+    Returns:
+        float: Azimuth relative to the head, 0-360.
+        float: Elevation relative to the head.
+    """
+    v = rotation_matrix(yaw, pitch, roll).T @ spatial_index.spherical_to_unit(azimuth, elevation)
+    az = np.degrees(np.arctan2(v[1], v[0])) % 360
+    el = np.degrees(np.arcsin(np.clip(v[2], -1, 1)))
+    return float(az), float(el)
+
+
+def _osc_string(data: bytes, offset: int):
+    end = data.index(b"\x00", offset)
+    return data[offset:end].decode("ascii"), (end + 4) & ~3  # <- null terminated, padded to 4 bytes
+
+
+def parse_control(data: bytes):
+    """
+    Parses one control message (see the top of this file).
+
+    Args:
+        data (bytes): Text or OSC message.
+
+    Returns:
+        str: "head" or "source".
+        list: Values in degrees.
+    """
+    if data.startswith(b"/") and b"\x00" in data:
+        address, offset = _osc_string(data, 0)
+        values = []
+        if offset < len(data) and data[offset : offset + 1] == b",":
+            tags, offset = _osc_string(data, offset)
+            for tag in tags[1:]:
+                fmt = {"f": ">f", "i": ">i", "d": ">d"}.get(tag)
+                if fmt is None:
+                    raise ValueError("Unsupported OSC argument type: {0}".format(tag))
+                values.append(float(struct.unpack_from(fmt, data, offset)[0]))
+                offset += struct.calcsize(fmt)
+    else:
+        parts = data.decode("utf-8").split()
+        if not parts:
+            raise ValueError("Empty control message.")
+        address, values = parts[0], [float(v) for v in parts[1:]]
+    kind = address.strip("/").split("/")[-1].lower()
+    if kind not in ("head", "source"):
+        raise ValueError("Unknown control message: {0}".format(address))
+    if not values or (kind == "head" and len(values) > 3) or (kind == "source" and len(values) != 2):
+        raise ValueError("Wrong number of values for {0}: {1}".format(kind, len(values)))
+    return kind, values
+
+
+class BinauralEngine(object):
+    """
+    Block-based renderer of one mono source, with the head orientation and source direction changing while it runs.
+
+    Args:
+        in_sofa_file (str): Path to sofa file.
+        fs (int, optional): Sampling rate of the input and output. Defaults to 48000.
+        block_size (int, optional): Samples per block. Defaults to DEFAULT_BLOCK_SIZE.
+        receivers (list, optional): Receivers to render, one output channel each (None for all of them). Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render. Defaults to 0.
+        azimuth (float, optional): Initial source azimuth. Defaults to 0.
+        elevation (float, optional): Initial source elevation. Defaults to 0.
+        dtype (str, optional): Processing dtype (see precision.py). Defaults to None (precision.DEFAULT_DTYPE).
+    """
+
+    def __init__(
+        self,
+        in_sofa_file: str,
+        fs: int = 48000,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        receivers=(0, 1),
+        emitter: int = 0,
+        azimuth: float = 0.0,
+        elevation: float = 0.0,
+        dtype=None,
+    ):
+        self.fs = int(fs)
+        self.block_size = int(block_size)
+        self.dtype = precision.resolve(dtype)
+        ir = hrir_cache.get_hrirs(in_sofa_file, self.fs)
+        self.receivers, self.emitter = hrir_cache.resolve_channels(ir.shape, receivers, emitter)
+        # every measurement's partitions up front, (M, partitions, F, channels), so a direction change is only a lookup
+        spectra = convolution.partition_spectra(ir[:, self.receivers, self.emitter, :].astype(self.dtype), self.block_size)
+        self.partitions = np.ascontiguousarray(np.moveaxis(spectra, 1, -1))
+        self.index = spatial_index.get_index(in_sofa_file)
+        self.convolver = convolution.PartitionedConvolver(
+            self.block_size, self.partitions.shape[1], len(self.receivers), dtype=self.dtype
+        )
+        self.controls = queue.Queue()
+        self.source = (float(azimuth), float(elevation))
+        self.head = (0.0, 0.0, 0.0)
+        self.M_idx = None
+        self._update_filter()
+        self.reset_timing()
+
+    @property
+    def channels(self):
+        return len(self.receivers)
+
+    @property
+    def deadline(self):
+        """
+        Time one block may take, in seconds.
+        """
+        return self.block_size / self.fs
+
+    def set_head(self, yaw: float, pitch: float = 0.0, roll: float = 0.0):
+        """
+        Queues a head orientation, applied from the next block. Safe to call from any thread.
+        """
+        self.controls.put(("head", [yaw, pitch, roll]))
+
+    def set_source(self, azimuth: float, elevation: float):
+        """
+        Queues a source direction, applied from the next block. Safe to call from any thread.
+        """
+        self.controls.put(("source", [azimuth, elevation]))
+
+    def _drain_controls(self):
+        changed = False
+        while True:
+            try:
+                kind, values = self.controls.get_nowait()
+            except queue.Empty:
+                return changed
+            if kind == "head":
+                self.head = tuple(float(v) for v in (list(values) + [0.0, 0.0])[:3])
+            else:
+                self.source = (float(values[0]), float(values[1]))
+            changed = True
+
+    def _update_filter(self):
+        az, el = head_relative(*self.source, *self.head)
+        M_idx = self.index.query(az, el)
+        if M_idx != self.M_idx:
+            self.convolver.set_filter_spectrum(self.partitions[M_idx])  # <- crossfaded in over the next block
+            self.M_idx = M_idx
+
+    def process(self, block: np.ndarray):
+        """
+        Renders the next block. Pending direction changes are applied first.
+
+        Args:
+            block (np.ndarray): Mono input, block_size samples (only the last block of a stream may be shorter).
+
+        Returns:
+            np.ndarray: Output block with shape (len(block), channels).
+        """
+        start = time.perf_counter()
+        if self._drain_controls():
+            self._update_filter()
+        out = self.convolver.process(block)
+        elapsed = time.perf_counter() - start
+        self._times.append(elapsed)
+        self._blocks += 1
+        self._max_time = max(self._max_time, elapsed)
+        if elapsed > self.deadline:
+            self._overruns += 1
+        return out
+
+    def reset(self):
+        """
+        Clears the audio history (e.g. before another stream). Direction and timing are kept.
+        """
+        self.convolver.reset()
+
+    def reset_timing(self):
+        self._times = deque(maxlen=TIMING_WINDOW)
+        self._blocks = 0
+        self._max_time = 0.0
+        self._overruns = 0
+
+    def timing(self):
+        """
+        Block processing times against the deadline.
+
+        Returns:
+            dict: blocks, overruns, deadline_ms, mean_ms, p99_ms, max_ms, and load (mean time / deadline).
+        """
+        times = np.asarray(self._times) if self._times else np.zeros(1)
+        return {
+            "blocks": self._blocks,
+            "overruns": self._overruns,
+            "deadline_ms": 1000 * self.deadline,
+            "mean_ms": 1000 * float(np.mean(times)),
+            "p99_ms": 1000 * float(np.percentile(times, 99)),
+            "max_ms": 1000 * self._max_time,
+            "load": float(np.mean(times)) / self.deadline,
+        }
+
+
+class UDPControl(threading.Thread):
+    """
+    Listens for control messages (see the top of this file) on a UDP port and queues them on an engine.
+    Malformed messages are counted in .errors and otherwise ignored.
+
+    Args:
+        engine (BinauralEngine): Engine to control.
+        port (int, optional): Port to listen on. Defaults to DEFAULT_UDP_PORT.
+        host (str, optional): Address to bind. Defaults to "127.0.0.1".
+    """
+
+    def __init__(self, engine: BinauralEngine, port: int = DEFAULT_UDP_PORT, host: str = "127.0.0.1"):
+        super(UDPControl, self).__init__(daemon=True)
+        self.engine = engine
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, int(port)))
+        self.socket.settimeout(0.1)  # <- so stop() is noticed
+        self.address = self.socket.getsockname()
+        self.received = 0
+        self.errors = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    data, _ = self.socket.recvfrom(1024)
+                except socket.timeout:
+                    continue
+                try:
+                    kind, values = parse_control(data)
+                except (ValueError, UnicodeDecodeError, struct.error):
+                    self.errors += 1
+                    continue
+                self.engine.controls.put((kind, values))
+                self.received += 1
+        finally:
+            self.socket.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_offline(engine: BinauralEngine, source_x: np.ndarray, rotate: float = 0.0, paced: bool = False):
+    """
+    Drives an engine over a whole signal like an audio callback would, without an audio device.
+
+    Args:
+        engine (BinauralEngine): Engine, at the sampling rate of source_x.
+        source_x (np.ndarray): Mono signal.
+        rotate (float, optional): Head yaw speed in degrees per second, queued before every block as a simulated head tracker. Defaults to 0.
+        paced (bool, optional): Wait for each block's slot in real time, e.g. while UDPControl is taking live input. Defaults to False.
+
+    Returns:
+        np.ndarray: Output with shape (len(source_x), channels).
+    """
+    B = engine.block_size
+    out = np.zeros((len(source_x), engine.channels), dtype=engine.dtype)
+    start = time.perf_counter()
+    for b, first in enumerate(range(0, len(source_x), B)):
+        if rotate:
+            engine.set_head(rotate * first / engine.fs)
+        block = source_x[first : first + B]
+        out[first : first + len(block)] = engine.process(block)
+        if paced:
+            wait = start + (b + 1) * engine.deadline - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the real-time binaural engine offline over a file and report its block timing.")
+    parser.add_argument("source", help="mono (or downmixed) source file")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("out", nargs="?", default=None, help="output file (optional)")
+    parser.add_argument("--fs", type=int, default=48000, help="sampling rate (default: 48000)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="samples per block (default: {0})".format(DEFAULT_BLOCK_SIZE))
+    parser.add_argument("--azimuth", type=float, default=0.0, help="source azimuth (default: 0)")
+    parser.add_argument("--elevation", type=float, default=0.0, help="source elevation (default: 0)")
+    parser.add_argument("--rotate", type=float, default=0.0, help="simulated head yaw speed in degrees per second (default: 0)")
+    parser.add_argument("--receivers", default="0,1", help='receivers to render, e.g. "all", "0,1" or "0:32" (default: 0,1)')
+    parser.add_argument("--emitter", type=int, default=0, help="emitter to render (default: 0)")
+    parser.add_argument("--dtype", default=None, choices=sorted(precision.PRECISIONS), help="processing dtype (default: float64)")
+    parser.add_argument("--udp-port", type=int, default=None, help="also take control messages on this UDP port")
+    parser.add_argument("--paced", action="store_true", help="run in real time instead of as fast as possible")
+    args = parser.parse_args(argv)
+
+    import soundfile as sf
+    import sofa_render
+    from batch_render import parse_receivers
+
+    source_x, fs_x = sofa_render.load_mono_source(args.source, dtype=args.dtype)
+    source_x = sofa_render.resample(source_x, fs_x, args.fs)
+    engine = BinauralEngine(
+        args.sofa, args.fs, args.block_size, parse_receivers(args.receivers), args.emitter,
+        args.azimuth, args.elevation, dtype=args.dtype,
+    )
+    control = None
+    if args.udp_port is not None:
+        control = UDPControl(engine, args.udp_port)
+        control.start()
+        print("listening for control messages on {0}:{1}".format(*control.address))
+    try:
+        out = run_offline(engine, source_x, rotate=args.rotate, paced=args.paced)
+    finally:
+        if control is not None:
+            control.stop()
+    if args.out:
+        sf.write(args.out, sofa_render.peak_normalize(out), samplerate=args.fs)
+
+    stats = engine.timing()
+    print(
+        "{blocks} blocks of {0} samples ({1} partitions): mean {mean_ms:.3f} ms, p99 {p99_ms:.3f} ms, max {max_ms:.3f} ms "
+        "against a {deadline_ms:.3f} ms deadline (load {load:.1%}), {overruns} overruns".format(
+            engine.block_size, engine.partitions.shape[1], **stats
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+# picks where in a render the sampling rate conversion happens.
+# renders used to resample the whole source to the output rate no matter what, and the HRTF tab always upsampled whichever signal had the
+# lower rate, so a multi-minute source got resampled even when only a 256 tap HRIR needed converting. resampling long sources is most of
+# a render's time, so here every way of getting to the output rate gets a cost estimate and the cheapest one is used:
+#   none    every rate already matches
+#   hrir    only the impulse responses get resampled (the source is already at the output rate)
+#   source  source and impulse responses get resampled to the output rate, then the render happens there (what renders always did)
+#   output  the render happens at the source's own rate (impulse responses resampled to it, if they need to be), then the render
+#           gets resampled to the output rate once
+# costs come from resampling.estimate_cost() and convolution.estimate_cost(), which share units, so resampling is weighed against the
+# cost of convolving at one rate or the other. resampling a whole HRIR tensor counts unless hrir_cache already has it at that rate.
+# the chosen plan and its cost go to the "resample_plan" logger (info level), and the cli prints every plan for a file pair:
+#
+#   python resample_plan.py source.wav subject.sofa --fs 48000
+
+import sys  # <- exit codes
+import logging  # <- chosen plans
+import argparse  # <- cli
+
+import convolution  # <- convolution costs
+import resampling  # <- resampling costs
+
+PLANS = ("none", "hrir", "source", "output")
+
+logger = logging.getLogger("resample_plan")
+
+
+class ResamplePlan(object):
+    """
+    One way of getting a render (or a source and HRIR pair) to a sampling rate.
+
+    Args:
+        name (str): One of PLANS.
+        render_fs (int): Rate the convolution runs at.
+        target_fs (int): Rate the result ends up at.
+        cost (float): Estimated cost (see resampling.estimate_cost).
+        steps (list, optional): What gets resampled, as text. Defaults to None (nothing).
+    """
+
+    def __init__(self, name: str, render_fs: int, target_fs: int, cost: float, steps=None):
+        self.name = name
+        self.render_fs = int(render_fs)
+        self.target_fs = int(target_fs)
+        self.cost = float(cost)
+        self.steps = list(steps or [])
+        self.alternatives = {}  # <- name -> cost of every plan that was considered, this one included
+
+    def describe(self):
+        """
+        Returns:
+            str: The plan, what it resamples, its cost, and what the other plans would have cost.
+        """
+        text = "{0} ({1}), est. cost {2:.3g}".format(self.name, "; ".join(self.steps) or "no resampling", self.cost)
+        others = ["{0} {1:.3g}".format(name, cost) for name, cost in self.alternatives.items() if name != self.name]
+        if others:
+            text += " (vs " + ", ".join(others) + ")"
+        return text
+
+    def __repr__(self):
+        return "ResamplePlan({0})".format(self.describe())
+
+
+def _cheapest(candidates: list):
+    plan = min(candidates, key=lambda candidate: candidate.cost)
+    plan.alternatives = {candidate.name: candidate.cost for candidate in candidates}
+    return plan
+
+
+def render_plans(
+    n_source: int,
+    fs_source: int,
+    fs_hrir: int,
+    target_fs: int,
+    n_filter: int,
+    channels: int = 2,
+    hrir_channels: int = 0,
+    method: str = "auto",
+):
+    """
+    Every plan that renders a mono source to target_fs, with its cost.
+
+    Args:
+        n_source (int): Source length, at fs_source.
+        fs_source (int): Sampling rate of the source.
+        fs_hrir (int): Sampling rate of the impulse responses.
+        target_fs (int): Sampling rate the render has to end up at.
+        n_filter (int): Impulse response length, at fs_hrir.
+        channels (int, optional): Output channels (receivers). Defaults to 2.
+        hrir_channels (int, optional): Impulse responses that have to be resampled to get the ones for the render, e.g. every
+            measurement, receiver and emitter of a file whose tensor isn't cached yet (0 if they're cached). Defaults to 0.
+        method (str, optional): Resampling backend (see resampling.BACKENDS). Defaults to "auto".
+
+    Returns:
+        list: ResamplePlan for each plan that applies.
+    """
+    fs_source, fs_hrir, target_fs = int(fs_source), int(fs_hrir), int(target_fs)
+
+    def hrir_cost(render_fs: int):
+        return resampling.estimate_cost(n_filter, hrir_channels or channels, fs_hrir, render_fs, method)
+
+    def convolution_cost(n: int, render_fs: int):
+        return convolution.estimate_cost(n, resampling.output_length(n_filter, fs_hrir, render_fs), channels)
+
+    def hrir_step(render_fs: int):
+        return ["impulse responses {0} -> {1} Hz".format(fs_hrir, render_fs)] if fs_hrir != render_fs else []
+
+    if fs_source == target_fs:
+        name = "none" if fs_hrir == target_fs else "hrir"
+        return [
+            ResamplePlan(
+                name, target_fs, target_fs, hrir_cost(target_fs) + convolution_cost(n_source, target_fs), hrir_step(target_fs)
+            )
+        ]
+
+    n_target = resampling.output_length(n_source, fs_source, target_fs)
+    source = ResamplePlan(
+        "source",
+        target_fs,
+        target_fs,
+        resampling.estimate_cost(n_source, 1, fs_source, target_fs, method)
+        + hrir_cost(target_fs)
+        + convolution_cost(n_target, target_fs),
+        ["source {0} -> {1} Hz".format(fs_source, target_fs)] + hrir_step(target_fs),
+    )
+    n_render = n_source + resampling.output_length(n_filter, fs_hrir, fs_source) - 1
+    output = ResamplePlan(
+        "output",
+        fs_source,
+        target_fs,
+        hrir_cost(fs_source)
+        + convolution_cost(n_source, fs_source)
+        + resampling.estimate_cost(n_render, channels, fs_source, target_fs, method),
+        hrir_step(fs_source) + ["render {0} -> {1} Hz".format(fs_source, target_fs)],
+    )
+    return [source, output]
+
+
+def plan_render(
+    n_source: int,
+    fs_source: int,
+    fs_hrir: int,
+    target_fs: int,
+    n_filter: int,
+    channels: int = 2,
+    hrir_channels: int = 0,
+    method: str = "auto",
+):
+    """
+    The cheapest plan that renders a mono source to target_fs. Takes the same arguments as render_plans().
+
+    Returns:
+        ResamplePlan: Cheapest plan, with every plan's cost in its alternatives.
+    """
+    return _cheapest(render_plans(n_source, fs_source, fs_hrir, target_fs, n_filter, channels, hrir_channels, method))
+
+
+def plan_sofa_render(n_source: int, fs_source: int, in_sofa_file: str, target_fs: int, channels: int = 2):
+    """
+    The cheapest plan that renders a mono source with a SOFA file to target_fs. Whole HRIR tensors are only counted if hrir_cache
+    doesn't already have them at the rate a plan renders at.
+
+    Args:
+        n_source (int): Source length, at fs_source.
+        fs_source (int): Sampling rate of the source.
+        in_sofa_file (str): Path to SOFA file (or store).
+        target_fs (int): Sampling rate the render has to end up at.
+        channels (int, optional): Output channels (receivers). Defaults to 2.
+
+    Returns:
+        ResamplePlan: Cheapest plan, with every plan's cost in its alternatives.
+    """
+    import hrir_cache  # <- imported here, since it imports sofa_render, which imports this module
+    import sofa_store
+
+    dims = sofa_store.dimensions(in_sofa_file)
+    fs_hrir = int(sofa_store.sampling_rate(in_sofa_file))
+    tensor_channels = dims["M"] * dims["R"] * dims["E"]
+    candidates = []
+    for candidate in render_plans(n_source, fs_source, fs_hrir, target_fs, dims["N"], channels, tensor_channels):
+        if fs_hrir != candidate.render_fs and hrir_cache.is_cached(in_sofa_file, candidate.render_fs):
+            # the tensor's already resampled, so take its cost back out
+            candidate.cost -= resampling.estimate_cost(dims["N"], tensor_channels, fs_hrir, candidate.render_fs)
+            candidate.steps = [step for step in candidate.steps if not step.startswith("impulse responses")]
+            candidate.steps.append("cached impulse responses at {0} Hz".format(candidate.render_fs))
+        candidates.append(candidate)
+    return _cheapest(candidates)
+
+
+def plan_match(n_source: int, fs_source: int, n_hrir: int, fs_hrir: int, hrir_channels: int = 2, method: str = "auto"):
+    """
+    The cheapest way to bring a source and an HRIR to a common rate, when there's no particular output rate to hit (the HRTF tab).
+    Either one can be resampled to the other's rate; it's nearly always the HRIR, which keeps the source as it is.
+
+    Args:
+        n_source (int): Mono source length.
+        fs_source (int): Sampling rate of the source.
+        n_hrir (int): HRIR length.
+        fs_hrir (int): Sampling rate of the HRIR.
+        hrir_channels (int, optional): HRIR channels. Defaults to 2.
+        method (str, optional): Resampling backend (see resampling.BACKENDS). Defaults to "auto".
+
+    Returns:
+        ResamplePlan: "none", "hrir" (HRIR to the source's rate) or "source" (source to the HRIR's rate), with render_fs the common rate.
+    """
+    fs_source, fs_hrir = int(fs_source), int(fs_hrir)
+    if fs_source == fs_hrir:
+        return _cheapest([ResamplePlan("none", fs_source, fs_source, 0.0)])
+    return _cheapest(
+        [
+            ResamplePlan(
+                "hrir",
+                fs_source,
+                fs_source,
+                resampling.estimate_cost(n_hrir, hrir_channels, fs_hrir, fs_source, method),
+                ["HRIR {0} -> {1} Hz".format(fs_hrir, fs_source)],
+            ),
+            ResamplePlan(
+                "source",
+                fs_hrir,
+                fs_hrir,
+                resampling.estimate_cost(n_source, 1, fs_source, fs_hrir, method),
+                ["source {0} -> {1} Hz".format(fs_source, fs_hrir)],
+            ),
+        ]
+    )
+
+
+def log_plan(plan: ResamplePlan, what: str):
+    """
+    Logs a chosen plan to the "resample_plan" logger at info level.
+
+    Args:
+        plan (ResamplePlan): Chosen plan.
+        what (str): What it's for, e.g. the file names.
+    """
+    logger.info("resample plan for %s: %s", what, plan.describe())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show what each resampling plan would cost for rendering a source with a SOFA file.")
+    parser.add_argument("source", help="source file")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("--fs", type=int, default=48000, help="output sampling rate (default: 48000)")
+    parser.add_argument("--channels", type=int, default=2, help="output channels, i.e. receivers (default: 2)")
+    args = parser.parse_args(argv)
+
+    import soundfile as sf
+
+    info = sf.info(args.source)
+    plan = plan_sofa_render(info.frames, info.samplerate, args.sofa, args.fs, args.channels)
+    print(plan.describe())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+# resampler backends. everything that resamples (sofa_render.resample, hrir_cache, fs_resample in main.py) goes through resample() here.
+# librosa.core.resample only ever ended up calling soxr for us anyway, with an extra copy and librosa's (slow) import on top,
+# so soxr gets called directly, with its quality presets exposed. scipy's resample_poly is there for rational ratios,
+# and librosa stays as the fallback for machines without soxr.
+# every backend returns ceil(len * target / orig) samples (what librosa's fix=True gives), so they can be swapped freely.
+#
+# more backends can be added with register_backend(); see benchmarks/bench_resampling.py to compare them.
+# estimate_cost() gives a backend's rough cost in the same units as convolution.py's cost model, so resample_plan.py can weigh
+# resampling against convolving at another rate.
+
+from math import gcd  # <- polyphase up/down factors
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+try:
+    import soxr  # <- fast, high quality resampling
+except ImportError:
+    soxr = None
+
+QUALITIES = ("QQ", "LQ", "MQ", "HQ", "VHQ")  # <- soxr presets, quickest to best
+DEFAULT_QUALITY = "HQ"  # <- same as librosa's default (soxr_hq)
+MAX_POLY_FACTOR = 1000  # <- above this, up/down make resample_poly's filter too long to be worth it
+
+# rough cost of each backend, in convolution.py's units (about 1.75ns each here): (per call, per channel, per output sample and channel).
+# soxr builds its filter once per channel, so lots of short channels (a whole HRIR tensor) cost far more than their length suggests.
+# ratios that reduce to small factors (2:1, 3:2, ...) take a much cheaper path through soxr than ones like 44.1k -> 48k (160:147).
+# calibrated on soxr HQ with benchmarks/bench_resampling.py and benchmarks/bench_resample_plan.py
+COSTS = {
+    "soxr": (0.0, 70000.0, 9.0),
+    "poly": (150000.0, 0.0, 10.0),
+    "librosa": (0.0, 70000.0, 10.0),
+}
+SIMPLE_RATIO = 4  # <- up and down factors both at most this count as a simple ratio
+SIMPLE_RATIO_COSTS = {
+    "soxr": (0.0, 12000.0, 5.0),
+    "librosa": (0.0, 12000.0, 5.0),
+}
+
+
+def output_length(n: int, orig_sr: int, target_sr: int):
+    """
+    Args:
+        n (int): Number of samples at orig_sr.
+        orig_sr (int): Original sampling rate.
+        target_sr (int): Target sampling rate.
+
+    Returns:
+        int: Number of samples after resampling.
+    """
+    return int(np.ceil(n * int(target_sr) / int(orig_sr)))
+
+
+def _fix_length(y: np.ndarray, n: int, axis: int):
+    # pad with zeros or trim along axis, so every backend gives the same length
+    if y.shape[axis] == n:
+        return y
+    if y.shape[axis] > n:
+        index = [slice(None)] * y.ndim
+        index[axis] = slice(0, n)
+        return y[tuple(index)]
+    pad = [(0, 0)] * y.ndim
+    pad[axis] = (0, n - y.shape[axis])
+    return np.pad(y, pad)
+
+
+def soxr_resample(x: np.ndarray, orig_sr: int, target_sr: int, axis: int = 0, quality: str = DEFAULT_QUALITY):
+    """
+    Resamples with soxr directly.
+
+    Args:
+        x (np.ndarray): Signal, any number of dimensions.
+        orig_sr (int): Sampling rate of x.
+        target_sr (int): Sampling rate to resample x to.
+        axis (int, optional): Sample axis. Defaults to 0.
+        quality (str, optional): soxr preset, one of QUALITIES. Defaults to DEFAULT_QUALITY.
+
+    Returns:
+        np.ndarray: Resampled signal.
+    """
+    if soxr is None:
+        raise ImportError("soxr isn't installed; use the librosa or poly resampler instead.")
+    if quality not in QUALITIES:
+        raise ValueError("Unknown soxr quality: {0}. Expected one of: {1}".format(quality, ", ".join(QUALITIES)))
+    # soxr wants (frames, channels), so everything that isn't the sample axis gets flattened into channels
+    moved = np.moveaxis(x, axis, 0)
+    frames = np.ascontiguousarray(moved.reshape(moved.shape[0], -1))
+    if frames.dtype not in (np.float32, np.float64):
+        frames = frames.astype(np.float64)
+    y = soxr.resample(frames, int(orig_sr), int(target_sr), quality=quality)
+    y = _fix_length(y, output_length(x.shape[axis], orig_sr, target_sr), 0)
+    return np.moveaxis(y.reshape((y.shape[0],) + moved.shape[1:]), 0, axis)
+
+
+def poly_resample(x: np.ndarray, orig_sr: int, target_sr: int, axis: int = 0):
+    """
+    Resamples with scipy's polyphase filter, for rational ratios like 44.1k -> 48k (160/147).
+
+    Args:
+        x (np.ndarray): Signal, any number of dimensions.
+        orig_sr (int): Sampling rate of x.
+        target_sr (int): Sampling rate to resample x to.
+        axis (int, optional): Sample axis. Defaults to 0.
+
+    Returns:
+        np.ndarray: Resampled signal.
+    """
+    from scipy import signal  # <- only needed for this backend
+
+    g = gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // g, int(orig_sr) // g
+    if max(up, down) > MAX_POLY_FACTOR:
+        raise ValueError(
+            "{0} -> {1} isn't a ratio resample_poly handles well (up={2}, down={3}).".format(orig_sr, target_sr, up, down)
+        )
+    y = signal.resample_poly(x, up, down, axis=axis)
+    return _fix_length(y, output_length(x.shape[axis], orig_sr, target_sr), axis)
+
+
+def librosa_resample(x: np.ndarray, orig_sr: int, target_sr: int, axis: int = 0):
+    """
+    Resamples with librosa (the way everything used to). Uses librosa's default filter if soxr is installed, its polyphase one otherwise.
+
+    Args:
+        x (np.ndarray): Signal, any number of dimensions.
+        orig_sr (int): Sampling rate of x.
+        target_sr (int): Sampling rate to resample x to.
+        axis (int, optional): Sample axis. Defaults to 0.
+
+    Returns:
+        np.ndarray: Resampled signal.
+    """
+    import librosa  # <- slow import, so only on use
+
+    return librosa.core.resample(
+        x,
+        orig_sr=int(orig_sr),
+        target_sr=int(target_sr),
+        res_type="soxr_hq" if soxr is not None else "polyphase",
+        fix=True,
+        axis=axis,
+    )
+
+
+BACKENDS = {
+    "soxr": soxr_resample,
+    "poly": poly_resample,
+    "librosa": librosa_resample,
+}
+
+
+def register_backend(name: str, fn, cost: tuple = None):
+    """
+    Adds (or replaces) a resampling backend.
+
+    Args:
+        name (str): Backend name, used as the method argument of resample().
+        fn (callable): fn(x, orig_sr, target_sr, axis) -> resampled x.
+        cost (tuple, optional): (per call, per channel, per output sample) cost, see COSTS. Defaults to None (same as soxr).
+    """
+    BACKENDS[name] = fn
+    COSTS[name] = tuple(cost) if cost is not None else COSTS["soxr"]
+
+
+def default_method():
+    """
+    Returns:
+        str: Backend resample(method="auto") uses: soxr if it's installed, librosa otherwise.
+    """
+    return "soxr" if soxr is not None else "librosa"
+
+
+def estimate_cost(n: int, channels: int, orig_sr: int, target_sr: int, method: str = "auto"):
+    """
+    Estimates what resampling would cost, in the same units as convolution.estimate_cost().
+
+    Args:
+        n (int): Number of samples per channel at orig_sr.
+        channels (int): Number of channels.
+        orig_sr (int): Original sampling rate.
+        target_sr (int): Target sampling rate.
+        method (str, optional): Backend name (see BACKENDS), or "auto". Defaults to "auto".
+
+    Returns:
+        float: Estimated cost. 0 if the rates already match.
+    """
+    if int(orig_sr) == int(target_sr) or n <= 0 or channels <= 0:
+        return 0.0
+    if method == "auto":
+        method = default_method()
+    g = gcd(int(orig_sr), int(target_sr))
+    if max(int(orig_sr), int(target_sr)) // g <= SIMPLE_RATIO and method in SIMPLE_RATIO_COSTS:
+        per_call, per_channel, per_sample = SIMPLE_RATIO_COSTS[method]
+    else:
+        per_call, per_channel, per_sample = COSTS.get(method, COSTS["soxr"])
+    return per_call + channels * (per_channel + per_sample * output_length(n, orig_sr, target_sr))
+
+
+def resample(x: np.ndarray, orig_sr: int, target_sr: int, axis: int = 0, method: str = "auto", quality: str = None):
+    """
+    Resamples a signal along its sample axis, leaving it untouched if the rates already match.
+
+    Args:
+        x (np.ndarray): Signal, e.g. (samples,) or (samples, channels).
+        orig_sr (int): Sampling rate of x.
+        target_sr (int): Sampling rate to resample x to.
+        axis (int, optional): Sample axis. Defaults to 0.
+        method (str, optional): Backend name (see BACKENDS), or "auto". Defaults to "auto".
+        quality (str, optional): soxr preset, for the soxr backend. Defaults to None (DEFAULT_QUALITY).
+
+    Returns:
+        np.ndarray: Resampled signal, same layout as x.
+    """
+    if int(orig_sr) == int(target_sr):
+        return x
+    if method == "auto":
+        method = default_method()
+    if method not in BACKENDS:
+        raise ValueError("Unknown resampler: {0}. Expected one of: {1}".format(method, ", ".join(BACKENDS)))
+    if method == "soxr":
+        return soxr_resample(x, orig_sr, target_sr, axis=axis, quality=quality or DEFAULT_QUALITY)
+    return BACKENDS[method](x, orig_sr, target_sr, axis=axis)
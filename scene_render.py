@@ -0,0 +1,175 @@
+# scene renderer: many point sources at different positions, mixed into one binaural (or N-channel) file in a single pass.
+# rendering every source on its own and mixing afterwards costs a forward fft, an inverse fft per channel, and a full-length render per source.
+# here each source is looked up the same way renderWithSOFA/render_sofa does (nearest measurement), sources that land on the same measurement
+# (and so share an HRIR) are summed in the time domain first, and every group's spectrum times its HRTF is summed before a single inverse fft
+# per block. so the ffts scale with the number of distinct directions rather than the number of sources, and sources that share a file are
+# only read and resampled once.
+#
+# scenes are .csv files with a header row of: source,azimuth,elevation,gain (gain is linear and optional, 1 if left out)
+#
+#   python scene_render.py scene.csv subject.sofa mix.wav
+#   python scene_render.py scene.csv subject.sofa mix.wav --target-fs 48000 --receivers 0,1
+
+import os  # <- paths
+import sys  # <- exit codes
+import csv  # <- reading scenes
+import time  # <- timing
+import argparse  # <- cli
+from collections import OrderedDict  # <- groups in first-seen order
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+from scipy import fft as sp_fft  # <- real ffts
+
+import sofa_render  # <- source loading, resampling, normalization
+import spatial_index  # <- nearest-measurement lookup
+import hrtf_spectra  # <- precomputed HRTF spectra, overlap-add
+import hrir_cache  # <- receiver/emitter checks
+
+DEFAULT_CHUNK_BLOCKS = 64  # <- blocks mixed per inverse fft batch, so memory stays at a few blocks per group
+
+
+def read_scene(scene_path: str):
+    """
+    Reads a scene file. Relative source paths are taken relative to the scene file.
+
+    Args:
+        scene_path (str): Path to .csv with columns source,azimuth,elevation and optionally gain.
+
+    Returns:
+        list: (source file, azimuth, elevation, gain) tuples.
+    """
+    base_dir = os.path.dirname(os.path.abspath(scene_path))
+    scene = []
+    with open(scene_path, newline="") as scene_file:
+        for row in csv.DictReader(scene_file):
+            source_file = row["source"].strip()
+            if not os.path.isabs(source_file):
+                source_file = os.path.join(base_dir, source_file)
+            gain = (row.get("gain") or "").strip()
+            scene.append(
+                (source_file, float(row["azimuth"]), float(row["elevation"]), float(gain) if gain else 1.0)
+            )
+    return scene
+
+
+def group_sources(scene: list, M_indices):
+    """
+    Groups the sources of a scene by the measurement they were looked up to, since those share an HRIR.
+
+    Args:
+        scene (list): (source file, azimuth, elevation, gain) tuples.
+        M_indices (list): Measurement index of each source.
+
+    Returns:
+        OrderedDict: Measurement index -> list of (source file, gain).
+    """
+    groups = OrderedDict()
+    for (source_file, az, el, gain), M_idx in zip(scene, M_indices):
+        groups.setdefault(int(M_idx), []).append((source_file, float(gain)))
+    return groups
+
+
+def render_scene(
+    scene: list,
+    in_sofa_file: str,
+    target_fs: int = 48000,
+    receivers=(0, 1),
+    emitter: int = 0,
+    chunk_blocks: int = DEFAULT_CHUNK_BLOCKS,
+    progress=None,
+):
+    """
+    Renders a scene of point sources into one normalized mix.
+
+    Args:
+        scene (list): (source file, azimuth, elevation, gain) tuples (see read_scene).
+        in_sofa_file (str): Path to sofa file.
+        target_fs (int, optional): Target sampling rate. Defaults to 48000.
+        receivers (list, optional): Receivers to render, one output channel each (None for all of them). Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render. Defaults to 0.
+        chunk_blocks (int, optional): Blocks mixed per batch. Defaults to DEFAULT_CHUNK_BLOCKS.
+        progress (callable, optional): Called with a fraction between 0 and 1 as the mix goes. Defaults to None.
+
+    Returns:
+        np.ndarray: Normalized mix with shape (samples, len(receivers)), as long as the longest source plus the filter tail.
+        int: Number of groups (distinct measurements) that were convolved.
+    """
+    if not scene:
+        raise ValueError("The scene has no sources.")
+
+    # same lookup renderWithSOFA uses, for every source at once
+    M_indices = spatial_index.get_index(in_sofa_file).query_batch(
+        [az for _, az, _, _ in scene], [el for _, _, el, _ in scene]
+    )
+    groups = group_sources(scene, M_indices)
+
+    # every file is read and resampled once, however many times it's placed in the scene
+    signals = {}
+    for source_file, _, _, _ in scene:
+        if source_file not in signals:
+            source_x, fs_x = sofa_render.load_mono_source(source_file)
+            signals[source_file] = sofa_render.resample(source_x, fs_x, int(target_fs))
+    length = max(len(x) for x in signals.values())
+
+    store = hrtf_spectra.get_spectra(in_sofa_file, target_fs=target_fs)
+    receivers, emitter = hrir_cache.resolve_channels(store.spectra.shape, receivers, emitter)
+    transfer_functions = {M_idx: store.transfer_functions(M_idx, receivers, emitter) for M_idx in groups}
+    hop, fft_size = store.hop, store.fft_size
+    n_blocks = max(1, -(-length // hop))
+
+    out = np.zeros((n_blocks * hop + fft_size, len(receivers)))
+    for first in range(0, n_blocks, chunk_blocks):
+        count = min(chunk_blocks, n_blocks - first)
+        start, end = first * hop, (first + count) * hop
+        Y = np.zeros((count, fft_size // 2 + 1, len(receivers)), dtype=complex)
+        for M_idx, members in groups.items():
+            # sources that share an HRIR are summed before their one forward fft
+            mixed = np.zeros(count * hop)
+            for source_file, gain in members:
+                x = signals[source_file][start:end]
+                mixed[: len(x)] += gain * x
+            if not mixed.any():
+                continue  # <- every source of this group has already ended
+            X = sp_fft.rfft(mixed.reshape(count, hop), fft_size, axis=-1)
+            Y += X[:, :, None] * transfer_functions[M_idx][None, :, :]
+        # one inverse fft per block and channel, for the whole scene
+        chunk = hrtf_spectra.overlap_add(sp_fft.irfft(Y, fft_size, axis=1), hop)
+        stop = min(start + len(chunk), len(out))
+        out[start:stop] += chunk[: stop - start]
+        if progress is not None:
+            progress((first + count) / n_blocks)
+
+    mix = out[: length + store.filter_length - 1]
+    return sofa_render.peak_normalize(mix), len(groups)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a scene of point sources with a SOFA file into one mix.")
+    parser.add_argument("scene", help=".csv with columns source,azimuth,elevation[,gain]")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("out", help="output file")
+    parser.add_argument("--target-fs", type=int, default=48000, help="target sampling rate (default: 48000)")
+    parser.add_argument("--receivers", default="0,1", help='receivers to render, e.g. "all", "0,1" or "0:32" (default: 0,1)')
+    parser.add_argument("--emitter", type=int, default=0, help="emitter to render (default: 0)")
+    args = parser.parse_args(argv)
+
+    import soundfile as sf
+    from batch_render import parse_receivers
+
+    scene = read_scene(args.scene)
+    start = time.perf_counter()
+    mix, n_groups = render_scene(
+        scene, args.sofa, args.target_fs, parse_receivers(args.receivers), args.emitter
+    )
+    elapsed = time.perf_counter() - start
+    sf.write(args.out, mix, samplerate=int(args.target_fs))
+    print(
+        "rendered {0} sources ({1} distinct directions) into {2} in {3:.2f} s".format(
+            len(scene), n_groups, args.out, elapsed
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# process-wide cache of opened SOFA files.
+# opening a 2-50MB netCDF file over and over was the main source of ui lag, so every part of the app asks this module for a handle instead of calling sofa.Database.open itself.
+# handles are keyed by absolute path + mtime + size, so a file that's been overwritten on disk gets reopened instead of serving stale data.
+
+import os  # <- absolute paths for invalidation
+import threading  # <- the cache can be hit from worker threads
+from collections import OrderedDict  # <- lru ordering
+
+from file_keys import file_key  # <- cache keys (the other SOFA caches use it as sofa_cache.file_key)
+
+MAX_OPEN_SOFA_FILES = 8
+
+_open_databases = OrderedDict()  # <- (path, mtime, size) -> sofa.Database, least recently used first
+_lock = threading.RLock()
+_hits = 0
+_misses = 0
+
+
+def open_sofa(in_sofa_file: str):
+    """
+    Returns an opened, read-only SOFA database for the given file, reusing a cached handle if the file hasn't changed on disk since it was opened.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+
+    Returns:
+        sofa.Database: Opened SOFA file. Shared between callers, so don't close it; use invalidate() instead.
+    """
+    global _hits, _misses
+    key = file_key(in_sofa_file)
+    with _lock:
+        if key in _open_databases:
+            _hits += 1
+            _open_databases.move_to_end(key)
+            return _open_databases[key]
+
+        _misses += 1
+        # drop any handle for an older version of the same file
+        for stale_key in [k for k in _open_databases if k[0] == key[0]]:
+            del _open_databases[stale_key]
+
+        import sofa  # <- read SOFA HRTFs (imported here, so processes that only read compiled stores never load netCDF)
+
+        SOFA_HRTF = sofa.Database.open(key[0])
+        _open_databases[key] = SOFA_HRTF
+        _evict()
+        return SOFA_HRTF
+
+
+def _evict():
+    # evicted handles aren't closed here, since a caller may still be holding one. netCDF4 closes the file once the last reference is gone.
+    while len(_open_databases) > MAX_OPEN_SOFA_FILES:
+        _open_databases.popitem(last=False)
+
+
+def invalidate(in_sofa_file: str = None):
+    """
+    Drops cached handles so the next open_sofa() call reopens the file from disk.
+
+    Args:
+        in_sofa_file (str, optional): Path to SOFA file to drop. Drops every cached handle if not given.
+    """
+    with _lock:
+        if in_sofa_file is None:
+            _open_databases.clear()
+            return
+        path = os.path.abspath(in_sofa_file)
+        for key in [k for k in _open_databases if k[0] == path]:
+            del _open_databases[key]
+
+
+def set_max_open_files(max_open_files: int):
+    """
+    Changes how many SOFA files are kept open at once, evicting the least recently used handles if needed.
+
+    Args:
+        max_open_files (int): Maximum number of cached handles. Must be at least 1.
+    """
+    global MAX_OPEN_SOFA_FILES
+    with _lock:
+        MAX_OPEN_SOFA_FILES = max(1, int(max_open_files))
+        _evict()
+
+
+def cache_info():
+    """
+    Returns:
+        dict: hits, misses, currently open files, and the maximum number of open files.
+    """
+    with _lock:
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "open_files": len(_open_databases),
+            "max_open_files": MAX_OPEN_SOFA_FILES,
+        }
+
+
+def ir_tensor(SOFA_HRTF):
+    """
+    Reads every impulse response in a SOFA file in one go.
+
+    Args:
+        SOFA_HRTF (sofa.Database): Opened SOFA file.
+
+    Returns:
+        np.ndarray: Impulse responses with shape (M, R, E, N). Files without an emitter dimension on Data.IR (e.g. SimpleFreeFieldHRIR) get E = 1.
+    """
+    # netCDF/HDF5 reads aren't thread safe, so reads are serialized with the same lock that guards opening files
+    with _lock:
+        dims = SOFA_HRTF.Data.IR.dimensions()
+        if "E" in dims:
+            return SOFA_HRTF.Data.IR.get_values(dim_order=("M", "R", "E", "N"))
+        return SOFA_HRTF.Data.IR.get_values(dim_order=("M", "R", "N"))[:, :, None, :]
+
+
+def sampling_rate(SOFA_HRTF):
+    """
+    Args:
+        SOFA_HRTF (sofa.Database): Opened SOFA file.
+
+    Returns:
+        int: Sampling rate of the SOFA file (the first one, if it varies per measurement).
+    """
+    return int(SOFA_HRTF.Data.SamplingRate.get_values()[0])
@@ -0,0 +1,246 @@
+# headless side of the SOFA rendering in main.py.
+# nothing in here touches tkinter, so batch jobs (see batch_render.py) can import it without opening a window.
+# renderWithSOFA in main.py calls into this module, so the gui and the batch renderer share one code path.
+
+import os  # <- building export file names
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+import audio_cache  # <- decoded source files
+import sofa_store  # <- source positions (from a compiled store if there is one)
+import spatial_index  # <- nearest-measurement lookup
+import resampling  # <- resampler backends
+import resample_plan  # <- where the rate conversion happens
+import convolution  # <- fast convolution, picks its own method
+import precision  # <- float32/float64 processing
+
+
+def nearest_measurement(sofa_positions: np.ndarray, azimuth: float, elevation: float):
+    """
+    Finds the measurement index closest to a desired azimuth and elevation. Wraps around in azimuth.
+    Builds a throwaway index, so for repeated lookups against the same file use spatial_index.get_index() instead.
+
+    Args:
+        sofa_positions (np.ndarray): Source positions in spherical coordinates (azimuth, elevation, distance), one row per measurement.
+        azimuth (float): Desired azimuth in degrees.
+        elevation (float): Desired elevation in degrees.
+
+    Returns:
+        int: Measurement index (M) of the closest position.
+    """
+    return spatial_index.SphericalIndex(sofa_positions).query(azimuth, elevation)
+
+
+def get_hrirs(SOFA_HRTF, M_idx: int, receivers=(0, 1), emitter: int = 0):
+    """
+    Pulls the impulse responses of any receivers of one emitter for a given measurement.
+
+    Args:
+        SOFA_HRTF (sofa.Database): Opened SOFA file.
+        M_idx (int): Measurement index.
+        receivers (list, optional): Receivers, one output channel each. Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter. Defaults to 0.
+
+    Returns:
+        np.ndarray: Impulse responses with shape (N, len(receivers)).
+    """
+    SOFA_H = np.zeros((SOFA_HRTF.Dimensions.N, len(receivers)))
+    for channel, receiver in enumerate(receivers):
+        SOFA_H[:, channel] = SOFA_HRTF.Data.IR.get_values(indices={"M": M_idx, "R": receiver, "E": emitter})
+    return SOFA_H
+
+
+def get_hrir_pair(SOFA_HRTF, M_idx: int):
+    """
+    Pulls the left (R=0) and right (R=1) impulse responses of the first emitter for a given measurement.
+
+    Args:
+        SOFA_HRTF (sofa.Database): Opened SOFA file.
+        M_idx (int): Measurement index.
+
+    Returns:
+        np.ndarray: HRIR pair with shape (N, 2).
+    """
+    return get_hrirs(SOFA_HRTF, M_idx, (0, 1), 0)
+
+
+def resample(x: np.ndarray, orig_sr: int, target_sr: int, axis: int = 0):
+    """
+    Resamples a signal along its sample axis, leaving it untouched if the rates already match.
+
+    Args:
+        x (np.ndarray): Signal, e.g. (samples,) or (samples, channels).
+        orig_sr (int): Sampling rate of x.
+        target_sr (int): Sampling rate to resample x to.
+        axis (int, optional): Sample axis. Defaults to 0.
+
+    Returns:
+        np.ndarray: Resampled signal, same layout as x.
+    """
+    return resampling.resample(x, orig_sr, target_sr, axis=axis)
+
+
+def load_mono_source(in_source_file: str, dtype=None):
+    """
+    Reads a source file and, if it's not mono, makes it mono. Files are only decoded once (see audio_cache.py).
+
+    Args:
+        in_source_file (str): Path to source file.
+        dtype (str, optional): "float32" or "float64" (see precision.py). Defaults to None (float64).
+
+    Returns:
+        np.ndarray: Mono signal, read-only since it's shared.
+        int: Sampling rate of the source file.
+    """
+    return audio_cache.read(in_source_file, dtype, mono=True)
+
+
+def convolve_binaural(source_x: np.ndarray, SOFA_H: np.ndarray):
+    """
+    Convolves a mono signal with an HRIR pair (or any number of impulse responses) and peak normalizes the result.
+
+    Args:
+        source_x (np.ndarray): Mono signal.
+        SOFA_H (np.ndarray): Impulse responses with shape (N, channels), e.g. an HRIR pair, at the same sampling rate as source_x.
+
+    Returns:
+        np.ndarray: Normalized render with shape (len(source_x) + N - 1, channels).
+    """
+    # every channel in one call, so the source only gets transformed once however many receivers there are
+    rend, method = convolution.convolve(source_x, SOFA_H)
+    return peak_normalize(rend)
+
+
+def peak_normalize(rend: np.ndarray):
+    """
+    Scales a render so its loudest sample (across every channel) sits at full scale.
+
+    Args:
+        rend (np.ndarray): Render with shape (samples, channels).
+
+    Returns:
+        np.ndarray: Normalized render.
+    """
+    M_norm = np.max(np.abs(rend))
+    return rend / M_norm
+
+
+def render_measurement(
+    SOFA_HRTF,
+    M_idx: int,
+    source_x: np.ndarray,
+    target_fs: int = 48000,
+    receivers=(0, 1),
+    emitter: int = 0,
+):
+    """
+    Renders an already loaded (and already resampled to target_fs) mono source with a given measurement.
+    Resamples the impulse responses on every call; with a file path at hand, hrir_cache.hrirs() serves them from a per-file cache instead.
+
+    Args:
+        SOFA_HRTF (sofa.Database): Opened SOFA file.
+        M_idx (int): Measurement index to render with (see spatial_index.py).
+        source_x (np.ndarray): Mono signal at target_fs.
+        target_fs (int, optional): Sampling rate of source_x, and of the render. Defaults to 48000.
+        receivers (list, optional): Receivers to render, one output channel each. Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render. Defaults to 0.
+
+    Returns:
+        np.ndarray: Normalized render with shape (samples, len(receivers)).
+    """
+    sofa_fs_H = SOFA_HRTF.Data.SamplingRate.get_values()[0]
+    SOFA_H = resample(get_hrirs(SOFA_HRTF, M_idx, receivers, emitter), sofa_fs_H, target_fs)
+    return convolve_binaural(source_x, SOFA_H)
+
+
+def render_sofa(
+    in_source_file: str,
+    in_sofa_file: str,
+    angle: float = 0,
+    elev: float = 0,
+    target_fs: int = 48000,
+    interpolate: str = None,
+    dtype=None,
+    receivers=(0, 1),
+    emitter: int = 0,
+    progress=None,
+):
+    """
+    Renders a given source file with a given sofa file at the given azimuth and elevation. Targets a sampling rate of 48kHz.
+    The rate conversion goes wherever resample_plan.py says is cheapest: the source, the impulse responses, or the render.
+
+    Args:
+        in_source_file (str): Path to source file.
+        in_sofa_file (str): Path to sofa file.
+        angle (float, optional): Desired azimuth in degrees. Defaults to 0.
+        elev (float, optional): Desired elevation in degrees. Defaults to 0.
+        target_fs (int, optional): Target sampling rate. Defaults to 48000.
+        interpolate (str, optional): Interpolate between the surrounding measurements with this method ("time" or "magnitude_phase", see hrir_interpolation.py). Defaults to None (nearest measurement).
+        dtype (str, optional): Processing precision, "float32" or "float64" (see precision.py for the error bounds). Defaults to None (float64).
+        receivers (list, optional): Receivers to render, one output channel each, e.g. every microphone of an array. None renders all of them. Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render, for files measured with several (e.g. multi-speaker setups). Defaults to 0.
+        progress (callable, optional): Called with a rough fraction between 0 and 1 after each stage (source, impulse responses, convolution). A job's report, so a cancelled render stops at the next stage. Defaults to None.
+
+    Returns:
+        np.ndarray: Normalized render with shape (samples, len(receivers)), as dtype.
+        np.ndarray: Source positions of the SOFA file in spherical coordinates.
+    """
+    sofa_positions = sofa_store.source_positions(in_sofa_file, "spherical")
+
+    import hrir_cache  # <- imported here, since it imports this module
+
+    source_x, fs_x = load_mono_source(in_source_file, dtype)
+    dims = sofa_store.dimensions(in_sofa_file)
+    receivers, emitter = hrir_cache.resolve_channels((dims["M"], dims["R"], dims["E"], dims["N"]), receivers, emitter)
+    # the source only gets resampled if that's cheaper than rendering at its own rate and resampling the render (see resample_plan.py)
+    plan = resample_plan.plan_sofa_render(len(source_x), fs_x, in_sofa_file, target_fs, len(receivers))
+    resample_plan.log_plan(plan, "{0} with {1}".format(os.path.basename(in_source_file), os.path.basename(in_sofa_file)))
+    source_x = resample(source_x, fs_x, plan.render_fs)
+    if progress is not None:
+        progress(0.3)
+
+    if interpolate:
+        import hrir_interpolation  # <- imported here, since it imports this module
+
+        interpolator = hrir_interpolation.get_interpolator(in_sofa_file, plan.render_fs)
+        SOFA_H = interpolator.hrir(angle, elev, receivers, emitter, method=interpolate)
+    else:
+        # the impulse responses come out of the per-file tensor, which only gets resampled once per rate
+        M_idx = spatial_index.get_index(in_sofa_file).query(angle, elev)
+        SOFA_H = hrir_cache.hrirs(in_sofa_file, M_idx, receivers, emitter, plan.render_fs)
+    SOFA_H = precision.cast(SOFA_H, dtype)
+    if progress is not None:
+        progress(0.4)
+
+    if plan.render_fs == target_fs:
+        return convolve_binaural(source_x, SOFA_H), sofa_positions
+    rend, method = convolution.convolve(source_x, SOFA_H)
+    if progress is not None:
+        progress(0.8)
+    # normalized after resampling, since the resampler's ripple can push the peak up a little
+    return peak_normalize(precision.cast(resample(rend, plan.render_fs, target_fs), dtype)), sofa_positions
+
+
+def sofa_export_name(
+    in_sofa_file: str, in_source_file: str, angle_label, elev_label
+):
+    """
+    Builds the file name for a SOFA render, following the convention of [sofa file]-[source file]-azi_[azimuth]-elev_[elevation]-export.wav.
+
+    Args:
+        in_sofa_file (str): Path to sofa file.
+        in_source_file (str): Path to source file.
+        angle_label (int): Azimuth that was rendered.
+        elev_label (int): Elevation that was rendered.
+
+    Returns:
+        str: File name (without directory).
+    """
+    return (
+        str(os.path.splitext(os.path.basename(in_sofa_file))[0])  # <- works for .sofastore paths too
+        + "-"
+        + str(os.path.basename(in_source_file)[:-4])
+        + "-azi_"
+        + str(angle_label)
+        + "-elev_"
+        + str(elev_label)
+        + "-export.wav"
+    )
@@ -0,0 +1,354 @@
+# compiled SOFA stores: a SOFA file's impulse responses, source positions, sampling rate and metadata, written out once as plain
+# .npy arrays in a directory next to it (subject.sofa -> subject.sofastore). opening one is a json read plus a few memory maps,
+# instead of a netCDF/HDF5 open and a full read of Data.IR, and slicing out a measurement doesn't copy anything.
+#
+# once a store exists, every reader in here (hrir_cache, spatial_index, hrtf_spectra, the renderers, graph_export) picks it up
+# on its own, as long as it was compiled from the SOFA file as it is now on disk (same mtime and size). anything else falls back
+# to reading the SOFA file through sofa_cache. a store's path can also be passed anywhere a SOFA file's path is expected.
+#
+#   python sofa_store.py subj1.sofa subj2.sofa
+#   python sofa_store.py subj1.sofastore --verify
+
+import os  # <- paths, file stats
+import sys  # <- exit codes
+import json  # <- metadata
+import shutil  # <- replacing old stores
+import hashlib  # <- checksums
+import argparse  # <- cli
+import threading  # <- the cache can be hit from worker threads
+from collections import OrderedDict  # <- lru ordering
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+FORMAT_VERSION = 1  # <- bump whenever the layout changes, so old stores get ignored instead of misread
+STORE_EXTENSION = ".sofastore"
+MAX_OPEN_STORES = 32
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+ARRAYS = ("ir", "positions_spherical", "positions_cartesian")  # <- .npy files in a store
+
+_open_stores = OrderedDict()  # <- (store path, mtime, size of meta.json) -> CompiledSOFA, least recently used first
+_lock = threading.RLock()
+
+
+def store_path(in_sofa_file: str):
+    """
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+
+    Returns:
+        str: Where the compiled store for that file goes (the same path, with .sofastore instead of .sofa).
+    """
+    return os.path.splitext(os.path.abspath(in_sofa_file))[0] + STORE_EXTENSION
+
+
+def is_store(path: str):
+    """
+    Args:
+        path (str): Path to a SOFA file or a store.
+
+    Returns:
+        bool: Whether the path is a compiled store (rather than a SOFA file).
+    """
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def _checksum(directory):
+    digest = hashlib.blake2b(digest_size=16)
+    for name in ARRAYS:
+        with open(os.path.join(directory, name + ".npy"), "rb") as array_file:
+            for chunk in iter(lambda: array_file.read(HASH_BLOCK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _attribute_value(value):
+    # netCDF attributes come back as numpy scalars/arrays now and then, which json can't write
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def compile_sofa(in_sofa_file: str, out_path: str = None):
+    """
+    Compiles a SOFA file into a store, replacing any older store at the same path.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        out_path (str, optional): Where to write the store. Defaults to None (next to the SOFA file, see store_path).
+
+    Returns:
+        str: Path of the store.
+    """
+    import sofa_cache  # <- only needed here and in the fallbacks, so reading a store never loads netCDF
+
+    out_path = os.path.abspath(out_path or store_path(in_sofa_file))
+    source_key = sofa_cache.file_key(in_sofa_file)
+    SOFA_HRTF = sofa_cache.open_sofa(in_sofa_file)
+    with sofa_cache._lock:  # <- netCDF reads aren't thread safe, see sofa_cache.ir_tensor
+        spherical = np.asarray(SOFA_HRTF.Source.Position.get_values(system="spherical"), dtype=np.float64)
+        cartesian = np.asarray(SOFA_HRTF.Source.Position.get_values(system="cartesian"), dtype=np.float64)
+        metadata = {
+            name: _attribute_value(SOFA_HRTF.Metadata.get_attribute(name))
+            for name in SOFA_HRTF.Metadata.list_attributes()
+        }
+    ir = np.ascontiguousarray(sofa_cache.ir_tensor(SOFA_HRTF), dtype=np.float64)
+
+    # written to a temporary directory first and swapped in at the end, so a reader never sees half a store
+    temp_path = "{0}.tmp-{1}".format(out_path, os.getpid())
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    np.save(os.path.join(temp_path, "ir.npy"), ir)
+    np.save(os.path.join(temp_path, "positions_spherical.npy"), spherical)
+    np.save(os.path.join(temp_path, "positions_cartesian.npy"), cartesian)
+    meta = {
+        "version": FORMAT_VERSION,
+        "checksum": _checksum(temp_path),
+        "source": {"path": source_key[0], "mtime_ns": source_key[1], "size": source_key[2]},
+        "sampling_rate": sofa_cache.sampling_rate(SOFA_HRTF),
+        "dimensions": {name: int(size) for name, size in zip("MREN", ir.shape)},
+        "metadata": metadata,
+    }
+    with open(os.path.join(temp_path, "meta.json"), "w") as meta_file:
+        json.dump(meta, meta_file, indent=1)
+
+    with _lock:
+        for key in [k for k in _open_stores if k[0] == out_path]:
+            del _open_stores[key]
+    if os.path.exists(out_path):
+        shutil.rmtree(out_path)
+    os.rename(temp_path, out_path)
+    return out_path
+
+
+class CompiledSOFA(object):
+    """
+    An opened store. Arrays are memory mapped read-only, so they're shared between callers and never copied until sliced into something else.
+
+    Args:
+        path (str): Path to store.
+
+    Attributes:
+        ir (np.ndarray): Impulse responses with shape (M, R, E, N), like sofa_cache.ir_tensor.
+        positions_spherical (np.ndarray): Source positions (azimuth, elevation, distance), shape (M, 3).
+        positions_cartesian (np.ndarray): Source positions (x, y, z), shape (M, 3).
+        sampling_rate (int): Sampling rate.
+        dimensions (dict): Sizes of M, R, E and N.
+        metadata (dict): Global attributes of the SOFA file.
+        source (dict): Path, mtime (ns) and size of the SOFA file it was compiled from.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with open(os.path.join(self.path, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                "{0} is a version {1} store, expected version {2}. Compile it again.".format(
+                    self.path, meta.get("version"), FORMAT_VERSION
+                )
+            )
+        self.checksum = meta["checksum"]
+        self.source = meta["source"]
+        self.sampling_rate = int(meta["sampling_rate"])
+        self.dimensions = meta["dimensions"]
+        self.metadata = meta["metadata"]
+        self.ir = np.load(os.path.join(self.path, "ir.npy"), mmap_mode="r")
+        self.positions_spherical = np.load(os.path.join(self.path, "positions_spherical.npy"), mmap_mode="r")
+        self.positions_cartesian = np.load(os.path.join(self.path, "positions_cartesian.npy"), mmap_mode="r")
+        if self.ir.shape != tuple(self.dimensions[name] for name in "MREN"):
+            raise ValueError("{0} is damaged: Data.IR doesn't match its dimensions. Compile it again.".format(self.path))
+
+    def is_current(self, in_sofa_file: str):
+        """
+        Args:
+            in_sofa_file (str): Path to SOFA file.
+
+        Returns:
+            bool: Whether the store was compiled from the file as it is now on disk.
+        """
+        stat = os.stat(in_sofa_file)
+        return (stat.st_mtime_ns, stat.st_size) == (self.source["mtime_ns"], self.source["size"])
+
+    def verify(self):
+        """
+        Recomputes the checksum of every array (reads the whole store, so it isn't done on open).
+
+        Returns:
+            bool: Whether the arrays are the ones that were written.
+        """
+        return _checksum(self.path) == self.checksum
+
+
+def open_store(path: str):
+    """
+    Opens a store, reusing an already opened one if it hasn't been recompiled since.
+
+    Args:
+        path (str): Path to store.
+
+    Returns:
+        CompiledSOFA: Opened store. Shared between callers.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(os.path.join(path, "meta.json"))
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key in _open_stores:
+            _open_stores.move_to_end(key)
+            return _open_stores[key]
+
+    store = CompiledSOFA(path)
+
+    with _lock:
+        for stale_key in [k for k in _open_stores if k[0] == path and k != key]:
+            del _open_stores[stale_key]
+        _open_stores[key] = store
+        while len(_open_stores) > MAX_OPEN_STORES:
+            _open_stores.popitem(last=False)
+    return store
+
+
+def find_store(in_sofa_file: str):
+    """
+    Looks for a usable store for a SOFA file.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file, or to a store.
+
+    Returns:
+        CompiledSOFA: The store, if the path is one, or if one next to the SOFA file was compiled from it as it is now. None otherwise (no store, an out of date one, or one written by another version).
+    """
+    if is_store(in_sofa_file):
+        return open_store(in_sofa_file)
+    path = store_path(in_sofa_file)
+    if not is_store(path):
+        return None
+    try:
+        store = open_store(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return store if store.is_current(in_sofa_file) else None
+
+
+def ir_tensor(in_sofa_file: str):
+    """
+    Every impulse response of a SOFA file, from its store if it has one.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file, or to a store.
+
+    Returns:
+        np.ndarray: Impulse responses with shape (M, R, E, N). Memory mapped read-only when read from a store.
+    """
+    store = find_store(in_sofa_file)
+    if store is not None:
+        return store.ir
+    import sofa_cache
+
+    return sofa_cache.ir_tensor(sofa_cache.open_sofa(in_sofa_file))
+
+
+def sampling_rate(in_sofa_file: str):
+    """
+    Args:
+        in_sofa_file (str): Path to SOFA file, or to a store.
+
+    Returns:
+        int: Sampling rate of the SOFA file (the first one, if it varies per measurement).
+    """
+    store = find_store(in_sofa_file)
+    if store is not None:
+        return store.sampling_rate
+    import sofa_cache
+
+    return sofa_cache.sampling_rate(sofa_cache.open_sofa(in_sofa_file))
+
+
+def source_positions(in_sofa_file: str, system: str = "spherical"):
+    """
+    Args:
+        in_sofa_file (str): Path to SOFA file, or to a store.
+        system (str, optional): "spherical" or "cartesian". Defaults to "spherical".
+
+    Returns:
+        np.ndarray: Source positions with shape (M, 3).
+    """
+    if system not in ("spherical", "cartesian"):
+        raise ValueError('Unknown coordinate system: {0}. Expected "spherical" or "cartesian".'.format(system))
+    store = find_store(in_sofa_file)
+    if store is not None:
+        return getattr(store, "positions_" + system)
+    import sofa_cache
+
+    SOFA_HRTF = sofa_cache.open_sofa(in_sofa_file)
+    with sofa_cache._lock:
+        return SOFA_HRTF.Source.Position.get_values(system=system)
+
+
+def dimensions(in_sofa_file: str):
+    """
+    Args:
+        in_sofa_file (str): Path to SOFA file, or to a store.
+
+    Returns:
+        dict: Sizes of M, R, E and N (E is 1 for files without an emitter dimension on Data.IR, same as ir_tensor).
+    """
+    store = find_store(in_sofa_file)
+    if store is not None:
+        return dict(store.dimensions)
+    import sofa_cache
+
+    SOFA_HRTF = sofa_cache.open_sofa(in_sofa_file)
+    with sofa_cache._lock:
+        E = SOFA_HRTF.Dimensions.E if "E" in SOFA_HRTF.Data.IR.dimensions() else 1
+        return {"M": SOFA_HRTF.Dimensions.M, "R": SOFA_HRTF.Dimensions.R, "E": E, "N": SOFA_HRTF.Dimensions.N}
+
+
+def invalidate(path: str = None):
+    """
+    Drops opened stores.
+
+    Args:
+        path (str, optional): Path to SOFA file or store to drop. Drops every opened store if not given.
+    """
+    with _lock:
+        if path is None:
+            _open_stores.clear()
+            return
+        path = os.path.abspath(path)
+        if not path.endswith(STORE_EXTENSION):
+            path = store_path(path)
+        for key in [k for k in _open_stores if k[0] == path]:
+            del _open_stores[key]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile SOFA files into memory-mapped stores for fast repeated loading.")
+    parser.add_argument("files", nargs="+", help="SOFA file(s) to compile, or store(s) to check with --verify")
+    parser.add_argument("--out", default=None, help="store path (one file only; default: next to the SOFA file)")
+    parser.add_argument("--verify", action="store_true", help="check the checksums of existing stores instead of compiling")
+    args = parser.parse_args(argv)
+    if args.out and len(args.files) > 1:
+        parser.error("--out only works with a single file")
+
+    failed = 0
+    for path in args.files:
+        if args.verify:
+            try:
+                store = open_store(path if is_store(path) else store_path(path))
+                ok = store.verify()
+            except (OSError, ValueError, KeyError) as e:
+                ok, store = False, None
+                print("{0}: {1}".format(path, e), file=sys.stderr)
+            if store is not None:
+                print("{0}: {1}".format(store.path, "ok" if ok else "checksum mismatch"))
+            failed += not ok
+        else:
+            print("compiled {0}".format(compile_sofa(path, args.out)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# spherical nearest-measurement lookup for SOFA source positions.
+# positions are turned into unit vectors and put in a kd-tree, so a lookup is O(log M) instead of a distance over every measurement,
+# and azimuth wraps around properly (359deg and 1deg are 2deg apart, not 358deg).
+# the straight-line distance between two unit vectors only grows with the great-circle angle between them, so the nearest unit vector is also the nearest direction.
+
+import os  # <- absolute paths for invalidation
+import threading  # <- the cache can be hit from worker threads
+from collections import OrderedDict  # <- lru ordering
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+from scipy.spatial import cKDTree  # <- kd-tree
+
+import sofa_cache  # <- cached SOFA handles
+import sofa_store  # <- source positions (from a compiled store if there is one)
+
+MAX_CACHED_INDEXES = 32
+
+_indexes = OrderedDict()  # <- (file key, use_distance, distance_weight) -> SphericalIndex
+_lock = threading.RLock()
+
+
+def spherical_to_unit(azimuth, elevation):
+    """
+    Converts azimuth and elevation (in degrees) to unit vectors.
+
+    Args:
+        azimuth (float or np.ndarray): Azimuth in degrees.
+        elevation (float or np.ndarray): Elevation in degrees.
+
+    Returns:
+        np.ndarray: Unit vectors with shape (..., 3).
+    """
+    az = np.radians(np.asarray(azimuth, dtype=float))
+    el = np.radians(np.asarray(elevation, dtype=float))
+    return np.stack(
+        [np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el)], axis=-1
+    )
+
+
+class SphericalIndex(object):
+    """
+    Nearest-measurement index over the source positions of a SOFA file.
+
+    Args:
+        sofa_positions (np.ndarray): Source positions in spherical coordinates (azimuth, elevation, distance), one row per measurement.
+        use_distance (bool, optional): Also take source distance into account, for datasets measured at more than one radius. Defaults to False.
+        distance_weight (float, optional): How much one meter of distance counts against direction, in units of chord length on the unit sphere (1.0 is roughly 60deg). Only used if use_distance is True. Defaults to 1.0.
+    """
+
+    def __init__(
+        self,
+        sofa_positions: np.ndarray,
+        use_distance: bool = False,
+        distance_weight: float = 1.0,
+    ):
+        self.positions = np.asarray(sofa_positions, dtype=float)
+        self.use_distance = bool(use_distance) and self.positions.shape[1] > 2
+        self.distance_weight = float(distance_weight)
+        self.tree = cKDTree(
+            self._points(
+                self.positions[:, 0], self.positions[:, 1], self._distances()
+            )
+        )
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _distances(self):
+        if self.positions.shape[1] > 2:
+            return self.positions[:, 2]
+        return None
+
+    def _points(self, azimuth, elevation, distance=None):
+        points = spherical_to_unit(azimuth, elevation)
+        if self.use_distance:
+            if distance is None:
+                # no distance asked for, so aim for the middle of the measured radii
+                distance = np.full(points.shape[:-1], np.median(self.positions[:, 2]))
+            radial = np.asarray(distance, dtype=float) * self.distance_weight
+            points = np.concatenate(
+                [points, np.broadcast_to(radial, points.shape[:-1])[..., None]], axis=-1
+            )
+        return points
+
+    def query(self, azimuth: float, elevation: float, distance: float = None):
+        """
+        Finds the measurement closest to a single direction.
+
+        Args:
+            azimuth (float): Desired azimuth in degrees.
+            elevation (float): Desired elevation in degrees.
+            distance (float, optional): Desired distance in meters. Only used if the index was built with use_distance. Defaults to None.
+
+        Returns:
+            int: Measurement index (M).
+        """
+        _, M_idx = self.tree.query(self._points(azimuth, elevation, distance))
+        return int(M_idx)
+
+    def query_batch(self, azimuth, elevation, distance=None):
+        """
+        Finds the closest measurement for many directions at once.
+
+        Args:
+            azimuth (np.ndarray): Desired azimuths in degrees.
+            elevation (np.ndarray): Desired elevations in degrees, same length as azimuth (or a single value).
+            distance (np.ndarray, optional): Desired distances in meters. Only used if the index was built with use_distance. Defaults to None.
+
+        Returns:
+            np.ndarray: Measurement indices (M), one per direction.
+        """
+        azimuth, elevation = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(azimuth, dtype=float)),
+            np.atleast_1d(np.asarray(elevation, dtype=float)),
+        )
+        if distance is not None:
+            distance = np.broadcast_to(np.asarray(distance, dtype=float), azimuth.shape)
+        _, M_idx = self.tree.query(self._points(azimuth, elevation, distance))
+        return np.asarray(M_idx, dtype=int)
+
+
+def get_index(
+    in_sofa_file: str, use_distance: bool = False, distance_weight: float = 1.0
+):
+    """
+    Returns the prebuilt spherical index for a SOFA file, building it on first use. Indexes are rebuilt if the file changes on disk.
+
+    Args:
+        in_sofa_file (str): Path to SOFA file.
+        use_distance (bool, optional): Also take source distance into account. Defaults to False.
+        distance_weight (float, optional): See SphericalIndex. Defaults to 1.0.
+
+    Returns:
+        SphericalIndex: Index over the file's source positions.
+    """
+    key = (sofa_cache.file_key(in_sofa_file), bool(use_distance), float(distance_weight))
+    with _lock:
+        if key in _indexes:
+            _indexes.move_to_end(key)
+            return _indexes[key]
+
+    sofa_positions = sofa_store.source_positions(in_sofa_file, "spherical")
+    index = SphericalIndex(sofa_positions, use_distance, distance_weight)
+
+    with _lock:
+        for stale_key in [k for k in _indexes if k[0][0] == key[0][0] and k[0] != key[0]]:
+            del _indexes[stale_key]
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def invalidate(in_sofa_file: str = None):
+    """
+    Drops cached indexes.
+
+    Args:
+        in_sofa_file (str, optional): Path to SOFA file to drop. Drops every cached index if not given.
+    """
+    with _lock:
+        if in_sofa_file is None:
+            _indexes.clear()
+            return
+        path = os.path.abspath(in_sofa_file)
+        for key in [k for k in _indexes if k[0][0] == path]:
+            del _indexes[key]
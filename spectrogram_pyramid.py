@@ -0,0 +1,326 @@
+# multi-resolution spectrogram cache for long recordings.
+# level 0 is the same spectrogram scipy.signal.spectrogram gives for the whole file (first channel, default parameters), computed block by block
+# so memory stays flat. every level above it averages pairs of columns from the one below, halving the time resolution each step.
+# a view only ever draws the finest level that still fits the requested number of columns, so an hour-long file never turns into
+# a million-column mesh, and zooming in swaps to finer levels as they start to fit.
+#
+# levels are .npy files (memory mapped when read back) in the system temp dir, keyed by a hash of the file's contents and the stft parameters,
+# so copies of a file share a pyramid and an edited file gets a new one. a small index maps (path, mtime, size) to the content hash,
+# so reopening a file doesn't mean hashing it again.
+# hashing and transforming a whole file only pays off when the view covers a good part of it. a view shorter than 1/WHOLE_FILE_FACTOR
+# of the file gets a pyramid of just its own section instead (keyed by path, mtime, size and the section, without reading the file),
+# so a few seconds of a multi-GB recording cost about as much as the few seconds themselves.
+# the cache is capped at CACHE_MAX_BYTES: opening a pyramid marks it as used, and the least recently used ones are deleted to make
+# room for a new one.
+
+import os  # <- cache paths, file stats
+import json  # <- metadata & index
+import shutil  # <- deleting old pyramids
+import hashlib  # <- content hashes
+import tempfile  # <- cache location
+import threading  # <- index writes
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+
+import audio_window  # <- windowed reads
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "gghsf-spectrograms")
+NPERSEG = 256  # <- scipy.signal.spectrogram's defaults
+NOVERLAP = NPERSEG // 8
+MIN_TOP_COLUMNS = 512  # <- stop adding levels once a level is about this narrow
+BLOCK_SEGMENTS = 4096  # <- stft columns computed per block while building level 0
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+WHOLE_FILE_FACTOR = 4  # <- views shorter than 1/WHOLE_FILE_FACTOR of the file get a pyramid of their own section
+CACHE_MAX_BYTES = 4 * 1024**3  # <- about 5 hours of 48 kHz audio
+
+_index_lock = threading.Lock()
+
+
+def content_hash(audio_file_path: str):
+    """
+    Hash of a file's contents, looked up from the index if the file hasn't changed since it was last hashed.
+
+    Args:
+        audio_file_path (str): Path to audio file.
+
+    Returns:
+        str: Hex digest.
+    """
+    path = os.path.abspath(audio_file_path)
+    stat_key = _stat_key(path)
+    index_path = os.path.join(CACHE_DIR, "index.json")
+    with _index_lock:
+        index = _read_json(index_path)
+        if stat_key in index:
+            return index[stat_key]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as audio_file:
+        for chunk in iter(lambda: audio_file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(chunk)
+    file_hash = digest.hexdigest()
+
+    with _index_lock:
+        index = _read_json(index_path)
+        # drop entries for older versions of the same file
+        index = {key: value for key, value in index.items() if not key.startswith(path + "|")}
+        index[stat_key] = file_hash
+        _write_json(index_path, index)
+    return file_hash
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return "{0}|{1}|{2}".format(path, stat.st_mtime_ns, stat.st_size)
+
+
+def estimate_bytes(frames: int, nperseg: int = NPERSEG, noverlap: int = NOVERLAP):
+    """
+    Disk space a pyramid of a number of frames takes: level 0 in float32, plus about as much again for the coarser levels.
+
+    Args:
+        frames (int): Frames the pyramid covers.
+        nperseg (int, optional): Samples per stft segment. Defaults to NPERSEG.
+        noverlap (int, optional): Samples of overlap between segments. Defaults to NOVERLAP.
+
+    Returns:
+        int: Bytes.
+    """
+    n_columns = max(0, (int(frames) - noverlap) // (nperseg - noverlap))
+    return 2 * (nperseg // 2 + 1) * n_columns * np.dtype(np.float32).itemsize
+
+
+def _directory_bytes(directory):
+    total = 0
+    for name in os.listdir(directory):
+        try:
+            total += os.path.getsize(os.path.join(directory, name))
+        except OSError:
+            pass
+    return total
+
+
+def prune_cache(needed_bytes: int = 0, keep: str = None, max_bytes: int = None):
+    """
+    Deletes the least recently used pyramids until the cache has room for needed_bytes more.
+
+    Args:
+        needed_bytes (int, optional): Space to make for a pyramid about to be built. Defaults to 0.
+        keep (str, optional): Pyramid directory that mustn't be deleted (the one being opened). Defaults to None.
+        max_bytes (int, optional): Cache size limit. Defaults to CACHE_MAX_BYTES.
+    """
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_BYTES
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return
+    pyramids = []
+    for name in names:
+        directory = os.path.join(CACHE_DIR, name)
+        if not os.path.isdir(directory) or directory == keep:
+            continue
+        try:
+            last_used = os.path.getmtime(os.path.join(directory, "meta.json"))
+        except OSError:
+            last_used = 0.0  # <- never finished building, so it goes first
+        pyramids.append((last_used, directory, _directory_bytes(directory)))
+    total = sum(size for _, _, size in pyramids) + (_directory_bytes(keep) if keep and os.path.isdir(keep) else 0)
+    for _, directory, size in sorted(pyramids):
+        if total + needed_bytes <= max_bytes:
+            break
+        # metadata goes first, so a pyramid that can't be deleted completely (e.g. still memory mapped on windows) gets rebuilt
+        try:
+            os.remove(os.path.join(directory, "meta.json"))
+        except OSError:
+            pass
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= size
+
+
+def _read_json(path):
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as json_file:
+        json.dump(data, json_file)
+    os.replace(temp_path, path)
+
+
+class SpectrogramPyramid(object):
+    """
+    Spectrogram of a file (or a section of it) at several time resolutions, cached on disk.
+
+    Args:
+        audio_file_path (str): Path to audio file.
+        nperseg (int, optional): Samples per stft segment. Defaults to NPERSEG.
+        noverlap (int, optional): Samples of overlap between segments. Defaults to NOVERLAP.
+        progress (callable, optional): Called with a fraction between 0 and 1 while the pyramid is built. Defaults to None.
+        section (tuple, optional): (start, end) frames to cover instead of the whole file. Defaults to None (whole file).
+    """
+
+    def __init__(
+        self, audio_file_path: str, nperseg: int = NPERSEG, noverlap: int = NOVERLAP, progress=None, section: tuple = None
+    ):
+        self.audio_file_path = audio_file_path
+        self.nperseg = int(nperseg)
+        self.noverlap = int(noverlap)
+        self.hop = self.nperseg - self.noverlap
+        if section is None:
+            self.start, self.end = 0, None
+            key = content_hash(audio_file_path)
+        else:
+            self.start, self.end = int(section[0]), int(section[1])
+            # sections aren't shared between copies, so they don't need the file read to be hashed
+            key = hashlib.blake2b(_stat_key(os.path.abspath(audio_file_path)).encode(), digest_size=16).hexdigest()
+            key += "-{0}-{1}".format(self.start, self.end)
+        self.directory = os.path.join(CACHE_DIR, "{0}-{1}-{2}".format(key, self.nperseg, self.noverlap))
+        meta_path = os.path.join(self.directory, "meta.json")
+        meta = _read_json(meta_path)
+        if meta:
+            os.utime(meta_path)  # <- marks it as recently used
+            prune_cache(keep=self.directory)
+        else:
+            meta = self._build(progress)
+        self.sr = meta["sr"]
+        self.frames = meta["frames"]
+        self.n_levels = meta["levels"]
+        self.f = np.fft.rfftfreq(self.nperseg, 1 / self.sr)
+        self._levels = {}
+
+    def _level_path(self, level):
+        return os.path.join(self.directory, "level{0}.npy".format(level))
+
+    def _build(self, progress):
+        from scipy import signal
+
+        sr, frames = audio_window.audio_info(self.audio_file_path)
+        if self.end is not None:
+            frames = max(0, min(self.end, frames) - self.start)
+        n_columns = max(0, (frames - self.noverlap) // self.hop)
+        needed_bytes = estimate_bytes(frames, self.nperseg, self.noverlap)
+        if needed_bytes > CACHE_MAX_BYTES:
+            raise ValueError(
+                "A spectrogram of this window would need {0:.1f} GB of cache (limit {1:.1f} GB), please pick a shorter window.".format(
+                    needed_bytes / 1024**3, CACHE_MAX_BYTES / 1024**3
+                )
+            )
+        prune_cache(needed_bytes, keep=self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+        # level 0, block by block. each block holds whole segments, so the columns are exactly the ones a single call would give
+        level = np.lib.format.open_memmap(
+            self._level_path(0), mode="w+", dtype=np.float32, shape=(self.nperseg // 2 + 1, n_columns)
+        )
+        for column in range(0, n_columns, BLOCK_SEGMENTS):
+            count = min(BLOCK_SEGMENTS, n_columns - column)
+            start = self.start + column * self.hop
+            block, _ = audio_window.read_window(
+                self.audio_file_path, start, start + (count - 1) * self.hop + self.nperseg
+            )
+            _, _, Sxx = signal.spectrogram(block, sr, nperseg=self.nperseg, noverlap=self.noverlap)
+            level[:, column : column + count] = Sxx[:, :count]
+            if progress is not None:
+                progress(0.9 * (column + count) / max(n_columns, 1))
+        level.flush()
+
+        # coarser levels: average pairs of columns from the level below
+        n_levels = 1
+        while level.shape[1] > 2 * MIN_TOP_COLUMNS:
+            pairs = level.shape[1] // 2
+            coarser = np.lib.format.open_memmap(
+                self._level_path(n_levels), mode="w+", dtype=np.float32, shape=(level.shape[0], pairs)
+            )
+            for column in range(0, pairs, BLOCK_SEGMENTS):
+                count = min(BLOCK_SEGMENTS, pairs - column)
+                below = level[:, 2 * column : 2 * (column + count)]
+                coarser[:, column : column + count] = 0.5 * (below[:, 0::2] + below[:, 1::2])
+            coarser.flush()
+            level = coarser
+            n_levels += 1
+
+        # metadata goes last, so a build that got interrupted is redone instead of read back half-written
+        meta = {"sr": int(sr), "frames": int(frames), "levels": n_levels}
+        _write_json(os.path.join(self.directory, "meta.json"), meta)
+        if progress is not None:
+            progress(1.0)
+        return meta
+
+    def level(self, level: int):
+        """
+        Args:
+            level (int): Level, 0 being the full resolution.
+
+        Returns:
+            np.ndarray: Power spectral density with shape (frequencies, columns), memory mapped.
+        """
+        if level not in self._levels:
+            self._levels[level] = np.load(self._level_path(level), mmap_mode="r")
+        return self._levels[level]
+
+    def column_times(self, level: int, columns: np.ndarray):
+        """
+        Args:
+            level (int): Level.
+            columns (np.ndarray): Column indices at that level.
+
+        Returns:
+            np.ndarray: Centre time of each column in seconds from the start of the file (same convention as scipy.signal.spectrogram's t).
+        """
+        span = 2**level
+        return (self.start + (np.asarray(columns) * span + (span - 1) / 2) * self.hop + self.nperseg / 2) / self.sr
+
+    def view(self, start_s: float, end_s: float, max_columns: int = 2000):
+        """
+        The part of the spectrogram between two times, at the finest level that fits in max_columns.
+
+        Args:
+            start_s (float): Start time in seconds.
+            end_s (float): End time in seconds.
+            max_columns (int, optional): Most columns to return; about the width of the plot in pixels is plenty. Defaults to 2000.
+
+        Returns:
+            np.ndarray: Frequencies in Hz.
+            np.ndarray: Column times in seconds.
+            np.ndarray: Power spectral density with shape (frequencies, columns).
+            int: Level it came from.
+        """
+        offset = self.start + self.nperseg / 2
+        for level in range(self.n_levels):
+            span = 2**level
+            first = max(0, int(np.floor((start_s * self.sr - offset) / (self.hop * span))))
+            last = int(np.ceil((end_s * self.sr - offset) / (self.hop * span))) + 1
+            last = min(last, self.level(level).shape[1])
+            if last - first <= max_columns or level == self.n_levels - 1:
+                break
+        columns = np.arange(first, max(first, last))
+        return self.f, self.column_times(level, columns), np.asarray(self.level(level)[:, first:last]), level
+
+
+def get_pyramid(audio_file_path: str, progress=None, start: int = 0, end: int = None):
+    """
+    Returns a spectrogram pyramid that covers a view of a file, building it on first use. That's the whole file's pyramid if the view
+    is at least 1/WHOLE_FILE_FACTOR of the file, and a pyramid of just the view otherwise.
+
+    Args:
+        audio_file_path (str): Path to audio file.
+        progress (callable, optional): Called with a fraction between 0 and 1 while the pyramid is built. Defaults to None.
+        start (int, optional): First frame of the view. Defaults to 0.
+        end (int, optional): Frame the view stops before. Defaults to None (end of file).
+
+    Returns:
+        SpectrogramPyramid
+    """
+    _, frames = audio_window.audio_info(audio_file_path)
+    end = frames if end is None else min(int(end), frames)
+    start = max(0, int(start))
+    if (end - start) * WHOLE_FILE_FACTOR >= frames:
+        return SpectrogramPyramid(audio_file_path, progress=progress)
+    return SpectrogramPyramid(audio_file_path, progress=progress, section=(start, end))
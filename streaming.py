@@ -0,0 +1,202 @@
+# streaming (constant memory) SOFA rendering for very long sources.
+# the non-streaming path (sofa_render.render_sofa) holds the whole source, the resampled source and the render in memory at float64,
+# which is several gigabytes for a two hour 96kHz file. here the source is read in blocks with soundfile, resampled with a stateful
+# soxr stream, convolved with overlap-save, and written straight to disk, so memory stays at a few blocks no matter how long the input is.
+# peak normalization needs the peak of the whole render, so the first pass writes an unnormalized temp file and the second pass scales it.
+# the temp file is RF64, since a plain RIFF .wav stops at 4 GiB (under 270M frames of float stereo, about an hour and a half at 48kHz).
+#
+#   python streaming.py long_source.wav subject.sofa out.wav --azimuth 30 --elevation 0
+
+import os  # <- temp file placement
+import sys  # <- exit codes
+import tempfile  # <- first pass temp file
+import argparse  # <- cli
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+import soundfile as sf  # <- block reads & writes
+import soxr  # <- streaming resampler
+
+import hrir_cache  # <- resampled impulse responses
+import spatial_index  # <- nearest-measurement lookup
+import convolution  # <- overlap-save convolver
+
+DEFAULT_BLOCK_SIZE = 65536  # <- source frames per block
+
+
+class StreamResampler(object):
+    """
+    Stateful resampler for audio that arrives in blocks. Passes blocks straight through if the rates already match.
+
+    Args:
+        orig_sr (int): Sampling rate of the incoming blocks.
+        target_sr (int): Sampling rate to resample to.
+        channels (int, optional): Number of channels. Defaults to 1.
+        quality (str, optional): soxr quality preset. Defaults to "HQ" (same as librosa's default).
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int, channels: int = 1, quality: str = "HQ"):
+        self.passthrough = int(orig_sr) == int(target_sr)
+        if not self.passthrough:
+            self._stream = soxr.ResampleStream(
+                int(orig_sr), int(target_sr), channels, dtype="float64", quality=quality
+            )
+
+    def process(self, block: np.ndarray, last: bool = False):
+        """
+        Args:
+            block (np.ndarray): Next block, (frames,) or (frames, channels).
+            last (bool, optional): Set on the final block, to flush what's left in the resampler. Defaults to False.
+
+        Returns:
+            np.ndarray: Resampled block. Its length will vary from block to block.
+        """
+        if self.passthrough:
+            return block
+        return self._stream.resample_chunk(np.ascontiguousarray(block, dtype=np.float64), last=last)
+
+
+def iter_mono_blocks(in_source_file: str, block_size: int = DEFAULT_BLOCK_SIZE):
+    """
+    Reads a source file in blocks, downmixing each block to mono.
+
+    Args:
+        in_source_file (str): Path to source file.
+        block_size (int, optional): Frames per block. Defaults to DEFAULT_BLOCK_SIZE.
+
+    Yields:
+        np.ndarray: Mono block.
+        bool: True for the last block.
+    """
+    with sf.SoundFile(in_source_file) as source:
+        remaining = source.frames
+        while True:
+            block = source.read(min(block_size, max(remaining, 0)), dtype="float64", always_2d=True)
+            remaining -= len(block)
+            yield np.mean(block, axis=1), remaining <= 0
+            if remaining <= 0:
+                return
+
+
+def render_sofa_streaming(
+    in_source_file: str,
+    in_sofa_file: str,
+    out_file: str,
+    angle: float = 0,
+    elev: float = 0,
+    target_fs: int = 48000,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    normalize: bool = True,
+    subtype: str = None,
+    receivers=(0, 1),
+    emitter: int = 0,
+):
+    """
+    Renders a source file with a SOFA file at the given azimuth and elevation, block by block, writing straight to out_file.
+
+    Args:
+        in_source_file (str): Path to source file.
+        in_sofa_file (str): Path to sofa file.
+        out_file (str): Path to write the render to.
+        angle (float, optional): Desired azimuth in degrees. Defaults to 0.
+        elev (float, optional): Desired elevation in degrees. Defaults to 0.
+        target_fs (int, optional): Target sampling rate. Defaults to 48000.
+        block_size (int, optional): Source frames per block. Defaults to DEFAULT_BLOCK_SIZE.
+        normalize (bool, optional): Peak normalize with a second pass over the render. Defaults to True.
+        subtype (str, optional): soundfile subtype of out_file. Defaults to None (soundfile's default for the format, same as the gui's exports).
+        receivers (list, optional): Receivers to render, one output channel each (None for all of them). Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render. Defaults to 0.
+
+    Returns:
+        int: Number of frames written.
+        float: Peak of the render before normalization.
+    """
+    M_idx = spatial_index.get_index(in_sofa_file).query(angle, elev)
+    SOFA_H = hrir_cache.hrirs(in_sofa_file, M_idx, receivers, emitter, target_fs)
+    channels = SOFA_H.shape[1]
+
+    convolver = convolution.OverlapSaveConvolver(SOFA_H)
+    resampler = StreamResampler(sf.info(in_source_file).samplerate, target_fs)
+
+    if not normalize:
+        with sf.SoundFile(out_file, "w", int(target_fs), channels, subtype=subtype) as out:
+            frames, peak = _render_blocks(in_source_file, block_size, resampler, convolver, out)
+        return frames, peak
+
+    # first pass: unnormalized render to a float temp file next to the output, tracking the peak as it goes
+    out_dir = os.path.dirname(os.path.abspath(out_file))
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".rf64", dir=out_dir)
+    os.close(temp_fd)
+    try:
+        with sf.SoundFile(temp_path, "w", int(target_fs), channels, subtype="FLOAT", format="RF64") as temp:
+            frames, peak = _render_blocks(in_source_file, block_size, resampler, convolver, temp)
+
+        # second pass: scale block by block into the real output
+        scale = 1.0 / peak if peak > 0 else 1.0
+        copied = 0
+        with sf.SoundFile(temp_path) as temp, sf.SoundFile(
+            out_file, "w", int(target_fs), channels, subtype=subtype
+        ) as out:
+            if temp.frames != frames:
+                raise IOError(
+                    "Temp file {0} holds {1} frames, but {2} were rendered.".format(temp_path, temp.frames, frames)
+                )
+            for block in temp.blocks(blocksize=block_size, dtype="float64"):
+                out.write(block * scale)
+                copied += len(block)
+        if copied != frames:
+            raise IOError("Only {0} of {1} rendered frames could be read back from {2}.".format(copied, frames, temp_path))
+    finally:
+        os.remove(temp_path)
+    return frames, peak
+
+
+def _render_blocks(in_source_file, block_size, resampler, convolver, out):
+    frames = 0
+    peak = 0.0
+    for block, last in iter_mono_blocks(in_source_file, block_size):
+        rend = convolver.process(resampler.process(block, last=last))
+        if last:
+            rend = np.concatenate([rend, convolver.flush()])
+        if len(rend):
+            peak = max(peak, float(np.max(np.abs(rend))))
+            out.write(rend)
+            frames += len(rend)
+    return frames, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render a (long) source file with a SOFA file in constant memory."
+    )
+    parser.add_argument("source", help="source file")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("out", help="output file")
+    parser.add_argument("--azimuth", type=float, default=0, help="azimuth in deg (default: 0)")
+    parser.add_argument("--elevation", type=float, default=0, help="elevation in deg (default: 0)")
+    parser.add_argument("--target-fs", type=int, default=48000, help="target sampling rate (default: 48000)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="source frames per block")
+    parser.add_argument("--no-normalize", action="store_true", help="skip the peak normalization pass")
+    parser.add_argument("--receivers", default="0,1", help='receivers to render, e.g. "all", "0,1" or "0:32" (default: 0,1)')
+    parser.add_argument("--emitter", type=int, default=0, help="emitter to render (default: 0)")
+    args = parser.parse_args(argv)
+
+    from batch_render import parse_receivers
+
+    frames, peak = render_sofa_streaming(
+        args.source,
+        args.sofa,
+        args.out,
+        args.azimuth,
+        args.elevation,
+        args.target_fs,
+        args.block_size,
+        normalize=not args.no_normalize,
+        receivers=parse_receivers(args.receivers),
+        emitter=args.emitter,
+    )
+    print("wrote {0} frames to {1} (peak before normalization: {2:.4f})".format(frames, args.out, peak))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+# moving-source rendering: renders a source along a time-varying (azimuth, elevation, distance) trajectory with a SOFA file.
+# the source is cut into blocks; each block looks up the measurement closest to where the source is halfway through that block,
+# and filter changes are crossfaded over one block (see convolution.CrossfadeConvolver), so there are no clicks or zipper noise.
+#
+# trajectories come from keyframes, or from a .csv with a header row of: time,azimuth,elevation[,distance] (time in seconds).
+# positions in between keyframes are interpolated linearly; azimuth takes the short way around (350deg -> 10deg goes through 0deg).
+#
+#   python trajectory.py source.wav subject.sofa path.csv out.wav
+
+import sys  # <- exit codes
+import csv  # <- reading trajectories
+import time  # <- real-time factor
+import argparse  # <- cli
+
+import numpy as np  # <- matrix calc & more (but mostly matrix calc)
+import soundfile as sf  # <- writing renders
+
+import sofa_store  # <- sampling rate & dimensions (from a compiled store if there is one)
+import sofa_render  # <- source loading, resampling, normalization
+import spatial_index  # <- nearest-measurement lookup
+import hrtf_spectra  # <- precomputed HRTF spectra
+import hrir_cache  # <- receiver/emitter checks
+import convolution  # <- crossfading block convolver
+
+DEFAULT_BLOCK_SIZE = 512  # <- source samples per filter update (~10ms at 48kHz)
+
+
+class Trajectory(object):
+    """
+    Source trajectory given as keyframes.
+
+    Args:
+        times (list): Keyframe times in seconds.
+        azimuths (list): Azimuth at each keyframe, in degrees.
+        elevations (list): Elevation at each keyframe, in degrees.
+        distances (list, optional): Distance at each keyframe, in meters. Defaults to None (direction only).
+    """
+
+    def __init__(self, times, azimuths, elevations, distances=None):
+        order = np.argsort(np.asarray(times, dtype=float), kind="stable")
+        self.times = np.asarray(times, dtype=float)[order]
+        # unwrap so interpolating between 350deg and 10deg goes through 0deg instead of all the way around
+        self.azimuths = np.degrees(np.unwrap(np.radians(np.asarray(azimuths, dtype=float)[order])))
+        self.elevations = np.asarray(elevations, dtype=float)[order]
+        self.distances = None if distances is None else np.asarray(distances, dtype=float)[order]
+        if len(self.times) == 0:
+            raise ValueError("Trajectory needs at least one keyframe.")
+
+    @classmethod
+    def from_keyframes(cls, keyframes: list):
+        """
+        Args:
+            keyframes (list): (time, azimuth, elevation) or (time, azimuth, elevation, distance) tuples.
+
+        Returns:
+            Trajectory
+        """
+        columns = list(zip(*keyframes))
+        return cls(*columns[:4]) if len(columns) > 3 else cls(*columns[:3])
+
+    @classmethod
+    def from_csv(cls, csv_path: str):
+        """
+        Reads keyframes from a .csv with the columns time, azimuth, elevation and (optionally) distance.
+
+        Args:
+            csv_path (str): Path to .csv.
+
+        Returns:
+            Trajectory
+        """
+        with open(csv_path, newline="") as csv_file:
+            rows = list(csv.DictReader(csv_file))
+        times = [float(row["time"]) for row in rows]
+        azimuths = [float(row["azimuth"]) for row in rows]
+        elevations = [float(row["elevation"]) for row in rows]
+        distances = None
+        if rows and rows[0].get("distance") not in (None, ""):
+            distances = [float(row["distance"]) for row in rows]
+        return cls(times, azimuths, elevations, distances)
+
+    def position_at(self, t):
+        """
+        Interpolates the trajectory. Times before the first or after the last keyframe hold that keyframe's position.
+
+        Args:
+            t (float or np.ndarray): Time(s) in seconds.
+
+        Returns:
+            np.ndarray: Azimuth(s) in degrees, wrapped to [0, 360).
+            np.ndarray: Elevation(s) in degrees.
+            np.ndarray: Distance(s) in meters, or None if the trajectory has no distances.
+        """
+        az = np.mod(np.interp(t, self.times, self.azimuths), 360)
+        el = np.interp(t, self.times, self.elevations)
+        dist = None if self.distances is None else np.interp(t, self.times, self.distances)
+        return az, el, dist
+
+
+def render_trajectory(
+    source_x: np.ndarray,
+    in_sofa_file: str,
+    trajectory: Trajectory,
+    fs: int = 48000,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    receivers=(0, 1),
+    emitter: int = 0,
+):
+    """
+    Renders a mono source moving along a trajectory.
+
+    Args:
+        source_x (np.ndarray): Mono signal at fs.
+        in_sofa_file (str): Path to sofa file.
+        trajectory (Trajectory): Where the source is over time.
+        fs (int, optional): Sampling rate of source_x and of the render. Defaults to 48000.
+        block_size (int, optional): Samples per filter update. Defaults to DEFAULT_BLOCK_SIZE.
+        receivers (list, optional): Receivers to render, one output channel each (None for all of them). Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render. Defaults to 0.
+
+    Returns:
+        np.ndarray: Unnormalized render with shape (len(source_x) + N - 1, len(receivers)).
+        np.ndarray: Measurement index used for each block.
+    """
+    sofa_fs_H = sofa_store.sampling_rate(in_sofa_file)
+    # filter length after resampling to fs, so the spectra can be computed at an fft size that fits block_size new samples
+    filter_length = int(np.ceil(sofa_store.dimensions(in_sofa_file)["N"] * fs / sofa_fs_H))
+    store = hrtf_spectra.get_spectra(
+        in_sofa_file, fft_size=block_size + filter_length - 1, target_fs=fs
+    )
+    hop = min(store.hop, int(block_size))
+    receivers, emitter = hrir_cache.resolve_channels(store.spectra.shape, receivers, emitter)
+
+    n_blocks = -(-len(source_x) // hop)
+    block_centres = (np.arange(n_blocks) * hop + hop / 2) / fs
+    az, el, dist = trajectory.position_at(block_centres)
+    index = spatial_index.get_index(in_sofa_file, use_distance=dist is not None)
+    M_indices = index.query_batch(az, el, dist)
+
+    convolver = convolution.CrossfadeConvolver(store.fft_size, store.filter_length, channels=len(receivers))
+    rend = np.zeros((len(source_x) + store.filter_length - 1, len(receivers)))
+    current_M = None
+    for b, M_idx in enumerate(M_indices):
+        if M_idx != current_M:
+            convolver.set_filter_spectrum(store.transfer_functions(M_idx, receivers, emitter))
+            current_M = M_idx
+        start = b * hop
+        block = source_x[start : start + hop]
+        rend[start : start + len(block)] = convolver.process(block)
+    # filter tail
+    tail_start = len(source_x)
+    for start in range(tail_start, len(rend), hop):
+        n = min(hop, len(rend) - start)
+        rend[start : start + n] = convolver.process(np.zeros(n))
+    return rend, M_indices
+
+
+def render_trajectory_file(
+    in_source_file: str,
+    in_sofa_file: str,
+    trajectory: Trajectory,
+    out_file: str,
+    target_fs: int = 48000,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    receivers=(0, 1),
+    emitter: int = 0,
+):
+    """
+    Loads a source file, renders it along a trajectory, peak normalizes it, and writes it to out_file.
+
+    Args:
+        in_source_file (str): Path to source file.
+        in_sofa_file (str): Path to sofa file.
+        trajectory (Trajectory): Where the source is over time.
+        out_file (str): Path to write the render to.
+        target_fs (int, optional): Target sampling rate. Defaults to 48000.
+        block_size (int, optional): Samples per filter update. Defaults to DEFAULT_BLOCK_SIZE.
+        receivers (list, optional): Receivers to render, one output channel each (None for all of them). Defaults to (0, 1) (left, right).
+        emitter (int, optional): Emitter to render. Defaults to 0.
+
+    Returns:
+        float: Real-time factor of the render (seconds of audio rendered per second of processing).
+    """
+    source_x, fs_x = sofa_render.load_mono_source(in_source_file)
+    source_x = sofa_render.resample(source_x, fs_x, target_fs)
+
+    start = time.perf_counter()
+    rend, M_indices = render_trajectory(
+        source_x, in_sofa_file, trajectory, target_fs, block_size, receivers, emitter
+    )
+    elapsed = time.perf_counter() - start
+
+    sf.write(out_file, sofa_render.peak_normalize(rend), samplerate=int(target_fs))
+    return (len(source_x) / target_fs) / elapsed if elapsed > 0 else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render a source moving along a trajectory with a SOFA file."
+    )
+    parser.add_argument("source", help="source file")
+    parser.add_argument("sofa", help="SOFA file (.sofa)")
+    parser.add_argument("trajectory", help=".csv with columns time,azimuth,elevation[,distance]")
+    parser.add_argument("out", help="output file")
+    parser.add_argument("--target-fs", type=int, default=48000, help="target sampling rate (default: 48000)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="samples per filter update")
+    parser.add_argument("--receivers", default="0,1", help='receivers to render, e.g. "all", "0,1" or "0:32" (default: 0,1)')
+    parser.add_argument("--emitter", type=int, default=0, help="emitter to render (default: 0)")
+    args = parser.parse_args(argv)
+
+    from batch_render import parse_receivers
+
+    realtime_factor = render_trajectory_file(
+        args.source,
+        args.sofa,
+        Trajectory.from_csv(args.trajectory),
+        args.out,
+        args.target_fs,
+        args.block_size,
+        receivers=parse_receivers(args.receivers),
+        emitter=args.emitter,
+    )
+    print("wrote {0} ({1:.1f}x real-time)".format(args.out, realtime_factor))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())